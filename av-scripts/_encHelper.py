@@ -4,17 +4,29 @@ import re
 import sys
 import json
 import zlib
+import time
 import struct
+import bisect
+import shutil
+import hashlib
 import argparse
+import importlib
+import threading
 import subprocess
 
 from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property, lru_cache
 from pathlib import Path
 from pathlib import PurePath
 
 from dataclasses import dataclass
 from typing import Optional, Dict, Any
 
+from _mkvReader import readMKVData, mkvToMediaData, MKVReadError
+from _mp4Reader import readMP4Data, MP4ReadError
+from _ffCmd import FFCommand, FFOutput, FilterGraph, FFCmdError, linkName, stripMetadataArgs
+
 def moduleNotFound(text: str) -> str:
     fmodule = re.search(r'\'(.*)\'', text)
     returnText = ':: Please install required module'
@@ -42,13 +54,13 @@ def set_console_title(title: str):
         sys.stdout.write(f'\33]0;{title}\a')
         sys.stdout.flush()
 
-try:
-    from questionary import Choice, Validator, ValidationError
-    from PIL import Image
-    import numpy as np
-except ModuleNotFoundError as errorModule:
-    moduleNotFound(str(errorModule))
-    exit()
+# load heavy modules on first use, scripts without images or prompts don't pay for them
+def requireModule(name: str):
+    try:
+        return importlib.import_module(name)
+    except ModuleNotFoundError as errorModule:
+        moduleNotFound(str(errorModule))
+        exit()
 
 # int validator
 def IntValidator(text: str) -> bool:
@@ -98,6 +110,8 @@ def fixPath(inFile: Path, forFFmpeg: bool = False):
 extVideoFile = ['.mkv', '.mp4', '.mov', '.avi', '.avs', '.webm']
 extAudioFile = ['.mka', '.m4a', '.aac', '.flac', '.eac3', '.mp3', '.wav']
 extSubsFile  = ['.ass', '.srt']
+extMKVFile   = ['.mkv', '.mka', '.mks', '.mk3d', '.webm']
+extMP4File   = ['.mp4', '.m4a', '.m4v', '.mov']
 
 @dataclass
 class ResolutionStandard:
@@ -143,26 +157,22 @@ STD_RESOLUTIONS = [
     ResolutionStandard("2.35:1 4096w", 4096, 1740),
 ]
 
-def classify_video_resolution(width: int, height: int) -> Dict[str, Any]:
-    if width <= 0 or height <= 0:
-        raise ValueError("Width and height must be positive integers.")
-    
-    # Orientation from original values
-    if width > height:
-        orientation = "landscape"
-    elif height > width:
-        orientation = "portrait"
-    else:
-        orientation = "square"
-    
-    # Normalize so that width >= height
-    norm_width, norm_height = (max(width, height), min(width, height))
+# Tolerances
+MAX_HEIGHT_REL_DIFF = 0.25   # 25% height difference allowed
+MAX_AR_REL_DIFF = 0.12       # 12% aspect ratio difference allowed
+
+# Map 2.35:1 to standard container-based p
+SCOPE_WIDTH_MAP = {
+    1280: 720,
+    1920: 1080,
+    2560: 1440,
+    3840: 2160,
+    4096: 2160,
+}
+
+@lru_cache(maxsize=4096)
+def match_resolution(norm_width: int, norm_height: int) -> Optional[ResolutionStandard]:
     aspect = norm_width / norm_height
-    
-    # Tolerances
-    MAX_HEIGHT_REL_DIFF = 0.25   # 25% height difference allowed
-    MAX_AR_REL_DIFF = 0.12       # 12% aspect ratio difference allowed
-    
     best_match: Optional[ResolutionStandard] = None
     best_score = float("inf")
     
@@ -170,16 +180,31 @@ def classify_video_resolution(width: int, height: int) -> Dict[str, Any]:
         std_ar = std.aspect_ratio
         height_rel_diff = abs(norm_height - std.height) / std.height
         ar_rel_diff = abs(aspect - std_ar) / std_ar
-
+        
         # Skip clearly incompatible candidates
         if height_rel_diff > MAX_HEIGHT_REL_DIFF or ar_rel_diff > MAX_AR_REL_DIFF:
             continue
-
+        
         score = height_rel_diff + ar_rel_diff
         if score < best_score:
             best_score = score
             best_match = std
     
+    return best_match
+
+def resolution_info(width: int, height: int, best_match: Optional[ResolutionStandard]) -> Dict[str, Any]:
+    # Orientation from original values
+    if width > height:
+        orientation = "landscape"
+    elif height > width:
+        orientation = "portrait"
+    else:
+        orientation = "square"
+    
+    # Normalize so that width >= height
+    norm_width, norm_height = (max(width, height), min(width, height))
+    aspect = norm_width / norm_height
+    
     if best_match is None:
         return {
             "label": "Unknown",
@@ -195,15 +220,7 @@ def classify_video_resolution(width: int, height: int) -> Dict[str, Any]:
     is_scope = 2.30 < std_ar < 2.40  # 2.35-ish
     
     if is_scope:
-        # Map 2.35:1 to standard container-based p
-        scope_width_map = {
-            1280: 720,
-            1920: 1080,
-            2560: 1440,
-            3840: 2160,
-            4096: 2160,
-        }
-        label_height = scope_width_map.get(best_match.width, best_match.height)
+        label_height = SCOPE_WIDTH_MAP.get(best_match.width, best_match.height)
     else:
         # Normal: use matched height as p-label
         label_height = best_match.height
@@ -220,87 +237,1496 @@ def classify_video_resolution(width: int, height: int) -> Dict[str, Any]:
         "aspect_ratio": round(aspect, 4),
     }
 
+def classify_video_resolution(width: int, height: int) -> Dict[str, Any]:
+    if width <= 0 or height <= 0:
+        raise ValueError("Width and height must be positive integers.")
+    
+    best_match = match_resolution(max(width, height), min(width, height))
+    return resolution_info(width, height, best_match)
+
+# Standard heights and aspect ratios as arrays, built on first batch call
+_resolution_table = None
+
+def resolution_table():
+    global _resolution_table
+    if _resolution_table is None:
+        np = requireModule('numpy')
+        heights = np.array([ std.height for std in STD_RESOLUTIONS ], dtype=np.float64)
+        aspects = np.array([ std.aspect_ratio for std in STD_RESOLUTIONS ], dtype=np.float64)
+        _resolution_table = (heights, aspects)
+    return _resolution_table
+
+# Same results as classify_video_resolution, all sizes scored in one pass
+def classify_many(widths: list, heights: list) -> List[Dict[str, Any]]:
+    np = requireModule('numpy')
+    widths = np.asarray(widths, dtype=np.int64).ravel()
+    heights = np.asarray(heights, dtype=np.int64).ravel()
+    if widths.shape != heights.shape:
+        raise ValueError("Widths and heights must have the same length.")
+    if len(widths) < 1:
+        return list()
+    if np.any(widths <= 0) or np.any(heights <= 0):
+        raise ValueError("Width and height must be positive integers.")
+    
+    std_heights, std_aspects = resolution_table()
+    norm_width = np.maximum(widths, heights).astype(np.float64)[:, None]
+    norm_height = np.minimum(widths, heights).astype(np.float64)[:, None]
+    
+    height_rel_diff = np.abs(norm_height - std_heights) / std_heights
+    ar_rel_diff = np.abs(norm_width / norm_height - std_aspects) / std_aspects
+    score = height_rel_diff + ar_rel_diff
+    score[(height_rel_diff > MAX_HEIGHT_REL_DIFF) | (ar_rel_diff > MAX_AR_REL_DIFF)] = np.inf
+    
+    # argmin keeps first candidate on ties, same as scalar scan
+    best_idx = np.argmin(score, axis=1)
+    best_found = np.isfinite(score[np.arange(len(best_idx)), best_idx])
+    
+    results = list()
+    for width, height, idx, found in zip(widths.tolist(), heights.tolist(), best_idx.tolist(), best_found.tolist()):
+        results.append(resolution_info(width, height, STD_RESOLUTIONS[idx] if found else None))
+    return results
+
 # search files
-def searchMedia(inputPath: Path, prefixName: str, extFilter: list) -> list:
+# file record from scandir, size and mtime are read when asked, index may outlive the walk
+class MediaFile:
+    __slots__ = ('path', 'name', 'ext', 'entry')
+    
+    def __init__(self, path: str, name: str, ext: str, entry: os.DirEntry):
+        self.path = path
+        self.name = name
+        self.ext = ext
+        self.entry = entry
+    
+    @property
+    def size(self) -> int:
+        return os.stat(self.path).st_size
+    
+    @property
+    def mtime(self) -> float:
+        return os.stat(self.path).st_mtime
+    
+    def __repr__(self) -> str:
+        return f'MediaFile({self.path!r})'
+
+# walk files in os.walk order (files of folder first, then subfolders)
+# folders deeper than maxDepth are not entered, linked folders are skipped like os.walk does
+# dirMtimes: filled with mtime of every scanned folder, read before its scan
+def walkMedia(inputPath: Path, maxDepth: int = 2, extFilter: list = None, dirMtimes: dict = None):
+    rootPath = str(inputPath)
+    rootPrefix = f'{rootPath}{os.path.sep}'
+    
+    def walkDir(dirPath: str, depth: int):
+        subDirs = list()
+        try:
+            if dirMtimes is not None:
+                dirMtimes[dirPath] = os.stat(dirPath).st_mtime_ns
+            with os.scandir(dirPath) as it:
+                entries = list(it)
+        except OSError:
+            return
+        
+        for entry in entries:
+            try:
+                if entry.is_dir():
+                    if depth < maxDepth and not entry.is_symlink():
+                        subDirs.append(entry.path)
+                    continue
+            except OSError:
+                continue
+            fileExt = PurePath(entry.name).suffix.lower()
+            if extFilter is not None and fileExt not in extFilter:
+                continue
+            yield MediaFile(entry.path, entry.path.replace(rootPrefix, ''), fileExt[1:], entry)
+        
+        for subDir in subDirs:
+            yield from walkDir(subDir, depth + 1)
+    
+    yield from walkDir(rootPath, 0)
+
+# sidecar files index, one walk per root, lookups by name prefix and extension
+class DirIndex:
+    def __init__(self, inputPath: Path, maxDepth: int = 2):
+        self.root = str(inputPath)
+        self.byExt = dict()
+        self.fileCount = 0
+        self.dirMtimes = dict()
+        for inFile in walkMedia(self.root, maxDepth, dirMtimes=self.dirMtimes):
+            fileExt = PurePath(inFile.entry.name).suffix.lower()
+            self.byExt.setdefault(fileExt, list()).append((inFile.entry.name, self.fileCount, inFile))
+            self.fileCount += 1
+        for files in self.byExt.values():
+            files.sort(key=lambda f: f[0])
+    
+    def search(self, prefixName: str, extFilter: list) -> list:
+        found = list()
+        for fileExt in set(extFilter):
+            files = self.byExt.get(fileExt, list())
+            i = bisect.bisect_left(files, prefixName, key=lambda f: f[0])
+            while i < len(files) and files[i][0].startswith(prefixName):
+                found.append(files[i])
+                i += 1
+        found.sort(key=lambda f: f[1])
+        return [ f[2] for f in found ]
+    
+    # files added, removed or renamed change mtime of their folder
+    def isCurrent(self) -> bool:
+        for dirPath, dirMtime in self.dirMtimes.items():
+            try:
+                if os.stat(dirPath).st_mtime_ns != dirMtime:
+                    return False
+            except OSError:
+                return False
+        return len(self.dirMtimes) > 0
+
+# index cache per root, rebuilt when any scanned folder changes
+dirIndexCache = dict()
+
+def getDirIndex(inputPath: Path) -> DirIndex:
     inputPath = str(inputPath)
+    cacheKey = os.path.abspath(inputPath)
+    cached = dirIndexCache.get(cacheKey)
+    if cached is not None and cached.root == inputPath and cached.isCurrent():
+        return cached
     
-    fsList = list()
-    baseLevel = len(inputPath.split(os.path.sep))
+    dirIndex = DirIndex(inputPath)
+    dirIndexCache[cacheKey] = dirIndex
+    return dirIndex
+
+def searchMedia(inputPath: Path, prefixName: str, extFilter: list) -> list:
+    return getDirIndex(inputPath).search(prefixName, extFilter)
+
+# cache folder
+def getCacheDir(*subDirs: str) -> Optional[str]:
+    cacheRoot = os.environ.get('encCachePath', '')
+    if cacheRoot == '':
+        if os.name == 'nt' and 'LOCALAPPDATA' in os.environ:
+            cacheRoot = os.path.join(os.environ['LOCALAPPDATA'], 'encHelper')
+        else:
+            cacheRoot = os.environ.get('XDG_CACHE_HOME', os.path.join(Path.home(), '.cache'))
+            cacheRoot = os.path.join(cacheRoot, 'encHelper')
     
-    for root, dirs, files in os.walk(inputPath):
-        curLevel = len(root.split(os.path.sep))
-        if curLevel < baseLevel + 3:
-            for file in files:
-                fileExt = PurePath(file).suffix.lower()
-                if file.startswith(prefixName) and extFilter.count(fileExt) > 0:
-                    inFile = argparse.Namespace()
-                    inFile.path = os.path.join(os.path.sep, root, file)
-                    inFile.name = inFile.path.replace(f'{inputPath}{os.path.sep}', '')
-                    inFile.ext = fileExt[1:]
-                    fsList.append(inFile)
+    cachePath = os.path.join(cacheRoot, *subDirs)
+    try:
+        os.makedirs(cachePath, exist_ok=True)
+    except OSError:
+        return None
+    return cachePath
+
+# drop least recently used files over size limit
+def cacheEvict(cachePath: str, sizeLimit: int):
+    cacheFiles = list()
+    totalSize = 0
+    
+    with os.scandir(cachePath) as it:
+        for entry in it:
+            if entry.is_file():
+                st = entry.stat()
+                cacheFiles.append((st.st_mtime_ns, st.st_size, entry.path))
+                totalSize += st.st_size
     
-    return fsList
+    if totalSize <= sizeLimit:
+        return
+    
+    cacheFiles.sort()
+    for _, fileSize, filePath in cacheFiles:
+        if totalSize <= sizeLimit:
+            break
+        try:
+            os.remove(filePath)
+            totalSize -= fileSize
+        except OSError:
+            pass
+
+# probe cache
+probeCacheLimit = int(os.environ.get('encProbeCacheSize', '64')) * 1024 * 1024
+
+def probeCacheFile(inputPath: Path, probeCmd: list) -> Optional[str]:
+    if os.environ.get('encNoProbeCache') is not None:
+        return None
+    # avisynth scripts depends on env and plugins
+    if PurePath(inputPath).suffix.lower() == '.avs':
+        return None
+    
+    try:
+        st = os.stat(inputPath)
+    except OSError:
+        return None
+    
+    cachePath = getCacheDir('probe')
+    if cachePath is None:
+        return None
+    
+    cacheKey = [ os.path.abspath(inputPath), st.st_size, st.st_mtime_ns, [ str(a) for a in probeCmd ] ]
+    cacheKey = hashlib.sha1(json.dumps(cacheKey).encode('utf-8')).hexdigest()
+    return os.path.join(cachePath, f'{cacheKey}.json')
+
+def probeCacheGet(inputPath: Path, probeCmd: list):
+    cacheFile = probeCacheFile(inputPath, probeCmd)
+    if cacheFile is None:
+        return None
+    
+    try:
+        with open(cacheFile, 'r', encoding='utf-8') as f:
+            result = json.load(f)
+        os.utime(cacheFile)
+    except (OSError, ValueError):
+        return None
+    
+    return result
+
+def probeCacheSet(inputPath: Path, probeCmd: list, result):
+    cacheFile = probeCacheFile(inputPath, probeCmd)
+    if cacheFile is None:
+        return
+    
+    try:
+        tempFile = f'{cacheFile}.{os.getpid()}.tmp'
+        with open(tempFile, 'w', encoding='utf-8') as f:
+            json.dump(result, f, separators=(',', ':'))
+        os.replace(tempFile, cacheFile)
+        cacheEvict(os.path.dirname(cacheFile), probeCacheLimit)
+    except OSError:
+        pass
+
+# read matroska headers without mkvmerge
+def readMKVNative(inputPath: Path) -> Optional[dict]:
+    if PurePath(inputPath).suffix.lower() not in extMKVFile:
+        return None
+    try:
+        result = readMKVData(inputPath)
+    except (MKVReadError, OSError, ValueError, IndexError, struct.error):
+        return None
+    # truncated or damaged headers, let mkvmerge report it
+    return result if len(result['tracks']) > 0 else None
+
+# run tool with json output
+def runJSONTool(toolCmd: list) -> tuple:
+    result = subprocess.run(toolCmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    return json.loads(result.stdout.decode('utf-8')), result.returncode
 
 # get mkv info
-def getMKVData(inputPath: Path) -> dict:
+def getMKVData(inputPath: Path, native: bool = True) -> dict:
+    if native:
+        result = readProbeNative('mkv', inputPath)
+        if result is not None:
+            return result
+    
     mkvcmd = [ 'mkvmerge', '-J', inputPath ]
-    result = subprocess.run(mkvcmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
-    result = json.loads(result.stdout.decode('utf-8'))
+    
+    result = probeCacheGet(inputPath, mkvcmd)
+    if result is not None:
+        return result
+    
+    result, returnCode = runJSONTool(mkvcmd)
+    
+    # 0 = ok, 1 = warnings, 2 = error
+    if returnCode < 2:
+        probeCacheSet(inputPath, mkvcmd, result)
     return result
 
 # get media info
 def getMediaInfo(inputPath: Path) -> dict:
     micmd = [ 'MediaInfo', '--Output=JSON', inputPath ]
-    result = subprocess.run(micmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
-    result = json.loads(result.stdout.decode('utf-8'))
+    
+    result = probeCacheGet(inputPath, micmd)
+    if result is not None:
+        return result
+    
+    result, returnCode = runJSONTool(micmd)
+    
+    if returnCode == 0:
+        probeCacheSet(inputPath, micmd, result)
     return result
 
-# get data from video file
-def getMediaData(inputPath: Path, streamType: str = '', showLog: bool = False) -> dict:
-    ffProbeCmd = list()
-    ffProbeCmd.extend([ r'ffprobe', '-v', 'error', '-hide_banner', ])
-    ffProbeCmd.extend([ '-print_format', 'json', '-show_format', '-show_streams', ])
-    if streamType != '':
-        ffProbeCmd.extend([ '-select_streams', streamType, ])
-    ffProbeCmd.extend([ inputPath ])
+# video keyframes as [ time from file start like -ss, frame index ], packets only, no decode
+def getKeyframes(inputPath: Path) -> Optional[dict]:
+    ffProbeCmd = [ 'ffprobe', '-v', 'error', '-select_streams', 'v:0' ]
+    ffProbeCmd.extend([ '-show_entries', 'packet=pts_time,duration_time,flags:format=start_time', '-of', 'json', inputPath ])
+    
+    result = probeCacheGet(inputPath, ffProbeCmd)
+    if result is not None:
+        return result
+    
+    try:
+        data, returnCode = runJSONTool(ffProbeCmd)
+    except ValueError:
+        return None
+    if returnCode != 0:
+        return None
+    
+    packets = [ p for p in data.get('packets', list()) if p.get('pts_time', 'N/A') != 'N/A' ]
+    frameTimes = sorted(float(p['pts_time']) for p in packets)
+    if len(frameTimes) < 1:
+        return None
+    
+    try:
+        startTime = float(data.get('format', dict()).get('start_time', '0'))
+    except ValueError:
+        startTime = 0.0
+    keyTimes = sorted(float(p['pts_time']) for p in packets if 'K' in p.get('flags', ''))
+    # mkv segment duration can include start_time, timeline end comes from packets
+    endTime = max(float(p['pts_time']) + float(p.get('duration_time', '0').replace('N/A', '0')) for p in packets)
+    
+    result = {
+        'frames': len(frameTimes),
+        'first': round(frameTimes[0] - startTime, 6),
+        'end': round(endTime - startTime, 6),
+        'keyframes': [ [ round(k - startTime, 6), bisect.bisect_left(frameTimes, k) ] for k in keyTimes ],
+    }
+    probeCacheSet(inputPath, ffProbeCmd, result)
+    return result
+
+# chunks cut at keyframes, at least minLength seconds, last chunk runs to the end (frames = 0)
+# keyframe times are relative to source start_time, as input -ss expects
+def planChunks(keyData: dict, duration: float, chunkCount: int, minLength: float = 20.0) -> list:
+    chunkLength = max(minLength, duration / max(1, chunkCount))
+    cuts = [ [ 0.0, 0 ] ]
+    for keyTime, keyIndex in keyData['keyframes']:
+        if keyIndex < 1 or keyTime - cuts[-1][0] < chunkLength or duration - keyTime < minLength:
+            continue
+        cuts.append([ keyTime, keyIndex ])
+    
+    chunks = list()
+    for i, (start, index) in enumerate(cuts):
+        isLast = i + 1 >= len(cuts)
+        chunks.append({
+            'start': start,
+            'index': index,
+            'frames': 0 if isLast else cuts[i + 1][1] - index,
+            'duration': (duration if isLast else cuts[i + 1][0]) - start,
+        })
+    return chunks
+
+# decode tool output
+def decodeOutput(output: bytes) -> str:
+    try:
+        return output.decode('utf-8')
+    except UnicodeDecodeError:
+        return output.decode('ISO-8859-1')
+
+# ffmpeg progress, -progress pipe:1 key=value blocks parsed into one status line for all jobs
+def formatTime(seconds: float) -> str:
+    minutes, seconds = divmod(max(0, int(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f'{hours:02d}:{minutes:02d}:{seconds:02d}'
+
+def parseProgress(progress: dict, duration: float) -> dict:
+    status = dict()
+    for key in [ 'frame', 'total_size' ]:
+        status[key] = int(progress[key]) if progress.get(key, '').isdigit() else 0
+    try:
+        status['fps'] = float(progress.get('fps', '0'))
+    except ValueError:
+        status['fps'] = 0.0
+    try:
+        status['speed'] = float(progress.get('speed', '').strip().rstrip('x'))
+    except ValueError:
+        status['speed'] = 0.0
+    # out_time_ms is microseconds too
+    outTime = progress.get('out_time_us', progress.get('out_time_ms', ''))
+    # negative before the first packet is written
+    status['out_time'] = max(0.0, int(outTime) / 1000000) if outTime.lstrip('-').isdigit() else 0.0
+    status['percent'] = min(100.0, status['out_time'] / duration * 100) if duration > 0 else None
+    if duration > 0 and status['speed'] > 0:
+        status['eta'] = max(0.0, duration - status['out_time']) / status['speed']
+    else:
+        status['eta'] = None
+    return status
+
+class ProgressBoard:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.jobs = dict()
+        self.lastDraw = 0.0
+        self.lineSize = 0
+    
+    def formatStatus(self, name: str, status: dict, short: bool) -> str:
+        percent = f'{status["percent"]:5.1f}%' if status['percent'] is not None else formatTime(status['out_time'])
+        eta = formatTime(status['eta']) if status['eta'] is not None else '--:--:--'
+        if short:
+            return f'{name[:20]} {percent} {status["speed"]:.2f}x ETA {eta}'
+        size = status['total_size'] / 1024 / 1024
+        return (
+            f':: {percent} frame={status["frame"]} fps={status["fps"]:.1f} '
+            f'speed={status["speed"]:.2f}x size={size:.1f}MiB ETA {eta}'
+        )
+    
+    def draw(self):
+        short = len(self.jobs) > 1
+        line = ' | '.join(self.formatStatus(name, status, short) for name, status in self.jobs.items())
+        line = line[:max(20, shutil.get_terminal_size().columns - 1)]
+        sys.stdout.write('\r' + line.ljust(self.lineSize))
+        sys.stdout.flush()
+        self.lineSize = len(line)
+        self.lastDraw = time.monotonic()
+    
+    def update(self, name: str, status: dict):
+        with self.lock:
+            self.jobs[name] = status
+            if time.monotonic() - self.lastDraw >= 0.5:
+                self.draw()
+    
+    def remove(self, name: str):
+        with self.lock:
+            self.jobs.pop(name, None)
+            sys.stdout.write('\r' + ' ' * self.lineSize + '\r')
+            sys.stdout.flush()
+            self.lineSize = 0
+            if len(self.jobs) > 0:
+                self.draw()
+
+progressBoard = ProgressBoard()
+jobRecordLock = threading.Lock()
+
+# one json line per finished ffmpeg run, to find slow files and settings
+def writeJobRecord(record: dict):
+    logPath = getCacheDir('logs')
+    if logPath is None:
+        return
+    try:
+        with jobRecordLock, open(os.path.join(logPath, 'encode-jobs.jsonl'), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    except OSError:
+        pass
+
+# run ffmpeg with live progress, ffmpeg messages go to console or logFile
+def runFFmpeg(encCmd: list, jobName: str, duration: float = 0.0, env: dict = None, logFile: str = None, jobInfo: dict = None) -> int:
+    encCmd = [ str(a) for a in encCmd if a != '-stats' ]
+    encCmd[1:1] = [ '-nostats', '-progress', 'pipe:1', ]
+    
+    startTime = time.monotonic()
+    startDate = time.strftime('%Y-%m-%dT%H:%M:%S')
+    progress = dict()
+    status = parseProgress(progress, duration)
+    
+    logOut = open(logFile, 'w', encoding='utf-8') if logFile is not None else None
+    try:
+        proc = subprocess.Popen(
+            encCmd, env=env, stdout=subprocess.PIPE,
+            stdin=subprocess.DEVNULL if logOut is not None else None,
+            stderr=logOut,
+        )
+        for line in proc.stdout:
+            key, _, value = decodeOutput(line).strip().partition('=')
+            progress[key] = value
+            if key == 'progress':
+                status = parseProgress(progress, duration)
+                progressBoard.update(jobName, status)
+        returnCode = proc.wait()
+    finally:
+        progressBoard.remove(jobName)
+        if logOut is not None:
+            logOut.close()
+    
+    runTime = time.monotonic() - startTime
+    record = {
+        'name': jobName,
+        'started': startDate,
+        'elapsed': round(runTime, 3),
+        'duration': round(duration, 3),
+        'realtime': round(duration / runTime, 3) if duration > 0 and runTime > 0 else None,
+        'frames': status['frame'],
+        'fps': round(status['frame'] / runTime, 2) if runTime > 0 else None,
+        'size': status['total_size'],
+        'returncode': returnCode,
+        'command': encCmd,
+    }
+    record.update(jobInfo or dict())
+    writeJobRecord(record)
+    return returnCode
+
+# encoded audio cache, one encode per source + track + settings reused by every output
+audioCacheLimit = int(os.environ.get('encAudioCacheSize', '4096')) * 1024 * 1024
+aacStereoArgs = [ '-c:a', 'aac', '-cutoff', '0', '-b:a', '192k', '-ac', '2' ]
+
+def audioCacheFile(inputPath: Path, trackIndex: int, audioArgs: list) -> Optional[str]:
+    if os.environ.get('encNoAudioCache') is not None:
+        return None
+    try:
+        st = os.stat(inputPath)
+    except OSError:
+        return None
+    
+    cachePath = getCacheDir('audio')
+    if cachePath is None:
+        return None
+    
+    cacheKey = [ os.path.abspath(inputPath), st.st_size, st.st_mtime_ns, trackIndex, [ str(a) for a in audioArgs ] ]
+    cacheKey = hashlib.sha1(json.dumps(cacheKey).encode('utf-8')).hexdigest()
+    return os.path.join(cachePath, f'{cacheKey}.m4a')
+
+# None when cache is off or encode failed, callers encode audio inline then
+def getEncodedAudio(inputPath: Path, trackIndex: int, audioArgs: list = aacStereoArgs, duration: float = 0.0) -> Optional[str]:
+    cacheFile = audioCacheFile(inputPath, trackIndex, audioArgs)
+    if cacheFile is None:
+        return None
+    
+    if os.path.isfile(cacheFile):
+        try:
+            os.utime(cacheFile)
+        except OSError:
+            pass
+        return cacheFile
+    
+    tempFile = f'{cacheFile[:-4]}.{os.getpid()}.tmp.m4a'
+    cmd = FFCommand(overwrite=True, bitexact=False)
+    cmd.input(inputPath)
+    out = cmd.output(tempFile).map(f'0:a:{trackIndex}').set('-vn', '-sn', '-dn')
+    out.set('-fflags', '+bitexact', '-flags:a', '+bitexact').stripMetadata()
+    out.set(*audioArgs)
+    encCmd = cmd.build()
+    
+    print(f':: Encoding audio track {trackIndex}: {PurePath(inputPath).name}')
+    returnCode = runFFmpeg(encCmd, f'{PurePath(inputPath).stem} [audio {trackIndex}]', duration)
+    try:
+        if returnCode != 0:
+            os.remove(tempFile)
+            return None
+        os.replace(tempFile, cacheFile)
+        cacheEvict(os.path.dirname(cacheFile), audioCacheLimit)
+    except OSError:
+        return None
+    return cacheFile if os.path.isfile(cacheFile) else None
+
+# audio policy per target container or device
+# codecs / channels: copied when track fits, None for any codec
+# transcode: args used when track doesn't fit, None rejects track
+audioProfiles = {
+    'mp4': {
+        'codecs': [ 'aac', 'mp3', 'ac3', 'eac3', 'alac', 'flac', 'opus' ],
+        'channels': 8,
+        'transcode': aacStereoArgs,
+    },
+    'aac-stereo': {
+        'codecs': [ 'aac' ],
+        'channels': 2,
+        'transcode': aacStereoArgs,
+    },
+    'psp': {
+        'codecs': [ 'aac' ],
+        'channels': 2,
+        'sample_rates': [ '48000', '44100' ],
+        'transcode': aacStereoArgs + [ '-ar', '48000' ],
+    },
+    'mkv': {
+        'codecs': None,
+        'channels': 0,
+        'transcode': None,
+    },
+    'webm': {
+        'codecs': [ 'opus', 'vorbis' ],
+        'channels': 8,
+        'transcode': [ '-c:a', 'libopus', '-b:a', '160k', '-ac', '2' ],
+    },
+}
+
+# (action, args, reason), action: 'copy', 'transcode' or 'reject'
+def audioPolicy(stream: dict, profileName: str) -> tuple:
+    profile = audioProfiles[profileName]
+    codec = stream.get('codec_name', '')
+    channels = int(stream.get('channels', 0) or 0)
+    sampleRate = str(stream.get('sample_rate', ''))
+    
+    problem = ''
+    if codec == '':
+        return 'reject', list(), 'unknown codec'
+    if profile['codecs'] is not None and codec not in profile['codecs']:
+        problem = f'{codec} not allowed in {profileName}'
+    elif profile['channels'] > 0 and channels > profile['channels']:
+        problem = f'{channels}ch above {profile['channels']}ch'
+    elif 'sample_rates' in profile and sampleRate not in profile['sample_rates']:
+        problem = f'{sampleRate}hz not allowed in {profileName}'
+    
+    if problem == '':
+        return 'copy', [ '-c:a', 'copy' ], f'{codec} {channels}ch fits {profileName}'
+    
+    transcode = profile['transcode']
+    if transcode is None:
+        return 'reject', list(), problem
+    encoder = transcode[transcode.index('-c:a') + 1]
+    if not hasEncoder(encoder):
+        return 'reject', list(), f'{problem}, ffmpeg has no {encoder} encoder'
+    return 'transcode', list(transcode), problem
+
+# encoded output cache, key is source fingerprints + ffmpeg args without paths
+# off unless encOutputCache is set, outputs are hardlinked only, never copied
+outputCacheLimit = int(os.environ.get('encOutputCacheSize', '20480')) * 1024 * 1024
+fingerprintSlice = 4 * 1024 * 1024
+fingerprintCache = dict()
+
+# options that only change console output or temp names
+outputCacheSkipArgs = [ '-hide_banner', '-y', '-n', '-stats', '-nostats' ]
+outputCacheSkipOpts = [ '-loglevel', '-v', '-progress', '-stats_period' ]
+
+# size + md5 of head slice + duration, folders by file names and sizes
+def fileFingerprint(inputPath: Path) -> str:
+    inputPath = str(inputPath)
+    try:
+        st = os.stat(inputPath)
+    except OSError:
+        return 'missing'
+    
+    cacheKey = (os.path.abspath(inputPath), st.st_size, st.st_mtime_ns)
+    if cacheKey in fingerprintCache:
+        return fingerprintCache[cacheKey]
+    
+    if os.path.isdir(inputPath):
+        with os.scandir(inputPath) as it:
+            files = sorted((e.name, e.stat().st_size) for e in it if e.is_file())
+        fingerprint = hashlib.md5(json.dumps(files).encode('utf-8')).hexdigest()
+    else:
+        headHash = hashlib.md5()
+        with open(inputPath, 'rb') as f:
+            headHash.update(f.read(fingerprintSlice))
+        duration = 0.0
+        # avisynth scripts are hashed as text
+        fileExt = PurePath(inputPath).suffix.lower()
+        if fileExt in extVideoFile + extAudioFile + extMKVFile + extMP4File and fileExt != '.avs':
+            duration = MediaProbe(inputPath, fields=[ 'format.duration' ]).duration
+        fingerprint = f'{st.st_size}-{headHash.hexdigest()}-{duration:.3f}'
+    
+    fingerprintCache[cacheKey] = fingerprint
+    return fingerprint
+
+# extraPaths: files or folders used inside filters, like subtitles and fonts
+# extraKey: settings passed outside of args, like avisynth env
+def outputCacheKey(encCmd: list, cmdOutputs: list, extraPaths: list = None, extraKey: list = None) -> Optional[str]:
+    if os.environ.get('encOutputCache') is None:
+        return None
     
-    result = subprocess.run(ffProbeCmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
-    result = result.stdout
+    inputPaths = [ str(encCmd[i + 1]) for i, a in enumerate(encCmd[:-1]) if a == '-i' ]
+    replaceMap = dict()
+    for inputPath in inputPaths + [ str(p) for p in (extraPaths or list()) ]:
+        fingerprint = fileFingerprint(inputPath)
+        for pathForm in [ inputPath, fixPath(inputPath), fixPath(inputPath, True) ]:
+            replaceMap[pathForm] = f'<{fingerprint}>'
+    replaceOrder = sorted(replaceMap, key=len, reverse=True)
+    cmdOutputs = [ str(o) for o in cmdOutputs ]
     
+    keyArgs = list()
+    skipNext = False
+    for a in encCmd[1:]:
+        a = str(a)
+        if skipNext:
+            skipNext = False
+            continue
+        if a in outputCacheSkipArgs:
+            continue
+        if a in outputCacheSkipOpts:
+            skipNext = True
+            continue
+        if a in cmdOutputs:
+            keyArgs.append(f'<output{PurePath(a).suffix}>')
+            continue
+        for pathForm in replaceOrder:
+            a = a.replace(pathForm, replaceMap[pathForm])
+        keyArgs.append(a)
+    
+    keyArgs.extend([ str(k) for k in (extraKey or list()) ])
+    return hashlib.sha1(json.dumps(keyArgs).encode('utf-8')).hexdigest()
+
+def outputCacheFiles(cacheKey: str, outFiles: list) -> Optional[list]:
+    cachePath = getCacheDir('outputs')
+    if cachePath is None:
+        return None
+    return [ os.path.join(cachePath, f'{cacheKey}-{i}{PurePath(outFile).suffix}') for i, outFile in enumerate(outFiles) ]
+
+def removeFiles(files: list):
+    for file in files:
+        try:
+            os.remove(file)
+        except OSError:
+            pass
+
+# place cached outputs, False when any is missing or output already exists
+# placed links that fail validation are removed with their cache entry
+def fetchCachedOutputs(cacheKey: Optional[str], outFiles: list, duration: float = 0.0) -> bool:
+    if cacheKey is None or any(os.path.exists(f) for f in outFiles):
+        return False
+    cacheFiles = outputCacheFiles(cacheKey, outFiles)
+    if cacheFiles is None or not all(os.path.isfile(f) for f in cacheFiles):
+        return False
+    
+    placed = list()
+    try:
+        for cacheFile, outFile in zip(cacheFiles, outFiles):
+            os.utime(cacheFile)
+            os.link(cacheFile, outFile)
+            placed.append(outFile)
+    except OSError:
+        removeFiles(placed)
+        return False
+    
+    if not all(validateOutput(outFile, duration) for outFile in outFiles):
+        print(':: Cached output is not valid, encoding again')
+        removeFiles(placed + cacheFiles)
+        return False
+    return True
+
+# hardlinks only, outputs on other drive are not cached
+def storeCachedOutputs(cacheKey: Optional[str], outFiles: list):
+    if cacheKey is None:
+        return
+    cacheFiles = outputCacheFiles(cacheKey, outFiles)
+    if cacheFiles is None:
+        return
+    
+    try:
+        for cacheFile, outFile in zip(cacheFiles, outFiles):
+            if not os.path.exists(cacheFile):
+                os.link(outFile, cacheFile)
+        cacheEvict(os.path.dirname(cacheFiles[0]), outputCacheLimit)
+    except OSError:
+        pass
+
+# encode worker pool, thread budget split between parallel jobs
+# encThreads: total threads for all jobs, 0 = let ffmpeg decide
+encodeThreads = int(os.environ.get('encThreads', '0'))
+encodeJobs = int(os.environ.get('encJobs', '1'))
+
+class EncodeJob:
+    # overwrite: replace existing outputs the manifest doesn't know
+    def __init__(self, threads: int = 0, logged: bool = False, manifest: 'BatchManifest' = None, jobId: str = None, overwrite: bool = False):
+        self.threads = threads
+        self.logged = logged
+        self.manifest = manifest
+        self.jobId = jobId
+        self.overwrite = overwrite
+        self.failed = False
+    
+    # decoder and filter threads, goes before input
+    def inputArgs(self) -> list:
+        if self.threads < 1:
+            return list()
+        return [ '-threads', str(self.threads), '-filter_complex_threads', str(self.threads), ]
+    
+    # encoder threads, per output
+    def outputArgs(self, outputs: int = 1) -> list:
+        if self.threads < 1:
+            return list()
+        return [ '-threads', str(max(1, self.threads // outputs)), ]
+    
+    # parallel jobs write ffmpeg output to own log file
+    def run(self, encCmd: list, logName: str, env: dict = None, duration: float = 0.0) -> int:
+        jobInfo = { 'threads': self.threads, 'parallel': self.logged }
+        if not self.logged:
+            return runFFmpeg(encCmd, logName, duration, env, jobInfo=jobInfo)
+        
+        logPath = getCacheDir('logs')
+        logFile = os.path.join(logPath, f'{logName}.log') if logPath is not None else os.devnull
+        returnCode = runFFmpeg(encCmd, logName, duration, env, logFile, jobInfo)
+        if returnCode != 0:
+            print(f':: Failed: {logName}, log: {logFile}')
+        return returnCode
+    
+    # ffmpeg writes here, renamed to outFile only when finished and valid
+    def partFile(self, outFile: str) -> str:
+        outFile = PurePath(outFile)
+        return str(outFile.with_name(f'{outFile.stem}.part{outFile.suffix}'))
+    
+    # final command line, settings passed outside of args go to extraKey
+    def commandKey(self, encCmd: list, extraKey: list = None) -> str:
+        keyArgs = [ str(a) for a in encCmd ] + [ str(k) for k in (extraKey or list()) ]
+        return hashlib.sha1(json.dumps(keyArgs).encode('utf-8')).hexdigest()
+    
+    # existing outputs, True when job has nothing to encode
+    # same command in manifest reuses them, outputs the manifest doesn't know are kept unless overwrite is set
+    def reuseOutputs(self, outFiles: list, duration: float, encCmd: list, extraKey: list = None) -> bool:
+        existing = [ outFile for outFile in outFiles if os.path.exists(outFile) ]
+        if len(existing) < 1:
+            return False
+        
+        if self.manifest is not None:
+            commandKey = self.commandKey(encCmd, extraKey)
+            if all(self.manifest.hasOutput(self.jobId, outFile, commandKey) for outFile in outFiles):
+                if all(validateOutput(outFile, duration) for outFile in outFiles):
+                    print(f'\n:: Already encoded: {', '.join([ PurePath(f).name for f in outFiles ])}')
+                    return True
+        
+        unknown = [ outFile for outFile in existing if self.manifest is None or not self.manifest.hasOutput(self.jobId, outFile) ]
+        if len(unknown) > 0 and not self.overwrite:
+            for outFile in unknown:
+                print(f'\n:: Output exists and is not from this batch, kept: {PurePath(outFile).name}')
+            print(':: Use --overwrite to replace it')
+            return True
+        
+        for outFile in existing:
+            reason = 'not from this batch, replacing' if outFile in unknown else 'from other settings, encoding again'
+            print(f':: Output {reason}: {PurePath(outFile).name}')
+        return False
+    
+    # outputs placed without encode, like from output cache
+    def recordOutputs(self, outFiles: list, duration: float, encCmd: list, extraKey: list = None):
+        if self.manifest is None:
+            return
+        commandKey = self.commandKey(encCmd, extraKey)
+        for outFile in outFiles:
+            self.manifest.addOutput(self.jobId, outFile, duration, commandKey)
+    
+    def finish(self, outFiles: list, returnCode: int, duration: float, encCmd: list = None, extraKey: list = None) -> bool:
+        finished = True
+        for outFile in outFiles:
+            tempFile = self.partFile(outFile)
+            if returnCode == 0 and validateOutput(tempFile, duration):
+                os.replace(tempFile, outFile)
+                if self.manifest is not None and encCmd is not None:
+                    self.manifest.addOutput(self.jobId, outFile, duration, self.commandKey(encCmd, extraKey))
+                continue
+            
+            finished = False
+            self.failed = True
+            if returnCode == 0:
+                print(f':: Output duration does not match source: {PurePath(outFile).name}')
+            try:
+                os.remove(tempFile)
+            except OSError:
+                pass
+        return finished
+
+# output exists and container duration is close to source
+def validateOutput(outFile: str, duration: float) -> bool:
     try:
-        result = result.decode('utf-8')
-    except:
-        result = result.decode('ISO-8859-1')
+        if os.path.getsize(outFile) < 1:
+            return False
+    except OSError:
+        return False
+    
+    if duration <= 0:
+        return True
+    outDuration = MediaProbe(outFile, fields=[ 'format.duration' ]).duration
+    return abs(outDuration - duration) <= max(1.0, duration * 0.01)
+
+# batch manifest, planned jobs with params, state and outputs with the command that wrote them
+class BatchManifest:
+    def __init__(self, batchName: str, inputPath: Path):
+        inputPath = os.path.abspath(inputPath)
+        batchKey = hashlib.sha1(json.dumps([ batchName, inputPath ]).encode('utf-8')).hexdigest()
+        cachePath = getCacheDir('batches')
+        self.path = os.path.join(cachePath, f'{batchKey}.json') if cachePath is not None else None
+        self.lock = threading.Lock()
+        self.data = { 'batch': batchName, 'input': inputPath, 'jobs': dict() }
+        
+        if self.path is not None and os.path.isfile(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if isinstance(data, dict) and isinstance(data.get('jobs'), dict):
+                    self.data = data
+            except (OSError, ValueError):
+                pass
+    
+    @property
+    def jobs(self) -> dict:
+        return self.data['jobs']
+    
+    # callers hold the lock
+    def save(self):
+        if self.path is None:
+            return
+        tempFile = f'{self.path}.{os.getpid()}.tmp'
+        try:
+            with open(tempFile, 'w', encoding='utf-8') as f:
+                json.dump(self.data, f, ensure_ascii=False, indent=1)
+            os.replace(tempFile, self.path)
+        except OSError:
+            pass
     
-    lwiCreate = re.search(r'^Creating lwi index file .*', result, flags=re.M)
-    if lwiCreate:
+    # changed params start the job over, outputs stay known with the command that wrote them
+    def plan(self, jobId: str, params: list):
+        with self.lock:
+            job = self.jobs.get(jobId)
+            if job is None or job.get('params') != params:
+                outputs = job.get('outputs', dict()) if job is not None else dict()
+                self.jobs[jobId] = { 'params': params, 'state': 'planned', 'outputs': outputs }
+                self.save()
+    
+    def setState(self, jobId: str, state: str):
+        with self.lock:
+            job = self.jobs[jobId]
+            job['state'] = state
+            job['updated'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+            self.save()
+    
+    # commandKey: EncodeJob.commandKey of the command that wrote outFile
+    def addOutput(self, jobId: str, outFile: str, duration: float, commandKey: str):
+        with self.lock:
+            self.jobs[jobId]['outputs'][outFile] = { 'duration': duration, 'command': commandKey }
+            self.save()
+    
+    # without commandKey any recorded command matches
+    def hasOutput(self, jobId: str, outFile: str, commandKey: str = None) -> bool:
+        job = self.jobs.get(jobId)
+        if job is None:
+            return False
+        output = job['outputs'].get(outFile)
+        if not isinstance(output, dict):
+            return False
+        return commandKey is None or output.get('command') == commandKey
+
+# json params of a job item, probe objects are not part of the key
+def jobParams(jobItem: tuple) -> list:
+    return [ a for a in jobItem[1:] if a is None or isinstance(a, (str, int, float, bool)) ]
+
+def runEncodeJob(encodeFunc, jobItem: tuple, encJob: EncodeJob):
+    manifest = encJob.manifest
+    if manifest is not None:
+        manifest.setState(encJob.jobId, 'running')
+    try:
+        encodeFunc(*jobItem, encJob)
+    except BaseException:
+        if manifest is not None:
+            manifest.setState(encJob.jobId, 'failed')
+        raise
+    if manifest is not None:
+        manifest.setState(encJob.jobId, 'failed' if encJob.failed else 'done')
+
+def runEncodeJobs(encodeFunc, jobItems: list, jobs: int = encodeJobs, threads: int = encodeThreads, manifest: BatchManifest = None, overwrite: bool = False):
+    if manifest is not None:
+        for jobItem in jobItems:
+            manifest.plan(str(jobItem[0]), jobParams(jobItem))
+        # done jobs still build their command, outputs are reused only when it matches
+        doneJobs = len([ jobItem for jobItem in jobItems if manifest.jobs[str(jobItem[0])]['state'] == 'done' ])
+        if doneJobs > 0:
+            print(f':: Resuming batch, {doneJobs} of {len(jobItems)} jobs done before')
+    
+    if jobs < 2 or len(jobItems) < 2:
+        for jobItem in jobItems:
+            runEncodeJob(encodeFunc, jobItem, EncodeJob(threads, False, manifest, str(jobItem[0]), overwrite))
+        return
+    
+    jobs = min(jobs, len(jobItems))
+    totalThreads = threads if threads > 0 else (os.cpu_count() or 1)
+    jobThreads = max(1, totalThreads // jobs)
+    print(f':: Running {jobs} jobs, {jobThreads} threads each\n')
+    
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = list()
+        for jobItem in jobItems:
+            encJob = EncodeJob(jobThreads, True, manifest, str(jobItem[0]), overwrite)
+            futures.append(pool.submit(runEncodeJob, encodeFunc, jobItem, encJob))
+        for jobItem, future in zip(jobItems, futures):
+            try:
+                future.result()
+            except Exception as err:
+                print(f':: Job failed: {PurePath(str(jobItem[0])).name}')
+                print(f':: {type(err).__name__}: {err}')
+
+# tool capabilities, cached per binary path and mtime
+toolVersionArgs = {
+    'ffmpeg': '-version',
+    'ffprobe': '-version',
+    'mkvmerge': '--version',
+    'mkvextract': '--version',
+    'MP4Box': '-version',
+    'mp4box': '-version',
+}
+toolInfoCache = dict()
+
+def runToolText(toolCmd: list) -> str:
+    try:
+        result = subprocess.run(toolCmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, timeout=60)
+    except (OSError, subprocess.SubprocessError):
+        return ''
+    return decodeOutput(result.stdout)
+
+def parseFFmpegEncoders(text: str) -> list:
+    encoders = list()
+    listStarted = False
+    for line in text.splitlines():
+        parts = line.split()
+        if line.strip() == '------':
+            listStarted = True
+        elif listStarted and len(parts) > 1:
+            encoders.append(parts[1])
+    return encoders
+
+def parseFFmpegFilters(text: str) -> list:
+    return [ p[1] for p in (line.split() for line in text.splitlines()) if len(p) > 2 and '->' in p[2] ]
+
+def parseFFmpegHWAccels(text: str) -> Optional[list]:
+    lines = text.splitlines()
+    for i, line in enumerate(lines):
+        if line.startswith('Hardware acceleration methods:'):
+            return [ l.strip() for l in lines[i + 1:] if l.strip() != '' ]
+    return None
+
+def discoverTool(tool: str, toolPath: str) -> dict:
+    toolInfo = dict()
+    versionText = runToolText([ toolPath, toolVersionArgs.get(tool, '--version') ]).strip()
+    if versionText != '':
+        toolInfo['version'] = versionText.splitlines()[0]
+    
+    # empty lists mean the tool failed, keep them unknown
+    if tool == 'ffmpeg':
+        encoders = parseFFmpegEncoders(runToolText([ toolPath, '-hide_banner', '-encoders' ]))
+        filters = parseFFmpegFilters(runToolText([ toolPath, '-hide_banner', '-filters' ]))
+        hwaccels = parseFFmpegHWAccels(runToolText([ toolPath, '-hide_banner', '-hwaccels' ]))
+        if len(encoders) > 0:
+            toolInfo['encoders'] = encoders
+        if len(filters) > 0:
+            toolInfo['filters'] = filters
+        if hwaccels is not None:
+            toolInfo['hwaccels'] = hwaccels
+    return toolInfo
+
+def getToolInfo(tool: str) -> dict:
+    toolPath = shutil.which(tool)
+    if toolPath is None:
+        return dict()
+    try:
+        st = os.stat(toolPath)
+    except OSError:
+        return dict()
+    
+    toolKey = [ toolPath, st.st_mtime_ns, st.st_size ]
+    memoKey = tuple(toolKey)
+    if memoKey in toolInfoCache:
+        return toolInfoCache[memoKey]
+    
+    cacheFile = None
+    cachePath = getCacheDir('tools')
+    if cachePath is not None:
+        cacheName = hashlib.sha1(f'{tool}:{toolPath}'.encode('utf-8')).hexdigest()
+        cacheFile = os.path.join(cachePath, f'{cacheName}.json')
+    
+    toolInfo = None
+    try:
+        if cacheFile is not None:
+            with open(cacheFile, 'r', encoding='utf-8') as f:
+                cacheData = json.load(f)
+            if cacheData['key'] == toolKey:
+                toolInfo = cacheData['info']
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    
+    if toolInfo is None:
+        toolInfo = discoverTool(tool, toolPath)
+        try:
+            if cacheFile is not None:
+                tempFile = f'{cacheFile}.{os.getpid()}.tmp'
+                with open(tempFile, 'w', encoding='utf-8') as f:
+                    json.dump({ 'key': toolKey, 'info': toolInfo }, f)
+                os.replace(tempFile, cacheFile)
+        except OSError:
+            pass
+    
+    toolInfoCache[memoKey] = toolInfo
+    return toolInfo
+
+def toolVersion(tool: str) -> str:
+    return getToolInfo(tool).get('version', '')
+
+# unknown capabilities count as available, ffmpeg will report the error
+def hasEncoder(encoder: str, tool: str = 'ffmpeg') -> bool:
+    toolInfo = getToolInfo(tool)
+    return 'encoders' not in toolInfo or encoder in toolInfo['encoders']
+
+def hasFilter(filterName: str, tool: str = 'ffmpeg') -> bool:
+    toolInfo = getToolInfo(tool)
+    return 'filters' not in toolInfo or filterName in toolInfo['filters']
+
+# skip hwaccel probing when ffmpeg is built without any
+def hwAccelArgs(tool: str = 'ffmpeg') -> list:
+    toolInfo = getToolInfo(tool)
+    if 'hwaccels' in toolInfo and len(toolInfo['hwaccels']) < 1:
+        return list()
+    return [ '-hwaccel', 'auto', ]
+
+# ffprobe diagnostics
+probeLogTypes = [
+    ( 'lwi',      'Creating lwi index file ' ),
+    ( 'libass',   'libass: ' ),
+    ( 'avisynth', '[avisynth ' ),
+]
+
+def parseProbeLog(logText: str) -> list:
+    probeLog = list()
+    for logLine in logText.splitlines():
+        logLine = logLine.strip()
+        if logLine == '':
+            continue
+        logType = 'ffprobe'
+        for checkType, checkPrefix in probeLogTypes:
+            if logLine.startswith(checkPrefix):
+                logType = checkType
+                break
+        probeLog.append({ 'type': logType, 'text': logLine })
+    return probeLog
+
+def printProbeLog(probeLog: list, showLog: bool = False):
+    if any(l['type'] == 'lwi' for l in probeLog):
         print(f'[:info:] LWI Index file created!')
     if showLog:
-        libassLog = re.findall(r'^libass: .*', result, flags=re.M)
-        if libassLog:
-            print()
-            for i in range(len(libassLog)):
-                print(f'[:info:] {libassLog[i]}')
-        avisynthLog = re.findall(r'^\[avisynth .*', result, flags=re.M)
-        if avisynthLog:
-            print()
-            for i in range(len(avisynthLog)):
-                print(f'[:info:] {avisynthLog[i]}')
-    result = re.sub(r'^Creating lwi index file .*', '', result, flags=re.M)
-    result = re.sub(r'^libass: .*', '', result, flags=re.M)
-    result = re.sub(r'^\[avisynth .*', '', result, flags=re.M)
-    result = re.sub(r'^\w.*', '', result, flags=re.M)
-    result = re.sub(r'^\(.*', '', result, flags=re.M)
+        for logType in [ 'libass', 'avisynth' ]:
+            logLines = [ l['text'] for l in probeLog if l['type'] == logType ]
+            if logLines:
+                print()
+                for logLine in logLines:
+                    print(f'[:info:] {logLine}')
+    for logLine in probeLog:
+        if logLine['type'] == 'error':
+            print(f':: {logLine['text']}')
+
+# run ffprobe
+def runFFProbe(ffProbeCmd: list) -> tuple:
+    result = subprocess.run(ffProbeCmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    probeLog = parseProbeLog(decodeOutput(result.stderr))
+    data = None
     
     try:
-        result = json.loads(result)
-    except:
-        print(':: FAILED TO GET MEDIA DATA')
+        data = json.loads(result.stdout)
+    except ValueError:
+        # avisynth plugins can write to stdout before json
+        resultText = decodeOutput(result.stdout)
+        jsonStart = 0 if resultText.startswith('{') else resultText.find('\n{') + 1
+        try:
+            data, _ = json.JSONDecoder().raw_decode(resultText, jsonStart)
+            probeLog.extend(parseProbeLog(resultText[:jsonStart]))
+        except ValueError:
+            pass
+    
+    if data is None or result.returncode != 0:
+        errorText = [ l['text'] for l in probeLog if l['type'] == 'ffprobe' ]
+        errorText = f': {errorText[-1]}' if len(errorText) > 0 else ''
+        probeLog.append({ 'type': 'error', 'text': f'FAILED TO GET MEDIA DATA{errorText}' })
+        data = dict()
+    
+    return data, probeLog
+
+# ffprobe fields used by scripts
+probeFields = [
+    'codec_name', 'codec_tag_string', 'width', 'height', 'channels', 'sample_rate',
+    'tags.language', 'tags.title', 'tags.NUMBER_OF_BYTES', 'format.duration',
+]
+
+# video stream copy, source already inside target needs no encode
+# bitrate in kbps for 1920x1080, scaled by pixel count
+webVideoTarget = {
+    'codec': 'h264',
+    'profiles': [ 'Constrained Baseline', 'Baseline', 'Main', 'High' ],
+    'level': 42,
+    'pix_fmts': [ 'yuv420p', 'yuvj420p' ],
+    'bitrate': 8000,
+}
+videoCopyFields = [
+    'codec_name', 'profile', 'level', 'pix_fmt', 'width', 'height', 'bit_rate',
+    'sample_aspect_ratio', 'field_order', 'format.bit_rate', 'format.size', 'format.duration',
+]
+
+# (copy, reason), filtered: name of filter that needs decode like 'hardsubs'
+def videoCopyDecision(inputPath: Path, target: dict, width: int, height: int, filtered: str = '') -> tuple:
+    if filtered != '':
+        return False, f'{filtered} needs encode'
+    
+    probe = MediaProbe(inputPath, fields=videoCopyFields)
+    if len(probe.video) < 1:
+        return False, 'no video stream'
+    v = probe.video[0]
+    
+    codec = v.get('codec_name', 'unknown')
+    if codec != target['codec']:
+        return False, f'codec {codec} is not {target['codec']}'
+    profile = v.get('profile', 'unknown')
+    if profile not in target['profiles']:
+        return False, f'profile {profile} not allowed'
+    level = int(v.get('level', 0) or 0)
+    if level < 1 or level > target['level']:
+        return False, f'level {level / 10:.1f} above {target['level'] / 10:.1f}'
+    pixFmt = v.get('pix_fmt', 'unknown')
+    if pixFmt not in target['pix_fmts']:
+        return False, f'pixel format {pixFmt}'
+    
+    srcWidth, srcHeight = int(v.get('width', 0)), int(v.get('height', 0))
+    if srcWidth != int(width) or srcHeight != int(height):
+        return False, f'{srcWidth}x{srcHeight} needs scale to {width}x{height}'
+    sar = v.get('sample_aspect_ratio', '1:1')
+    if sar not in [ '1:1', '0:1', 'N/A' ]:
+        return False, f'sample aspect ratio {sar}'
+    fieldOrder = v.get('field_order', 'progressive')
+    if fieldOrder not in [ 'progressive', 'unknown' ]:
+        return False, f'interlaced ({fieldOrder})'
+    
+    # mkv has no stream bitrate, whole file is the upper bound
+    bitRate = v.get('bit_rate', probe.format.get('bit_rate', ''))
+    if not str(bitRate).isdigit() and probe.duration > 0:
+        bitRate = int(probe.format.get('size', 0)) * 8 / probe.duration
+    bitRate = int(bitRate or 0) / 1000
+    maxRate = target['bitrate'] * srcWidth * srcHeight / (1920 * 1080)
+    if bitRate > maxRate:
+        return False, f'bitrate {bitRate:.0f}k above {maxRate:.0f}k'
+    
+    return True, f'{codec} {profile} L{level / 10:.1f} {pixFmt} {srcWidth}x{srcHeight} {bitRate:.0f}k fits target'
+
+# filter chain for one rendition, scale first so format, deband and subtitles run at output size
+# subsFilter: 'subtitles=...' for text subs, '[0:s:N]' for bitmap subs stream, '' for none
+# libass gets source size to keep positions, bitmap subs are scaled to frame by scale2ref
+def renditionFilters(graph: FilterGraph, inLabel: str, outLabel: str, scale: str, deband: bool, subsFilter: str, sourceSize: str) -> FilterGraph:
+    chain = [ scale, 'format=yuv420p', 'deband' if deband else '' ]
+    if subsFilter == '' or subsFilter.startswith('subtitles='):
+        chain.append(f'{subsFilter}:original_size={sourceSize}' if scale != '' and subsFilter != '' else subsFilter)
+        return graph.chain(inLabel, chain, outLabel)
+    
+    base = linkName(outLabel)
+    graph.chain(inLabel, chain, f'{base}b')
+    if scale != '':
+        graph.chain([ subsFilter, f'{base}b' ], [ 'scale2ref' ], [ f'{base}s', f'{base}r' ])
+        return graph.chain([ f'{base}r', f'{base}s' ], [ 'overlay' ], outLabel)
+    return graph.chain([ f'{base}b', subsFilter ], [ 'overlay' ], outLabel)
+
+# fields to -show_entries: 'width', 'tags.title', 'format.duration', 'format.tags.title'
+def probeEntries(fields: list) -> str:
+    sections = { 'stream': [ 'index', 'codec_type' ], 'stream_tags': [], 'format': [], 'format_tags': [] }
+    for field in fields:
+        if field.startswith('format.tags.'):
+            sections['format_tags'].append(field[12:])
+        elif field.startswith('format.'):
+            sections['format'].append(field[7:])
+        elif field.startswith('tags.'):
+            sections['stream_tags'].append(field[5:])
+        else:
+            sections['stream'].append(field)
+    
+    entries = list()
+    for section, sectionFields in sections.items():
+        if len(sectionFields) > 0:
+            entries.append(f'{section}={','.join(dict.fromkeys(sectionFields))}')
+    return ':'.join(entries)
+
+# ffprobe command line
+def ffprobeCommand(inputPath: Path, streamType: str = '', fields: list = None) -> list:
+    ffProbeCmd = list()
+    ffProbeCmd.extend([ r'ffprobe', '-v', 'error', '-hide_banner', ])
+    if fields is None:
+        ffProbeCmd.extend([ '-print_format', 'json', '-show_format', '-show_streams', ])
+    else:
+        ffProbeCmd.extend([ '-print_format', 'json', '-show_entries', probeEntries(fields), ])
+    if streamType != '':
+        ffProbeCmd.extend([ '-select_streams', streamType, ])
+    ffProbeCmd.extend([ inputPath ])
+    return ffProbeCmd
+
+# get data from video file
+def getMediaData(inputPath: Path, streamType: str = '', showLog: bool = False, returnLog: bool = False, fields: list = None) -> dict:
+    ffProbeCmd = ffprobeCommand(inputPath, streamType, fields)
+    
+    probeLog = list()
+    result = None
+    if streamType in [ '', 'v', 'a', 's', 'd', 't' ]:
+        result = readProbeNative('media', inputPath, fields)
+    if result is not None and streamType != '':
+        codecType = MediaProbe.streamTypes[streamType]
+        result['streams'] = [ s for s in result['streams'] if s.get('codec_type') == codecType ]
+    if result is None:
+        result = probeCacheGet(inputPath, ffProbeCmd)
+    if result is None:
+        result, probeLog = runFFProbe(ffProbeCmd)
+        printProbeLog(probeLog, showLog)
+        if 'streams' in result:
+            probeCacheSet(inputPath, ffProbeCmd, result)
     
     result = result if 'streams' in result else {'streams':list()}
     result = result if streamType == '' else result['streams']
+    
+    if returnLog:
+        return result, probeLog
     return result
 
+# single probe with per stream type views
+class MediaProbe:
+    streamTypes = { 'v': 'video', 'a': 'audio', 's': 'subtitle', 'd': 'data', 't': 'attachment' }
+    
+    def __init__(self, inputPath: Path, showLog: bool = False, fields: list = None):
+        self.path = inputPath
+        self.showLog = showLog
+        self.fields = fields
+        self.log = list()
+    
+    @cached_property
+    def data(self) -> dict:
+        data, self.log = getMediaData(self.path, '', self.showLog, True, self.fields)
+        return data
+    
+    def streams(self, streamType: str = '') -> list:
+        if streamType == '':
+            return self.data['streams']
+        codecType = self.streamTypes[streamType]
+        return [ s for s in self.data['streams'] if s.get('codec_type') == codecType ]
+    
+    @cached_property
+    def video(self) -> list:
+        return self.streams('v')
+    
+    @cached_property
+    def audio(self) -> list:
+        return self.streams('a')
+    
+    @cached_property
+    def subs(self) -> list:
+        return self.streams('s')
+    
+    @cached_property
+    def attachments(self) -> list:
+        return self.streams('t')
+    
+    def load(self):
+        self.data
+        return self
+    
+    @property
+    def format(self) -> dict:
+        return self.data['format'] if 'format' in self.data else dict()
+    
+    @property
+    def duration(self) -> float:
+        try:
+            return float(self.format['duration'])
+        except (KeyError, ValueError):
+            return 0.0
+
+# fields the native readers answers same as ffprobe
+# NUMBER_OF_BYTES is never set by ffprobe for mp4 tracks, both leave it out
+# mp4 track titles from trak/udta are not read, ffprobe versions differ there
+# (6.0 moves ©nam to format title, newer ones set stream title), so titles go to ffprobe
+mp4NativeFields = [
+    'codec_name', 'codec_tag_string', 'width', 'height', 'channels', 'sample_rate', 'duration',
+    'tags.language', 'tags.handler_name', 'tags.NUMBER_OF_BYTES',
+    'format.duration', 'format.size', 'format.format_name', 'format.nb_streams',
+]
+mkvNativeFields = [
+    'codec_name', 'codec_tag_string', 'width', 'height', 'channels', 'sample_rate',
+    'tags.language', 'tags.title', 'tags.NUMBER_OF_BYTES', 'tags.filename', 'tags.mimetype',
+    'format.duration',
+]
+
+# probe backends
+# kind: 'media' ffprobe like, 'mkv' mkvmerge -J like, 'mediainfo' MediaInfo JSON
+# tool: external binary, None for python readers
+# exts / fields: containers and projected fields it can answer, None for any
+class ProbeBackend:
+    toolPaths = dict()
+    
+    def __init__(self, name: str, kind: str, reader, tool: str = None, exts: list = None, fields: list = None):
+        self.name = name
+        self.kind = kind
+        self.reader = reader
+        self.tool = tool
+        self.exts = exts
+        self.fields = fields
+    
+    def available(self) -> bool:
+        if self.tool is None:
+            return True
+        if self.tool not in self.toolPaths:
+            self.toolPaths[self.tool] = shutil.which(self.tool)
+        return self.toolPaths[self.tool] is not None
+    
+    def supports(self, inputPath: Path, fields: list = None) -> bool:
+        if self.exts is not None and PurePath(inputPath).suffix.lower() not in self.exts:
+            return False
+        if self.fields is not None and (fields is None or any(f not in self.fields for f in fields)):
+            return False
+        return self.available()
+    
+    # uncached read, None if backend can't read file
+    def read(self, inputPath: Path, fields: list = None) -> Optional[dict]:
+        try:
+            result = self.reader(inputPath, fields)
+        except (MKVReadError, MP4ReadError, OSError, ValueError, IndexError, KeyError, TypeError, struct.error):
+            return None
+        return result if result else None
+
+def readMKVMedia(inputPath: Path) -> Optional[dict]:
+    mkvData = readMKVNative(inputPath)
+    return mkvToMediaData(mkvData) if mkvData is not None else None
+
+probeBackends = [
+    ProbeBackend('mp4native', 'media', lambda p, f: readMP4Data(p), exts=extMP4File, fields=mp4NativeFields),
+    ProbeBackend('mkvnative', 'media', lambda p, f: readMKVMedia(p), exts=extMKVFile, fields=mkvNativeFields),
+    ProbeBackend('ffprobe', 'media', lambda p, f: runFFProbe(ffprobeCommand(p, '', f))[0], 'ffprobe'),
+    ProbeBackend('mkvnative', 'mkv', lambda p, f: readMKVNative(p), exts=extMKVFile),
+    ProbeBackend('mkvmerge', 'mkv', lambda p, f: runJSONTool([ 'mkvmerge', '-J', p ])[0], 'mkvmerge'),
+    ProbeBackend('mediainfo', 'mediainfo', lambda p, f: runJSONTool([ 'MediaInfo', '--Output=JSON', p ])[0], 'MediaInfo'),
+]
+
+def registerProbeBackend(backend: ProbeBackend):
+    probeBackends.append(backend)
+
+# recorded backend order per kind and container, written by probe benchmark
+probeRanks = None
+
+def probeRanksFile() -> Optional[str]:
+    cachePath = getCacheDir()
+    return os.path.join(cachePath, 'probe-backends.json') if cachePath is not None else None
+
+def getProbeRanks() -> dict:
+    global probeRanks
+    if probeRanks is None:
+        ranks = dict()
+        ranksFile = probeRanksFile()
+        try:
+            if ranksFile is not None:
+                with open(ranksFile, 'r', encoding='utf-8') as f:
+                    ranks = json.load(f)
+        except (OSError, ValueError):
+            pass
+        probeRanks = ranks if isinstance(ranks, dict) else dict()
+    return probeRanks
+
+def setProbeRanks(kind: str, fileExt: str, names: list):
+    ranks = getProbeRanks()
+    ranks.setdefault(kind, dict())[fileExt] = names
+    ranksFile = probeRanksFile()
+    if ranksFile is None:
+        return
+    try:
+        tempFile = f'{ranksFile}.{os.getpid()}.tmp'
+        with open(tempFile, 'w', encoding='utf-8') as f:
+            json.dump(ranks, f, indent=4)
+        os.replace(tempFile, ranksFile)
+    except OSError:
+        pass
+
+# backends able to answer query, recorded order first, python readers before tools by default
+def probeBackendOrder(kind: str, inputPath: Path, fields: list = None) -> list:
+    fileExt = PurePath(inputPath).suffix.lower()
+    ranked = getProbeRanks().get(kind, dict()).get(fileExt, list())
+    backends = [ b for b in probeBackends if b.kind == kind and b.supports(inputPath, fields) ]
+    rankKey = lambda b: (ranked.index(b.name) if b.name in ranked else len(ranked), b.tool is not None)
+    return sorted(backends, key=rankKey)
+
+# try python readers ranked before the external tool
+def readProbeNative(kind: str, inputPath: Path, fields: list = None) -> Optional[dict]:
+    if os.environ.get('encNoNativeProbe') is not None:
+        return None
+    for backend in probeBackendOrder(kind, inputPath, fields):
+        if backend.tool is not None:
+            return None
+        result = backend.read(inputPath, fields)
+        if result is not None:
+            return result
+    return None
+
+# probe files in parallel, results in input order
+probeJobs = int(os.environ.get('encProbeJobs', min(8, os.cpu_count() or 1)))
+
+def probe_many(paths: list, kind: str = 'ffprobe', jobs: int = probeJobs, showLog: bool = False, fields: list = None) -> list:
+    if kind == 'ffprobe':
+        probeFunc = lambda p: getMediaData(p, '', showLog, False, fields)
+    elif kind == 'mkvmerge':
+        probeFunc = getMKVData
+    elif kind == 'mediainfo':
+        probeFunc = getMediaInfo
+    elif kind == 'probe':
+        probeFunc = lambda p: MediaProbe(p, showLog, fields).load()
+    else:
+        raise ValueError(f'Unknown probe kind: {kind}')
+    
+    if len(paths) < 2 or jobs < 2:
+        return [ probeFunc(p) for p in paths ]
+    
+    with ThreadPoolExecutor(max_workers=min(jobs, len(paths))) as pool:
+        return list(pool.map(probeFunc, paths))
+
 def audioTitle(audioData: dict, trackId: int, returnCodec: bool = False) -> str:
     a = audioData[trackId]
     
@@ -343,7 +1769,8 @@ def subsTitle(subsData: dict, trackId: int, returnCodec: bool = False) -> str:
         return tname
 
 # find subs files
-def searchSubsFile(inputPath: Path, searchExtSubsFile: list = extSubsFile):
+def searchSubsFile(inputPath: Path, searchExtSubsFile: list = extSubsFile, probe: MediaProbe = None):
+    Choice = requireModule('questionary').Choice
     subsData = argparse.Namespace()
     subsData.root = str(PurePath(inputPath).parent)
     subsData.prefix = str(PurePath(inputPath).stem)
@@ -354,7 +1781,12 @@ def searchSubsFile(inputPath: Path, searchExtSubsFile: list = extSubsFile):
     subsData.inf = dict()
     
     if inFileExt == '.mkv':
-        subsDataMKV = getMediaData(inputPath, 's')
+        mkvData = readMKVNative(inputPath) if probe is None else None
+        if mkvData is not None:
+            subsDataMKV = [ s for s in mkvToMediaData(mkvData)['streams'] if s['codec_type'] == 'subtitle' ]
+        else:
+            probe = probe if probe is not None else MediaProbe(inputPath)
+            subsDataMKV = probe.subs
         if len(subsDataMKV) > 0:
             fileIdx += 1
             for t in range(len(subsDataMKV)):
@@ -362,7 +1794,8 @@ def searchSubsFile(inputPath: Path, searchExtSubsFile: list = extSubsFile):
                 track_id   = f'{fileIdx}:{t}'
                 track_name, codec = subsTitle(subsDataMKV, t, True)
                 
-                subsData.inf[track_id] = { "file": inputPath, "codec": codec, "title": track_name, "ext": False }
+                subsLang = subsDataMKV[t].get('tags', dict()).get('language', '')
+                subsData.inf[track_id] = { "file": inputPath, "codec": codec, "title": track_name, "ext": False, "lang": subsLang }
                 subsData.sel.append(Choice(f'[{track_id}]: [MKV] {track_name}', value=track_id))
     
     extSubs = searchMedia(subsData.root, subsData.prefix, searchExtSubsFile)
@@ -370,23 +1803,187 @@ def searchSubsFile(inputPath: Path, searchExtSubsFile: list = extSubsFile):
         fileIdx += 1
         track_id = f'{fileIdx}:0'
         
-        subsData.inf[track_id] = { "file": s.path, "codec": s.ext, "title": s.name, "ext": True }
+        # language from name like 'Show - 01.jpn.ass'
+        nameParts = PurePath(s.name).suffixes
+        subsLang = nameParts[-2][1:] if len(nameParts) > 1 and re.fullmatch(r'\.[A-Za-z]{2,3}', nameParts[-2]) else ''
+        subsData.inf[track_id] = { "file": s.path, "codec": s.ext, "title": s.name, "ext": True, "lang": subsLang }
         subsData.sel.append(Choice(f'[{track_id}]: {s.name}', value=track_id))
     
     subsData.inf['-1'] = { "file": None, "codec": None, "title": None, "ext": True }
     subsData.sel.append(Choice('[ -1]: Skip', value='-1'))
     return subsData
 
+# headless presets, --preset file (json/yaml) and --key value flags answer the prompts
+# file keys apply to all scripts, a section named as the script overrides them
+def readPresetFile(presetFile: str, presetName: str) -> dict:
+    with open(presetFile, 'r', encoding='utf-8') as f:
+        if PurePath(presetFile).suffix.lower() in [ '.yaml', '.yml' ]:
+            data = requireModule('yaml').safe_load(f)
+        else:
+            data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError(f'Preset is not a mapping: {presetFile}')
+    
+    values = { k: v for k, v in data.items() if not isinstance(v, dict) }
+    if isinstance(data.get(presetName), dict):
+        values.update(data[presetName])
+    return values
+
+# flags that never take a value, so a path right after them stays the input
+presetSwitches = [ 'batch' ]
+
+# --key value, --key=value, --flag; dashes in keys become underscores
+# bare tokens not taken as values are positional, --preset may repeat
+def parsePresetArgs(args: list) -> tuple:
+    values = { 'preset': list() }
+    positional = list()
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        i += 1
+        if arg == '--':
+            positional.extend(args[i:])
+            break
+        if not arg.startswith('--'):
+            positional.append(arg)
+            continue
+        key, sep, value = arg[2:].partition('=')
+        key = key.replace('-', '_')
+        if sep == '':
+            if key not in presetSwitches and i < len(args) and not args[i].startswith('--'):
+                value = args[i]
+                i += 1
+            else:
+                value = True
+        if key == 'preset':
+            values['preset'].append(value)
+        else:
+            values[key] = value
+    return values, positional
+
+def presetBool(value) -> bool:
+    if isinstance(value, bool):
+        return value
+    return boolYN(value) or str(value).lower().strip() in [ 'true', 'on', '1' ]
+
+# track fields for preset rules
+def trackInfo(stream: dict) -> dict:
+    tags = stream.get('tags', dict())
+    return {
+        'lang': tags.get('language', ''),
+        'codec': stream.get('codec_name', stream.get('codec_tag_string', '')),
+        'title': tags.get('title', ''),
+        'channels': stream.get('channels', ''),
+    }
+
+# rule: 'lang=jpn,codec=ass', title matches by substring, 'first' and 'none' are shortcuts
+def matchTrackRule(rule: str, info: dict) -> bool:
+    for cond in str(rule).split(','):
+        key, _, value = cond.strip().partition('=')
+        key, value = key.strip().lower(), value.strip().lower()
+        field = str(info.get(key) or '').lower().lstrip('.')
+        if key == 'title':
+            if value not in field:
+                return False
+        elif field != value:
+            return False
+    return True
+
+class ScriptPreset:
+    def __init__(self, values: dict = None, inputPath: str = None):
+        self.values = values if values is not None else dict()
+        self.input = inputPath
+        # without terminal missing values take prompt default
+        self.interactive = sys.stdin is not None and sys.stdin.isatty()
+    
+    def has(self, key: str) -> bool:
+        return self.values.get(key) is not None
+    
+    def get(self, key: str, default = None):
+        return self.values.get(key, default)
+    
+    def confirm(self, key: str, message: str, default: bool = False) -> bool:
+        if self.has(key):
+            answer = presetBool(self.values[key])
+            print(f':: {message} {'Yes' if answer else 'No'}')
+            return answer
+        if not self.interactive:
+            print(f':: {message} {'Yes' if default else 'No'} (default)')
+            return default
+        return requireModule('questionary').confirm(message, default=default).ask()
+    
+    def text(self, key: str, message: str, default: str = '', validate = None) -> str:
+        if self.has(key):
+            answer = str(self.values[key])
+            if validate is None or validate(answer):
+                print(f':: {message} {answer}')
+                return answer
+            print(f':: Preset value "{key}" is not valid: {answer}')
+        if not self.interactive:
+            if validate is not None and not validate(default):
+                raise ValueError(f'Preset value "{key}" is required')
+            print(f':: {message} {default} (default)')
+            return default
+        return requireModule('questionary').text(message, default=default, validate=validate).ask()
+    
+    # tracks: choice value to track fields, enables rules
+    def select(self, key: str, message: str, choices: list, tracks: dict = None):
+        if self.has(key):
+            choice = self.matchChoice(self.values[key], choices, tracks)
+            if choice is not None:
+                print(f':: {message} {choice.title}')
+                return choice.value
+            print(f':: Preset value "{key}" matches no choice: {self.values[key]}')
+        if not self.interactive:
+            raise ValueError(f'Preset value "{key}" is required')
+        return requireModule('questionary').select(message, choices).ask()
+    
+    def matchChoice(self, rules, choices: list, tracks: dict = None):
+        choices = [ c for c in choices if getattr(c, 'value', None) is not None and not getattr(c, 'disabled', None) ]
+        rules = rules if isinstance(rules, list) else [ rules ]
+        for rule in rules:
+            rule = str(rule).strip()
+            for c in choices:
+                if str(c.value) == rule:
+                    return c
+            if rule.lower() in [ 'none', 'skip' ]:
+                return next((c for c in choices if str(c.value) == '-1'), None)
+            if rule.lower() == 'first':
+                found = [ c for c in choices if str(c.value) != '-1' ]
+            elif tracks is not None and '=' in rule:
+                found = [ c for c in choices if c.value in tracks and matchTrackRule(rule, tracks[c.value]) ]
+            else:
+                found = list()
+            if len(found) > 0:
+                return found[0]
+        return None
+
+# script.py [input] [--preset file] [--key value ...], flags may come before or after input
+def loadPreset(presetName: str, args: list = None) -> ScriptPreset:
+    argValues, positional = parsePresetArgs(sys.argv[1:] if args is None else args)
+    
+    values = dict()
+    for presetFile in argValues.pop('preset'):
+        values.update(readPresetFile(presetFile, presetName))
+    values.update(argValues)
+    
+    # unattended run, no pause at the end
+    if presetBool(values.get('batch', False)):
+        os.environ['isBatch'] = '1'
+    return ScriptPreset(values, positional[0] if len(positional) > 0 else None)
+
 # crc32 calc
 def calculate_crc32(data: bytes) -> int:
     return zlib.crc32(data) & 0xffffffff
 
 # create empty image
 def create_img(width, height):
+    Image = requireModule('PIL.Image')
     return Image.new('RGBA', (width, height), (0, 0, 0, 0))
 
 # trim image
 def trim_img(img, threshold=19):
+    np = requireModule('numpy')
     # Get the alpha channel (transparency)
     alpha = img.getchannel('A')
     alpha_np = np.array(alpha)
@@ -412,6 +2009,9 @@ def is_not_apng(err): return isinstance(err, NotAPNGError)
 
 # iphone png to standart png
 def strip_cgbi_and_fix_png(buffer: bytes, remove_alpha_premult: bool = True) -> bytes:
+    Image = requireModule('PIL.Image')
+    np = requireModule('numpy')
+    
     if buffer[:8] != PNG_SIGNATURE:
         raise NotPNGError('Not a PNG')
     
@@ -484,6 +2084,9 @@ class APNGFrame:
 
 # apng parser
 def parse_apng(buffer: bytes) -> APNG:
+    Image = requireModule('PIL.Image')
+    np = requireModule('numpy')
+    
     if buffer[:8] != PNG_SIGNATURE:
         raise NotPNGError('Not a PNG')
     
@@ -0,0 +1,191 @@
+import re
+
+from pathlib import Path
+
+class FFCmdError(Exception): pass
+
+# filtergraph link labels, input stream specifiers like 0:v:0 or 1:a:2?
+reLinkLabel = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+reStreamSpec = re.compile(r'^(?P<input>\d+)(:[A-Za-z0-9_]+)*\??$')
+
+# before inputs, same as every script used to add by hand
+bitexactArgs = [ '-fflags', '+bitexact', '-flags:v', '+bitexact', '-flags:a', '+bitexact' ]
+stripMetadataArgs = [ '-map_metadata', '-1', '-map_chapters', '-1' ]
+
+# '[video]' or 'video' to 'video', stream specifiers are kept as is
+def linkName(link: str) -> str:
+    name = link[1:-1] if link.startswith('[') and link.endswith(']') else link
+    if reLinkLabel.match(name) is None and reStreamSpec.match(name) is None:
+        raise FFCmdError(f'Bad filtergraph label "{link}"')
+    return name
+
+def isStreamSpec(name: str) -> bool:
+    return reStreamSpec.match(name) is not None
+
+def linkList(links) -> list:
+    if links is None:
+        return list()
+    if isinstance(links, str):
+        links = [ links ]
+    return [ linkName(l) for l in links ]
+
+# filter chains joined by ';', every label produced once and consumed once
+class FilterGraph:
+    def __init__(self):
+        self.chains = list()
+        self.produced = list()
+        self.consumed = list()
+    
+    # inputs / outputs: label or list of labels, filters joined with ','
+    def chain(self, inputs, filters: list, outputs) -> 'FilterGraph':
+        inputs = linkList(inputs)
+        outputs = linkList(outputs)
+        filters = [ str(f) for f in filters if f is not None and str(f) != '' ]
+        if len(filters) < 1:
+            raise FFCmdError(f'Empty filter chain for {outputs}')
+        if len(outputs) < 1:
+            raise FFCmdError(f'Filter chain "{','.join(filters)}" has no output label')
+        
+        for name in outputs:
+            if isStreamSpec(name):
+                raise FFCmdError(f'Output label [{name}] looks like input stream')
+            if name in self.produced:
+                raise FFCmdError(f'Label [{name}] produced twice')
+        for name in inputs:
+            if not isStreamSpec(name) and name in self.consumed:
+                raise FFCmdError(f'Label [{name}] consumed twice')
+        
+        self.produced.extend(outputs)
+        self.consumed.extend([ name for name in inputs if not isStreamSpec(name) ])
+        self.chains.append((inputs, filters, outputs))
+        return self
+    
+    # one decode for many outputs
+    def split(self, inputs, outputs: list) -> 'FilterGraph':
+        return self.chain(inputs, [ f'split={len(outputs)}' ], outputs)
+    
+    # labels left for -map
+    def unconnected(self) -> list:
+        return [ name for name in self.produced if name not in self.consumed ]
+    
+    def validate(self):
+        for name in self.consumed:
+            if name not in self.produced:
+                raise FFCmdError(f'Label [{name}] is never produced')
+    
+    def __str__(self) -> str:
+        chains = list()
+        for inputs, filters, outputs in self.chains:
+            inLinks = ''.join([ f'[{name}]' for name in inputs ])
+            outLinks = ''.join([ f'[{name}]' for name in outputs ])
+            chains.append(f'{inLinks}{','.join(filters)}{outLinks}')
+        return ';'.join(chains)
+
+# output file, args are kept in call order
+class FFOutput:
+    def __init__(self, path: Path):
+        self.path = path
+        self.args = list()
+        self.maps = list()
+    
+    # graph label like '[video]' or input stream like '0:a:1?', followed by codec args
+    def map(self, spec: str, *codecArgs) -> 'FFOutput':
+        name = linkName(spec)
+        self.maps.append(name)
+        self.args.extend([ '-map', spec if isStreamSpec(name) else f'[{name}]' ])
+        self.args.extend(codecArgs)
+        return self
+    
+    def set(self, *args) -> 'FFOutput':
+        self.args.extend(args)
+        return self
+    
+    def stripMetadata(self) -> 'FFOutput':
+        self.args.extend(stripMetadataArgs)
+        return self
+    
+    # stream: '' for global, 's:v:0' or 's:t:1' for streams
+    def metadata(self, key: str, value: str, stream: str = '') -> 'FFOutput':
+        option = f'-metadata:{stream}' if stream != '' else '-metadata'
+        self.args.extend([ option, f'{key}={value}' ])
+        return self
+
+# ffmpeg command, build() checks maps against inputs and graph
+class FFCommand:
+    def __init__(self, tool: str = 'ffmpeg', logLevel: str = 'error', overwrite: bool = False, bitexact: bool = True):
+        self.tool = tool
+        self.logLevel = logLevel
+        self.overwrite = overwrite
+        self.bitexact = bitexact
+        self.globalArgs = list()
+        self.inputs = list()
+        self.graph = None
+        self.outputs = list()
+    
+    # args before inputs, like hwaccel and threads
+    def options(self, *args) -> 'FFCommand':
+        self.globalArgs.extend(args)
+        return self
+    
+    # returns input index for maps and stream labels
+    def input(self, path: Path, *args) -> int:
+        self.inputs.append((list(args), path))
+        return len(self.inputs) - 1
+    
+    def filterGraph(self, graph: FilterGraph) -> 'FFCommand':
+        self.graph = graph
+        return self
+    
+    def output(self, path: Path) -> FFOutput:
+        output = FFOutput(path)
+        self.outputs.append(output)
+        return output
+    
+    def checkStream(self, name: str):
+        inputIndex = int(reStreamSpec.match(name).group('input'))
+        if inputIndex >= len(self.inputs):
+            raise FFCmdError(f'Stream {name} refers to missing input {inputIndex}')
+    
+    def build(self) -> list:
+        if len(self.inputs) < 1 or len(self.outputs) < 1:
+            raise FFCmdError('Command needs input and output')
+        
+        encCmd = [ self.tool, '-hide_banner', '-loglevel', self.logLevel ]
+        if self.overwrite:
+            encCmd.append('-y')
+        encCmd.extend(self.globalArgs)
+        if self.bitexact:
+            encCmd.extend(bitexactArgs)
+        for inputArgs, path in self.inputs:
+            encCmd.extend(inputArgs)
+            encCmd.extend([ '-i', path ])
+        
+        graphLabels = list()
+        if self.graph is not None:
+            self.graph.validate()
+            for inputs, filters, outputs in self.graph.chains:
+                for name in inputs:
+                    if isStreamSpec(name):
+                        self.checkStream(name)
+            graphLabels = self.graph.unconnected()
+            encCmd.extend([ '-filter_complex', str(self.graph) ])
+        
+        # graph outputs can be mapped once, ffmpeg fails on unconnected ones
+        mapped = list()
+        for output in self.outputs:
+            for name in output.maps:
+                if isStreamSpec(name):
+                    self.checkStream(name)
+                    continue
+                if name not in graphLabels:
+                    raise FFCmdError(f'Map [{name}] is not a filtergraph output')
+                if name in mapped:
+                    raise FFCmdError(f'Filtergraph output [{name}] mapped twice')
+                mapped.append(name)
+            encCmd.extend(output.args)
+            encCmd.append(output.path)
+        
+        for name in graphLabels:
+            if name not in mapped:
+                raise FFCmdError(f'Filtergraph output [{name}] is not mapped')
+        return encCmd
@@ -0,0 +1,543 @@
+import os
+import struct
+
+from pathlib import Path
+from pathlib import PurePath
+
+# ebml ids
+EBML_HEADER    = 0x1A45DFA3
+EBML_DOCTYPE   = 0x4282
+SEGMENT        = 0x18538067
+SEEKHEAD       = 0x114D9B74
+SEEK           = 0x4DBB
+SEEK_ID        = 0x53AB
+SEEK_POSITION  = 0x53AC
+INFO           = 0x1549A966
+TRACKS         = 0x1654AE6B
+ATTACHMENTS    = 0x1941A469
+CHAPTERS       = 0x1043A770
+TAGS           = 0x1254C367
+CLUSTER        = 0x1F43B675
+
+# info
+TIMESTAMP_SCALE = 0x2AD7B1
+DURATION        = 0x4489
+TITLE           = 0x7BA9
+MUXING_APP      = 0x4D80
+WRITING_APP     = 0x5741
+
+# tracks
+TRACK_ENTRY     = 0xAE
+TRACK_NUMBER    = 0xD7
+TRACK_UID       = 0x73C5
+TRACK_TYPE      = 0x83
+FLAG_ENABLED    = 0xB9
+FLAG_DEFAULT    = 0x88
+FLAG_FORCED     = 0x55AA
+DEFAULT_DUR     = 0x23E383
+TRACK_NAME      = 0x536E
+LANGUAGE        = 0x22B59C
+LANGUAGE_IETF   = 0x22B59D
+CODEC_ID        = 0x86
+VIDEO           = 0xE0
+PIXEL_WIDTH     = 0xB0
+PIXEL_HEIGHT    = 0xBA
+DISPLAY_WIDTH   = 0x54B0
+DISPLAY_HEIGHT  = 0x54BA
+AUDIO           = 0xE1
+SAMPLING_FREQ   = 0xB5
+CHANNELS        = 0x9F
+BIT_DEPTH       = 0x6264
+
+# attachments
+ATTACHED_FILE   = 0x61A7
+FILE_DESC       = 0x467E
+FILE_NAME       = 0x466E
+FILE_MIMETYPE   = 0x4660
+FILE_DATA       = 0x465C
+FILE_UID        = 0x46AE
+
+# chapters
+EDITION_ENTRY   = 0x45B9
+CHAPTER_ATOM    = 0xB6
+
+# tags
+TAG             = 0x7373
+TARGETS         = 0x63C0
+TAG_TRACK_UID   = 0x63C5
+SIMPLE_TAG      = 0x67C8
+TAG_NAME        = 0x45A3
+TAG_STRING      = 0x4487
+TAG_LANGUAGE    = 0x447A
+TAG_DEFAULT     = 0x4484
+TAG_DEFAULT_BUG = 0x44B4
+
+class MKVReadError(Exception): pass
+
+trackTypes = { 1: 'video', 2: 'audio', 17: 'subtitles' }
+
+# codec names as mkvmerge -J prints them
+mkvCodecNames = {
+    'V_MPEG4/ISO/AVC':  'AVC/H.264/MPEG-4p10',
+    'V_MPEGH/ISO/HEVC': 'HEVC/H.265/MPEG-H',
+    'V_MPEG4/ISO/ASP':  'MPEG-4p2',
+    'V_MPEG1':          'MPEG-1/2',
+    'V_MPEG2':          'MPEG-1/2',
+    'V_AV1':            'AV1',
+    'V_VP8':            'VP8',
+    'V_VP9':            'VP9',
+    'V_THEORA':         'Theora',
+    'A_AAC':            'AAC',
+    'A_AC3':            'AC-3',
+    'A_EAC3':           'E-AC-3',
+    'A_DTS':            'DTS',
+    'A_FLAC':           'FLAC',
+    'A_OPUS':           'Opus',
+    'A_VORBIS':         'Vorbis',
+    'A_MPEG/L2':        'MP2',
+    'A_MPEG/L3':        'MP3',
+    'A_TRUEHD':         'TrueHD',
+    'A_ALAC':           'ALAC',
+    'A_PCM/INT/LIT':    'PCM',
+    'A_PCM/INT/BIG':    'PCM',
+    'A_PCM/FLOAT/IEEE': 'PCM',
+    'S_TEXT/ASS':       'SubStationAlpha',
+    'S_TEXT/SSA':       'SubStationAlpha',
+    'S_TEXT/UTF8':      'SubRip/SRT',
+    'S_TEXT/WEBVTT':    'WebVTT',
+    'S_HDMV/PGS':       'HDMV PGS',
+    'S_HDMV/TEXTST':    'HDMV TextST',
+    'S_VOBSUB':         'VobSub',
+    'S_DVBSUB':         'DVBSUB',
+}
+
+# codec names as ffprobe prints them
+ffCodecNames = {
+    'V_MPEG4/ISO/AVC':  'h264',
+    'V_MPEGH/ISO/HEVC': 'hevc',
+    'V_MPEG4/ISO/ASP':  'mpeg4',
+    'V_MPEG1':          'mpeg1video',
+    'V_MPEG2':          'mpeg2video',
+    'V_AV1':            'av1',
+    'V_VP8':            'vp8',
+    'V_VP9':            'vp9',
+    'V_THEORA':         'theora',
+    'A_AAC':            'aac',
+    'A_AC3':            'ac3',
+    'A_EAC3':           'eac3',
+    'A_DTS':            'dts',
+    'A_FLAC':           'flac',
+    'A_OPUS':           'opus',
+    'A_VORBIS':         'vorbis',
+    'A_MPEG/L2':        'mp2',
+    'A_MPEG/L3':        'mp3',
+    'A_TRUEHD':         'truehd',
+    'A_ALAC':           'alac',
+    'A_PCM/INT/LIT':    'pcm_s16le',
+    'A_PCM/INT/BIG':    'pcm_s16be',
+    'A_PCM/FLOAT/IEEE': 'pcm_f32le',
+    'S_TEXT/ASS':       'ass',
+    'S_TEXT/SSA':       'ass',
+    'S_TEXT/UTF8':      'subrip',
+    'S_TEXT/WEBVTT':    'webvtt',
+    'S_HDMV/PGS':       'hdmv_pgs_subtitle',
+    'S_HDMV/TEXTST':    'hdmv_text_subtitle',
+    'S_VOBSUB':         'dvd_subtitle',
+    'S_DVBSUB':         'dvb_subtitle',
+}
+
+# attachment mime types ffprobe names as codec
+ffMimeNames = {
+    'application/x-truetype-font': 'ttf',
+    'application/x-font':          'ttf',
+    'application/vnd.ms-opentype': 'otf',
+}
+
+def codecLookup(codecTable: dict, codecId: str) -> str:
+    if codecId in codecTable:
+        return codecTable[codecId]
+    # A_AAC/MPEG4/LC and friends
+    for checkId in codecTable:
+        if codecId.startswith(f'{checkId}/'):
+            return codecTable[checkId]
+    return None
+
+# variable size integer: (value, length), unknown size = None
+def readVint(buf: bytes, pos: int, keepMarker: bool = False) -> tuple:
+    if pos >= len(buf) or buf[pos] == 0:
+        raise MKVReadError(f'Bad EBML vint at {pos}')
+    
+    first = buf[pos]
+    length = 1
+    mask = 0x80
+    while not first & mask:
+        mask >>= 1
+        length += 1
+    
+    if pos + length > len(buf):
+        raise MKVReadError(f'Truncated EBML vint at {pos}')
+    
+    value = first if keepMarker else first & (mask - 1)
+    for b in buf[pos + 1:pos + length]:
+        value = (value << 8) | b
+    
+    if not keepMarker and value == (1 << (7 * length)) - 1:
+        value = None
+    return value, length
+
+# element header: (id, data offset, data size)
+def readHeader(buf: bytes, pos: int) -> tuple:
+    elId, idLen = readVint(buf, pos, True)
+    elSize, sizeLen = readVint(buf, pos + idLen)
+    return elId, pos + idLen + sizeLen, elSize
+
+def readFileHeader(f, pos: int) -> tuple:
+    f.seek(pos)
+    buf = f.read(12)
+    elId, dataPos, elSize = readHeader(buf, 0)
+    return elId, pos + dataPos, elSize
+
+def iterElements(buf: bytes, pos: int = 0, end: int = None):
+    end = len(buf) if end is None else end
+    while pos < end:
+        elId, dataPos, elSize = readHeader(buf, pos)
+        if elSize is None:
+            elSize = end - dataPos
+        yield elId, buf[dataPos:dataPos + elSize]
+        pos = dataPos + elSize
+
+def readUInt(data: bytes) -> int:
+    return int.from_bytes(data, 'big') if len(data) > 0 else 0
+
+def readFloat(data: bytes) -> float:
+    if len(data) == 4:
+        return struct.unpack('>f', data)[0]
+    if len(data) == 8:
+        return struct.unpack('>d', data)[0]
+    return 0.0
+
+def readString(data: bytes) -> str:
+    return data.split(b'\x00', 1)[0].decode('utf-8', errors='replace')
+
+def parseInfo(data: bytes, result: dict):
+    props = result['container']['properties']
+    timestampScale = 1000000
+    duration = None
+    
+    for elId, elData in iterElements(data):
+        if elId == TIMESTAMP_SCALE:
+            timestampScale = readUInt(elData)
+        elif elId == DURATION:
+            duration = readFloat(elData)
+        elif elId == TITLE:
+            props['title'] = readString(elData)
+        elif elId == MUXING_APP:
+            props['muxing_application'] = readString(elData)
+        elif elId == WRITING_APP:
+            props['writing_application'] = readString(elData)
+    
+    if duration is not None:
+        props['duration'] = round(duration * timestampScale)
+
+def parseTrackEntry(data: bytes) -> dict:
+    track = { 'codec': '', 'id': 0, 'properties': dict(), 'type': None }
+    props = track['properties']
+    props['default_track'] = True
+    props['enabled_track'] = True
+    props['forced_track'] = False
+    props['language'] = 'eng'
+    
+    for elId, elData in iterElements(data):
+        if elId == TRACK_NUMBER:
+            props['number'] = readUInt(elData)
+        elif elId == TRACK_UID:
+            props['uid'] = readUInt(elData)
+        elif elId == TRACK_TYPE:
+            track['type'] = trackTypes.get(readUInt(elData))
+        elif elId == FLAG_ENABLED:
+            props['enabled_track'] = readUInt(elData) == 1
+        elif elId == FLAG_DEFAULT:
+            props['default_track'] = readUInt(elData) == 1
+        elif elId == FLAG_FORCED:
+            props['forced_track'] = readUInt(elData) == 1
+        elif elId == DEFAULT_DUR:
+            props['default_duration'] = readUInt(elData)
+        elif elId == TRACK_NAME:
+            props['track_name'] = readString(elData)
+        elif elId == LANGUAGE:
+            props['language'] = readString(elData)
+        elif elId == LANGUAGE_IETF:
+            props['language_ietf'] = readString(elData)
+        elif elId == CODEC_ID:
+            props['codec_id'] = readString(elData)
+        elif elId == VIDEO:
+            video = { k: readUInt(v) for k, v in iterElements(elData) }
+            if PIXEL_WIDTH in video and PIXEL_HEIGHT in video:
+                props['pixel_dimensions'] = f'{video[PIXEL_WIDTH]}x{video[PIXEL_HEIGHT]}'
+                dWidth = video.get(DISPLAY_WIDTH, video[PIXEL_WIDTH])
+                dHeight = video.get(DISPLAY_HEIGHT, video[PIXEL_HEIGHT])
+                props['display_dimensions'] = f'{dWidth}x{dHeight}'
+        elif elId == AUDIO:
+            props['audio_sampling_frequency'] = 8000
+            props['audio_channels'] = 1
+            for audioId, audioData in iterElements(elData):
+                if audioId == SAMPLING_FREQ:
+                    props['audio_sampling_frequency'] = round(readFloat(audioData))
+                elif audioId == CHANNELS:
+                    props['audio_channels'] = readUInt(audioData)
+                elif audioId == BIT_DEPTH:
+                    props['audio_bits_per_sample'] = readUInt(audioData)
+    
+    codecId = props.get('codec_id', '')
+    track['codec'] = codecLookup(mkvCodecNames, codecId) or codecId
+    return track
+
+def parseTracks(data: bytes, result: dict):
+    for elId, elData in iterElements(data):
+        if elId != TRACK_ENTRY:
+            continue
+        track = parseTrackEntry(elData)
+        if track['type'] is None:
+            continue
+        track['id'] = len(result['tracks'])
+        result['tracks'].append(track)
+
+def parseAttachments(f, dataPos: int, dataEnd: int, result: dict):
+    # read attached file headers only, skip file data
+    pos = dataPos
+    while pos < dataEnd:
+        elId, filePos, fileSize = readFileHeader(f, pos)
+        if fileSize is None:
+            raise MKVReadError('Unknown size attachment')
+        
+        if elId == ATTACHED_FILE:
+            attachment = { 'content_type': '', 'description': '', 'file_name': '', 'id': len(result['attachments']) + 1, 'properties': dict(), 'size': 0 }
+            childPos = filePos
+            while childPos < filePos + fileSize:
+                childId, childDataPos, childSize = readFileHeader(f, childPos)
+                if childSize is None:
+                    raise MKVReadError('Unknown size attachment')
+                if childId == FILE_DATA:
+                    attachment['size'] = childSize
+                elif childId in (FILE_NAME, FILE_MIMETYPE, FILE_DESC, FILE_UID):
+                    f.seek(childDataPos)
+                    childData = f.read(childSize)
+                    if childId == FILE_NAME:
+                        attachment['file_name'] = readString(childData)
+                    elif childId == FILE_MIMETYPE:
+                        attachment['content_type'] = readString(childData)
+                    elif childId == FILE_DESC:
+                        attachment['description'] = readString(childData)
+                    else:
+                        attachment['properties']['uid'] = readUInt(childData)
+                childPos = childDataPos + childSize
+            result['attachments'].append(attachment)
+        
+        pos = filePos + fileSize
+
+def parseChapters(data: bytes, result: dict):
+    for elId, elData in iterElements(data):
+        if elId == EDITION_ENTRY:
+            numEntries = sum(1 for atomId, _ in iterElements(elData) if atomId == CHAPTER_ATOM)
+            result['chapters'].append({ 'num_entries': numEntries })
+
+# keys as ffprobe makes them: nested tags are 'PARENT/CHILD', TagLanguage other than und adds '-lang'
+# and the plain key is kept only for default tags, tags without string remove the key
+# ffmpeg reads missing TagDefault as 0, not as 1 like the spec
+def parseSimpleTags(data: bytes, tags: dict, prefix: str = None):
+    tagName = None
+    tagString = None
+    tagLanguage = 'und'
+    tagDefault = False
+    subTags = list()
+    for elId, elData in iterElements(data):
+        if elId == TAG_NAME:
+            tagName = readString(elData)
+        elif elId == TAG_STRING:
+            tagString = readString(elData)
+        elif elId == TAG_LANGUAGE:
+            tagLanguage = readString(elData)
+        elif elId == TAG_DEFAULT or elId == TAG_DEFAULT_BUG:
+            tagDefault = readUInt(elData) != 0
+        elif elId == SIMPLE_TAG:
+            subTags.append(elData)
+    if tagName is None:
+        return
+    
+    tagKey = f'{prefix}/{tagName}' if prefix is not None else tagName
+    tagKeys = list()
+    if tagDefault or tagLanguage == 'und':
+        tagKeys.append(tagKey)
+    if tagLanguage != 'und':
+        tagKeys.append(f'{tagKey}-{tagLanguage}')
+    for key in tagKeys:
+        if tagString is not None:
+            tags[key] = tagString
+        else:
+            tags.pop(key, None)
+        for subData in subTags:
+            parseSimpleTags(subData, tags, key)
+
+def parseTags(data: bytes, result: dict):
+    trackTags = dict()
+    globalTags = 0
+    
+    for elId, elData in iterElements(data):
+        if elId != TAG:
+            continue
+        trackUids = list()
+        tags = dict()
+        for tagId, tagData in iterElements(elData):
+            if tagId == TARGETS:
+                trackUids.extend(readUInt(v) for k, v in iterElements(tagData) if k == TAG_TRACK_UID)
+            elif tagId == SIMPLE_TAG:
+                parseSimpleTags(tagData, tags)
+        
+        trackUids = [ uid for uid in trackUids if uid != 0 ]
+        if len(trackUids) < 1:
+            globalTags += len(tags)
+        for uid in trackUids:
+            trackTags.setdefault(uid, dict()).update(tags)
+    
+    if globalTags > 0:
+        result['global_tags'].append({ 'num_entries': globalTags })
+    
+    for track in result['tracks']:
+        uid = track['properties'].get('uid')
+        if uid in trackTags:
+            track['tags'] = trackTags[uid]
+            result['track_tags'].append({ 'num_entries': len(trackTags[uid]), 'track_id': track['id'] })
+
+# read matroska metadata without touching clusters, same shape as mkvmerge -J
+def readMKVData(inputPath: Path) -> dict:
+    result = {
+        'attachments': list(),
+        'chapters': list(),
+        'container': { 'properties': dict(), 'recognized': True, 'supported': True, 'type': 'Matroska' },
+        'errors': list(),
+        'file_name': str(inputPath),
+        'global_tags': list(),
+        'track_tags': list(),
+        'tracks': list(),
+        'warnings': list(),
+    }
+    
+    with open(inputPath, 'rb') as f:
+        fileSize = os.fstat(f.fileno()).st_size
+        
+        elId, dataPos, elSize = readFileHeader(f, 0)
+        if elId != EBML_HEADER or elSize is None:
+            raise MKVReadError('Not a Matroska file')
+        
+        f.seek(dataPos)
+        for headerId, headerData in iterElements(f.read(elSize)):
+            if headerId == EBML_DOCTYPE and readString(headerData) == 'webm':
+                result['container']['type'] = 'WebM'
+        
+        elId, segmentPos, segmentSize = readFileHeader(f, dataPos + elSize)
+        if elId != SEGMENT:
+            raise MKVReadError('No Matroska segment')
+        segmentEnd = fileSize if segmentSize is None else min(segmentPos + segmentSize, fileSize)
+        
+        wanted = [ SEEKHEAD, INFO, TRACKS, ATTACHMENTS, CHAPTERS, TAGS ]
+        seekPositions = list()
+        tagsData = list()
+        visited = set()
+        parsed = set()
+        
+        def parseElement(elPos: int):
+            elId, dataPos, elSize = readFileHeader(f, elPos)
+            visited.add(elPos)
+            if elSize is None or elId not in wanted:
+                return elId, dataPos, elSize
+            if elId != SEEKHEAD and elId in parsed:
+                return elId, dataPos, elSize
+            parsed.add(elId)
+            
+            if elId == ATTACHMENTS:
+                parseAttachments(f, dataPos, dataPos + elSize, result)
+                return elId, dataPos, elSize
+            
+            f.seek(dataPos)
+            data = f.read(elSize)
+            if elId == SEEKHEAD:
+                for seekId, seekData in iterElements(data):
+                    if seekId != SEEK:
+                        continue
+                    seek = dict(iterElements(seekData))
+                    if SEEK_ID in seek and SEEK_POSITION in seek:
+                        seekPositions.append((readUInt(seek[SEEK_ID]), segmentPos + readUInt(seek[SEEK_POSITION])))
+            elif elId == INFO:
+                parseInfo(data, result)
+            elif elId == TRACKS:
+                parseTracks(data, result)
+            elif elId == CHAPTERS:
+                parseChapters(data, result)
+            elif elId == TAGS:
+                tagsData.append(data)
+            return elId, dataPos, elSize
+        
+        # level 1 elements up to the first cluster
+        pos = segmentPos
+        while pos < segmentEnd:
+            elId, dataPos, elSize = parseElement(pos)
+            if elId == CLUSTER or elSize is None:
+                break
+            pos = dataPos + elSize
+        
+        # jump to the rest with seekhead
+        while len(seekPositions) > 0:
+            seekId, seekPos = seekPositions.pop(0)
+            if seekId in wanted and seekPos not in visited and seekPos < segmentEnd:
+                if seekId == SEEKHEAD or seekId not in parsed:
+                    parseElement(seekPos)
+        
+        for data in tagsData:
+            parseTags(data, result)
+    
+    return result
+
+# convert to ffprobe like streams for probe callers
+def mkvToMediaData(mkvData: dict) -> dict:
+    codecTypes = { 'video': 'video', 'audio': 'audio', 'subtitles': 'subtitle' }
+    streams = list()
+    
+    for track in mkvData['tracks']:
+        props = track['properties']
+        stream = { 'index': len(streams), 'codec_type': codecTypes[track['type']], 'codec_tag_string': '[0][0][0][0]' }
+        codecName = codecLookup(ffCodecNames, props.get('codec_id', ''))
+        if codecName is not None:
+            stream['codec_name'] = codecName
+        
+        if 'pixel_dimensions' in props:
+            stream['width'], stream['height'] = map(int, props['pixel_dimensions'].split('x'))
+        if 'audio_channels' in props:
+            stream['channels'] = props['audio_channels']
+            stream['sample_rate'] = str(props['audio_sampling_frequency'])
+        
+        stream['disposition'] = { 'default': int(props['default_track']), 'forced': int(props['forced_track']) }
+        stream['tags'] = dict(track['tags']) if 'tags' in track else dict()
+        # ffprobe leaves out undefined language
+        if props['language'] != 'und':
+            stream['tags']['language'] = props['language']
+        if 'track_name' in props:
+            stream['tags']['title'] = props['track_name']
+        streams.append(stream)
+    
+    # ffprobe shows FileDescription as title, only when set
+    for attachment in mkvData['attachments']:
+        tags = { 'filename': attachment['file_name'], 'mimetype': attachment['content_type'] }
+        if attachment['description'] != '':
+            tags['title'] = attachment['description']
+        stream = { 'index': len(streams), 'codec_type': 'attachment', 'tags': tags }
+        if attachment['content_type'] in ffMimeNames:
+            stream['codec_name'] = ffMimeNames[attachment['content_type']]
+        streams.append(stream)
+    
+    mediaData = { 'streams': streams, 'format': { 'filename': mkvData['file_name'] } }
+    props = mkvData['container']['properties']
+    if 'duration' in props:
+        mediaData['format']['duration'] = f'{props['duration'] / 1000000000:.6f}'
+    if 'title' in props:
+        mediaData['format']['tags'] = { 'title': props['title'] }
+    return mediaData
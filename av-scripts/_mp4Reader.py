@@ -0,0 +1,269 @@
+import os
+import struct
+
+from pathlib import Path
+from pathlib import PurePath
+
+class MP4ReadError(Exception): pass
+
+# boxes with child boxes
+containerBoxes = [ b'moov', b'trak', b'mdia', b'minf', b'stbl', b'tref' ]
+
+# handler to ffprobe codec_type
+handlerTypes = {
+    b'vide': 'video',
+    b'soun': 'audio',
+    b'sbtl': 'subtitle',
+    b'subt': 'subtitle',
+    b'text': 'subtitle',
+    b'clcp': 'subtitle',
+}
+
+# sample entry to ffprobe codec_name
+sampleCodecs = {
+    b'avc1': 'h264',
+    b'avc3': 'h264',
+    b'hvc1': 'hevc',
+    b'hev1': 'hevc',
+    b'av01': 'av1',
+    b'vp08': 'vp8',
+    b'vp09': 'vp9',
+    b'mp4v': 'mpeg4',
+    b'mp4a': 'aac',
+    b'.mp3': 'mp3',
+    b'ac-3': 'ac3',
+    b'ec-3': 'eac3',
+    b'Opus': 'opus',
+    b'fLaC': 'flac',
+    b'alac': 'alac',
+    b'tx3g': 'mov_text',
+    b'wvtt': 'webvtt',
+    b'c608': 'eia_608',
+    b'stpp': 'ttml',
+}
+
+# mp4a object type indication to ffprobe codec_name
+objectTypes = {
+    0x40: 'aac',
+    0x66: 'aac',
+    0x67: 'aac',
+    0x68: 'aac',
+    0x69: 'mp3',
+    0x6B: 'mp3',
+    0xA5: 'ac3',
+    0xA6: 'eac3',
+    0xA9: 'dts',
+    0xAD: 'opus',
+}
+
+# box header: (type, data offset, box end)
+def readBoxHeader(f, pos: int, end: int) -> tuple:
+    f.seek(pos)
+    header = f.read(16)
+    if len(header) < 8:
+        raise MP4ReadError(f'Truncated box at {pos}')
+    
+    boxSize, boxType = struct.unpack('>I4s', header[:8])
+    dataPos = pos + 8
+    if boxSize == 1:
+        if len(header) < 16:
+            raise MP4ReadError(f'Truncated box at {pos}')
+        boxSize = struct.unpack('>Q', header[8:16])[0]
+        dataPos = pos + 16
+    elif boxSize == 0:
+        boxSize = end - pos
+    
+    if boxSize < dataPos - pos:
+        raise MP4ReadError(f'Bad box size at {pos}')
+    return boxType, dataPos, pos + boxSize
+
+def iterBoxes(f, pos: int, end: int):
+    while pos + 8 <= end:
+        boxType, dataPos, boxEnd = readBoxHeader(f, pos, end)
+        yield boxType, dataPos, min(boxEnd, end)
+        pos = boxEnd
+
+def readBox(f, dataPos: int, boxEnd: int, limit: int = 4096) -> bytes:
+    f.seek(dataPos)
+    return f.read(min(boxEnd - dataPos, limit))
+
+# classic macintosh language codes used by quicktime
+macLanguages = {
+    0: 'eng', 1: 'fra', 2: 'deu', 3: 'ita', 4: 'nld', 5: 'swe', 6: 'spa', 7: 'dan',
+    8: 'por', 9: 'nor', 10: 'heb', 11: 'jpn', 12: 'ara', 13: 'fin', 14: 'gre',
+    19: 'chi', 23: 'kor', 32: 'rus', 33: 'chi',
+}
+
+def parseLanguage(packed: int) -> str:
+    if packed < 0x400:
+        return macLanguages.get(packed, 'und')
+    if packed == 0x7FFF:
+        return 'und'
+    return ''.join(chr(((packed >> shift) & 0x1F) + 0x60) for shift in (10, 5, 0))
+
+def parseEsds(data: bytes) -> int:
+    # skip version/flags, find DecoderConfigDescriptor
+    pos = 4
+    while pos < len(data):
+        tag = data[pos]
+        pos += 1
+        length = 0
+        for _ in range(4):
+            b = data[pos]
+            pos += 1
+            length = (length << 7) | (b & 0x7F)
+            if not b & 0x80:
+                break
+        if tag == 0x03:
+            # ES_ID + flags, optional fields
+            flags = data[pos + 2]
+            pos += 3
+            if flags & 0x80:
+                pos += 2
+            if flags & 0x40:
+                pos += 1 + data[pos]
+            if flags & 0x20:
+                pos += 2
+            continue
+        if tag == 0x04:
+            return data[pos]
+        pos += length
+    return 0
+
+def parseSampleEntry(data: bytes, track: dict):
+    # stsd: version/flags, entry count, first entry
+    if len(data) < 16:
+        return
+    entrySize, entryType = struct.unpack('>I4s', data[8:16])
+    entry = data[16:8 + entrySize]
+    track['codec_tag_string'] = entryType.decode('latin-1')
+    
+    codecName = sampleCodecs.get(entryType)
+    if track['codec_type'] == 'video' and len(entry) >= 28:
+        track['width'], track['height'] = struct.unpack('>HH', entry[24:28])
+    elif track['codec_type'] == 'audio' and len(entry) >= 28:
+        channels, = struct.unpack('>H', entry[16:18])
+        sampleRate, = struct.unpack('>I', entry[24:28])
+        track['channels'] = channels
+        track['sample_rate'] = str(sampleRate >> 16)
+        esdsPos = entry.find(b'esds', 28)
+        if entryType == b'mp4a' and esdsPos > 0:
+            try:
+                codecName = objectTypes.get(parseEsds(entry[esdsPos + 4:]), codecName)
+            except IndexError:
+                pass
+    
+    if codecName is not None:
+        track['codec_name'] = codecName
+
+def parseTrak(f, dataPos: int, boxEnd: int) -> dict:
+    track = { 'codec_type': 'data', 'tags': dict() }
+    timescale = 0
+    duration = 0
+    
+    def walk(pos: int, end: int):
+        nonlocal timescale, duration
+        for boxType, childPos, childEnd in iterBoxes(f, pos, end):
+            if boxType in containerBoxes:
+                walk(childPos, childEnd)
+            elif boxType == b'tkhd':
+                data = readBox(f, childPos, childEnd)
+                track['id'] = struct.unpack('>I', data[20:24] if data[0] == 1 else data[12:16])[0]
+            elif boxType == b'mdhd':
+                data = readBox(f, childPos, childEnd)
+                if data[0] == 1:
+                    timescale, duration, language = struct.unpack('>IQH', data[20:34])
+                else:
+                    timescale, duration, language = struct.unpack('>IIH', data[12:22])
+                track['tags']['language'] = parseLanguage(language)
+            elif boxType == b'hdlr' and 'handler' not in track:
+                # first hdlr is the media handler, quicktime adds a data handler in minf
+                data = readBox(f, childPos, childEnd)
+                track['handler'] = data[8:12]
+                track['codec_type'] = handlerTypes.get(data[8:12], 'data')
+                if data[4:8] == b'mhlr' and len(data) > 24:
+                    handlerName = data[25:25 + data[24]]
+                else:
+                    handlerName = data[24:].split(b'\x00', 1)[0]
+                if len(handlerName) > 0:
+                    track['tags']['handler_name'] = handlerName.decode('utf-8', errors='replace')
+            elif boxType == b'stsd':
+                parseSampleEntry(readBox(f, childPos, childEnd), track)
+            elif boxType == b'chap':
+                data = readBox(f, childPos, childEnd)
+                track['chapters'] = list(struct.unpack(f'>{len(data) // 4}I', data[:len(data) // 4 * 4]))
+    
+    walk(dataPos, boxEnd)
+    track.pop('handler', None)
+    if timescale > 0:
+        track['duration'] = f'{duration / timescale:.6f}'
+    return track
+
+# read mp4/mov metadata without touching mdat, ffprobe like output
+def readMP4Data(inputPath: Path) -> dict:
+    fileSize = os.path.getsize(inputPath)
+    result = {
+        'streams': list(),
+        'format': {
+            'filename': str(inputPath),
+            'nb_streams': 0,
+            'format_name': 'mov,mp4,m4a,3gp,3g2,mj2',
+            'size': str(fileSize),
+            'tags': dict(),
+        },
+    }
+    fmt = result['format']
+    tracks = list()
+    movieDuration = None
+    fragmented = False
+    
+    with open(inputPath, 'rb') as f:
+        for boxType, dataPos, boxEnd in iterBoxes(f, 0, fileSize):
+            if boxType == b'ftyp':
+                data = readBox(f, dataPos, boxEnd)
+                fmt['tags']['major_brand'] = data[:4].decode('latin-1')
+                fmt['tags']['minor_version'] = str(struct.unpack('>I', data[4:8])[0])
+                fmt['tags']['compatible_brands'] = data[8:].decode('latin-1')
+            elif boxType == b'mdat' and 'mdat_offset' not in fmt:
+                fmt['mdat_offset'] = dataPos - 8
+            elif boxType == b'moov':
+                fmt['moov_offset'] = dataPos - 8
+                for moovType, moovPos, moovEnd in iterBoxes(f, dataPos, boxEnd):
+                    if moovType == b'mvhd':
+                        data = readBox(f, moovPos, moovEnd)
+                        if data[0] == 1:
+                            timescale, duration = struct.unpack('>IQ', data[20:32])
+                        else:
+                            timescale, duration = struct.unpack('>II', data[12:20])
+                        if timescale > 0:
+                            movieDuration = duration / timescale
+                    elif moovType == b'mvex':
+                        fragmented = True
+                    elif moovType == b'trak':
+                        tracks.append(parseTrak(f, moovPos, moovEnd))
+    
+    if 'moov_offset' not in fmt:
+        raise MP4ReadError('No moov box')
+    if fragmented and not movieDuration:
+        raise MP4ReadError('Fragmented mp4 without duration')
+    
+    # quicktime chapter tracks are data streams for ffprobe
+    chapterIds = [ cid for t in tracks for cid in t.pop('chapters', list()) ]
+    for track in tracks:
+        trackId = track.pop('id', None)
+        if trackId in chapterIds:
+            track['codec_type'] = 'data'
+            track['codec_name'] = 'bin_data'
+        stream = { 'index': len(result['streams']) }
+        stream.update(track)
+        result['streams'].append(stream)
+    
+    fmt['nb_streams'] = len(result['streams'])
+    fmt['faststart'] = fmt['moov_offset'] < fmt.get('mdat_offset', fileSize)
+    # ffprobe reports the longest stream, mvhd is only the fallback
+    durations = [ float(s['duration']) for s in result['streams'] if 'duration' in s ]
+    if len(durations) > 0:
+        fmt['duration'] = f'{max(durations):.6f}'
+    elif movieDuration:
+        fmt['duration'] = f'{movieDuration:.6f}'
+    return result
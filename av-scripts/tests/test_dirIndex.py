@@ -0,0 +1,56 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from _encHelper import getDirIndex, searchMedia
+
+class DirIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.root = self.tempDir.name
+        self.subDir = os.path.join(self.root, 'subs')
+        os.mkdir(self.subDir)
+        self.writeFile(os.path.join(self.root, 'Show - 01.ass'), b'root')
+        self.writeFile(os.path.join(self.subDir, 'Show - 01.eng.ass'), b'sub')
+        self.pinMtimes()
+    
+    def tearDown(self):
+        self.tempDir.cleanup()
+    
+    def writeFile(self, path: str, data: bytes):
+        with open(path, 'wb') as f:
+            f.write(data)
+    
+    # folders get old mtime, so any change after indexing is seen on coarse timestamp filesystems
+    def pinMtimes(self):
+        for dirPath in [ self.root, self.subDir ]:
+            os.utime(dirPath, ns=(1000000000, 1000000000))
+    
+    def names(self) -> list:
+        return [ f.name for f in searchMedia(self.root, 'Show - 01', [ '.ass' ]) ]
+    
+    def test_index_is_reused(self):
+        self.assertIs(getDirIndex(self.root), getDirIndex(self.root))
+    
+    def test_file_added_in_subfolder(self):
+        self.assertEqual(len(self.names()), 2)
+        self.writeFile(os.path.join(self.subDir, 'Show - 01.jpn.ass'), b'new')
+        self.assertIn(os.path.join('subs', 'Show - 01.jpn.ass'), self.names())
+    
+    def test_file_removed_in_subfolder(self):
+        self.assertEqual(len(self.names()), 2)
+        os.remove(os.path.join(self.subDir, 'Show - 01.eng.ass'))
+        self.assertEqual(self.names(), [ 'Show - 01.ass' ])
+    
+    def test_file_rewritten_in_subfolder(self):
+        subsFile = searchMedia(self.root, 'Show - 01.eng', [ '.ass' ])[0]
+        self.assertEqual(subsFile.size, 3)
+        self.writeFile(os.path.join(self.subDir, 'Show - 01.eng.ass'), b'longer subs')
+        subsFile = searchMedia(self.root, 'Show - 01.eng', [ '.ass' ])[0]
+        self.assertEqual(subsFile.size, 11)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from _ffCmd import FFCmdError, FFCommand, FilterGraph
+from _encHelper import renditionFilters
+
+inFile = '/x/in.mkv'
+sourceSize = '1920x1080'
+textSubs = 'subtitles=filename=\'/x/in.ass\''
+headArgs = [ 'ffmpeg', '-hide_banner', '-loglevel', 'error', '-y', '-fflags', '+bitexact', '-flags:v', '+bitexact', '-flags:a', '+bitexact', '-i', inFile ]
+
+# one output per label, same shape as Multi renditions
+def buildCommand(graph: FilterGraph, outLabels: list) -> list:
+    cmd = FFCommand(overwrite=True)
+    cmd.input(inFile)
+    cmd.filterGraph(graph)
+    for outLabel in outLabels:
+        out = cmd.output(f'/x/{outLabel}.mp4').set('-an', '-sn', '-dn')
+        out.map(f'[{outLabel}]', '-c:v', 'libx264')
+        out.stripMetadata()
+        out.metadata('title', 'Video', 's:v:0')
+    return cmd.build()
+
+def outputArgs(outLabel: str) -> list:
+    return [ '-an', '-sn', '-dn', '-map', f'[{outLabel}]', '-c:v', 'libx264', '-map_metadata', '-1', '-map_chapters', '-1', '-metadata:s:v:0', 'title=Video', f'/x/{outLabel}.mp4' ]
+
+class FFCommandTest(unittest.TestCase):
+    def test_split_graph(self):
+        graph = FilterGraph()
+        renditionFilters(graph, '0:v:0', 'source', '', False, '', sourceSize)
+        graph.split('source', [ 'split0', 'split1' ])
+        graph.chain('split0', [ 'scale=1280:-2' ], 'v0')
+        graph.chain('split1', [ 'scale=854:-2' ], 'v1')
+        
+        filterGraph = '[0:v:0]format=yuv420p[source];[source]split=2[split0][split1];[split0]scale=1280:-2[v0];[split1]scale=854:-2[v1]'
+        expected = headArgs + [ '-filter_complex', filterGraph ] + outputArgs('v0') + outputArgs('v1')
+        self.assertEqual(buildCommand(graph, [ 'v0', 'v1' ]), expected)
+    
+    def test_text_subs(self):
+        graph = FilterGraph()
+        graph.split('0:v:0', [ 'split0', 'split1' ])
+        renditionFilters(graph, 'split0', 'v0', 'scale=1280:-2', True, textSubs, sourceSize)
+        renditionFilters(graph, 'split1', 'v1', '', False, textSubs, sourceSize)
+        
+        filterGraph = '[0:v:0]split=2[split0][split1];'
+        filterGraph += f'[split0]scale=1280:-2,format=yuv420p,deband,{textSubs}:original_size={sourceSize}[v0];'
+        filterGraph += f'[split1]format=yuv420p,{textSubs}[v1]'
+        expected = headArgs + [ '-filter_complex', filterGraph ] + outputArgs('v0') + outputArgs('v1')
+        self.assertEqual(buildCommand(graph, [ 'v0', 'v1' ]), expected)
+    
+    def test_bitmap_subs_scale2ref(self):
+        graph = FilterGraph()
+        renditionFilters(graph, '0:v:0', 'video', 'scale=1280:-2', False, '[0:s:1]', sourceSize)
+        
+        filterGraph = '[0:v:0]scale=1280:-2,format=yuv420p[videob];[0:s:1][videob]scale2ref[videos][videor];[videor][videos]overlay[video]'
+        expected = headArgs + [ '-filter_complex', filterGraph ] + outputArgs('video')
+        self.assertEqual(buildCommand(graph, [ 'video' ]), expected)
+    
+    def test_bitmap_subs_source_size(self):
+        graph = FilterGraph()
+        renditionFilters(graph, '0:v:0', 'video', '', False, '[0:s:1]', sourceSize)
+        
+        filterGraph = '[0:v:0]format=yuv420p[videob];[videob][0:s:1]overlay[video]'
+        expected = headArgs + [ '-filter_complex', filterGraph ] + outputArgs('video')
+        self.assertEqual(buildCommand(graph, [ 'video' ]), expected)
+    
+    def test_stream_maps_and_options(self):
+        cmd = FFCommand(bitexact=False)
+        cmd.options('-threads', '2')
+        audioInput = cmd.input('/x/audio.m4a', '-itsoffset', '0.5')
+        cmd.input(inFile)
+        cmd.output('/x/out.mp4').map('1:v:0', '-c:v', 'copy').map(f'{audioInput}:a:0?', '-c:a', 'copy').metadata('title', '')
+        
+        expected = [ 'ffmpeg', '-hide_banner', '-loglevel', 'error', '-threads', '2', '-itsoffset', '0.5', '-i', '/x/audio.m4a', '-i', inFile ]
+        expected += [ '-map', '1:v:0', '-c:v', 'copy', '-map', '0:a:0?', '-c:a', 'copy', '-metadata', 'title=', '/x/out.mp4' ]
+        self.assertEqual(cmd.build(), expected)
+    
+    def test_bad_commands(self):
+        cases = [
+            ('label produced twice', lambda g: g.chain('0:v:0', [ 'null' ], 'v').chain('0:v:0', [ 'null' ], 'v'), [ 'v' ]),
+            ('label consumed twice', lambda g: g.chain('0:v:0', [ 'null' ], 'v').chain('v', [ 'null' ], 'a').chain('v', [ 'null' ], 'b'), [ 'a', 'b' ]),
+            ('label never produced', lambda g: g.chain('x', [ 'null' ], 'v'), [ 'v' ]),
+            ('missing input', lambda g: g.chain('1:v:0', [ 'null' ], 'v'), [ 'v' ]),
+            ('unmapped output', lambda g: g.split('0:v:0', [ 'a', 'b' ]), [ 'a' ]),
+            ('mapped twice', lambda g: g.chain('0:v:0', [ 'null' ], 'v'), [ 'v', 'v' ]),
+            ('map not in graph', lambda g: g.chain('0:v:0', [ 'null' ], 'v'), [ 'v', 'w' ]),
+        ]
+        for name, makeGraph, outLabels in cases:
+            with self.subTest(name):
+                with self.assertRaises(FFCmdError):
+                    buildCommand(makeGraph(FilterGraph()), outLabels)
+        with self.assertRaises(FFCmdError):
+            FilterGraph().chain('0:v:0', [ '' ], 'v')
+        with self.assertRaises(FFCmdError):
+            FilterGraph().chain('0:v:0', [ 'null' ], '1:v:0')
+
+if __name__ == '__main__':
+    unittest.main()
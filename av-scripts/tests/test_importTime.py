@@ -0,0 +1,33 @@
+import os
+import sys
+import json
+import unittest
+import subprocess
+
+scriptsPath = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# loaded by scripts that need them, not by helper import
+lazyModules = [ 'numpy', 'PIL', 'questionary' ]
+
+# fresh interpreter, modules imported by other tests don't count
+importCheck = '''
+import sys, json, time
+startTime = time.perf_counter()
+import _encHelper
+importTime = time.perf_counter() - startTime
+loaded = sorted(set(m.split('.')[0] for m in sys.modules))
+print(json.dumps({ 'time': importTime, 'modules': loaded }))
+'''
+
+class ImportTest(unittest.TestCase):
+    def test_helper_import_is_lazy(self):
+        result = subprocess.run([ sys.executable, '-c', importCheck ], cwd=scriptsPath, check=True, capture_output=True, text=True)
+        importData = json.loads(result.stdout.strip().splitlines()[-1])
+        
+        eagerModules = [ m for m in lazyModules if m in importData['modules'] ]
+        self.assertEqual(eagerModules, list(), 'imported by _encHelper')
+        # generous budget, catches heavy imports coming back without timing flakes
+        self.assertLess(importData['time'], 5.0)
+
+if __name__ == '__main__':
+    unittest.main()
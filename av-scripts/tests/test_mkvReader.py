@@ -0,0 +1,82 @@
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from _mkvReader import readMKVData, mkvToMediaData
+
+# stream fields both readers fill for mkv
+streamFields = [ 'codec_type', 'codec_name', 'width', 'height', 'channels', 'sample_rate' ]
+streamTags = [ 'language', 'title', 'filename', 'mimetype' ]
+
+@unittest.skipUnless(shutil.which('ffmpeg') and shutil.which('ffprobe'), 'ffmpeg and ffprobe are required')
+class MKVReaderTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tempPath = tempfile.mkdtemp()
+        cls.mkvFile = os.path.join(cls.tempPath, 'sample.mkv')
+        fontFile = os.path.join(cls.tempPath, 'font.ttf')
+        noteFile = os.path.join(cls.tempPath, 'note.otf')
+        subsFile = os.path.join(cls.tempPath, 'subs.srt')
+        with open(fontFile, 'wb') as f:
+            f.write(b'font data')
+        with open(noteFile, 'wb') as f:
+            f.write(b'other font')
+        with open(subsFile, 'w', encoding='utf-8') as f:
+            f.write('1\n00:00:00,000 --> 00:00:01,000\nline\n')
+        
+        encCmd = [ 'ffmpeg', '-hide_banner', '-loglevel', 'error', '-y' ]
+        encCmd.extend([ '-f', 'lavfi', '-i', 'testsrc=size=64x48:rate=10:duration=2' ])
+        encCmd.extend([ '-f', 'lavfi', '-i', 'sine=frequency=440:sample_rate=48000:duration=2' ])
+        encCmd.extend([ '-i', subsFile, '-map', '0:v', '-map', '1:a', '-map', '2:s' ])
+        encCmd.extend([ '-c:v', 'mpeg4', '-c:a', 'pcm_s16le', '-c:s', 'ass' ])
+        encCmd.extend([ '-metadata', 'title=Sample', '-metadata:s:a:0', 'language=jpn', '-metadata:s:s:0', 'title=Full Subs' ])
+        # written with TagLanguage, ffprobe adds language suffix
+        encCmd.extend([ '-metadata:s:v:0', 'NUMBER_OF_BYTES-eng=1234', '-metadata:s:v:0', 'BPS=99', '-metadata:s:a:0', 'COMMENT-jpn=note' ])
+        encCmd.extend([ '-attach', fontFile, '-metadata:s:t:0', 'mimetype=application/x-truetype-font', '-metadata:s:t:0', 'title=Main Font' ])
+        encCmd.extend([ '-attach', noteFile, '-metadata:s:t:1', 'mimetype=font/otf', cls.mkvFile ])
+        subprocess.run(encCmd, check=True)
+        
+        probeCmd = [ 'ffprobe', '-v', 'error', '-show_entries', 'stream:stream_tags:format=duration:format_tags=title', '-of', 'json', cls.mkvFile ]
+        cls.ffprobeData = json.loads(subprocess.run(probeCmd, check=True, capture_output=True).stdout)
+        cls.readerData = mkvToMediaData(readMKVData(cls.mkvFile))
+    
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tempPath, ignore_errors=True)
+    
+    def test_streams_match_ffprobe(self):
+        ffStreams = self.ffprobeData['streams']
+        mkvStreams = self.readerData['streams']
+        self.assertEqual(len(mkvStreams), len(ffStreams))
+        
+        for ffStream, mkvStream in zip(ffStreams, mkvStreams):
+            for field in streamFields:
+                self.assertEqual(mkvStream.get(field), ffStream.get(field), f'stream {ffStream['index']} {field}')
+            ffTags = ffStream.get('tags', dict())
+            mkvTags = mkvStream.get('tags', dict())
+            for tag in streamTags:
+                self.assertEqual(mkvTags.get(tag), ffTags.get(tag), f'stream {ffStream['index']} tags.{tag}')
+    
+    def test_tags_match_ffprobe(self):
+        for ffStream, mkvStream in zip(self.ffprobeData['streams'], self.readerData['streams']):
+            self.assertEqual(mkvStream.get('tags', dict()), ffStream.get('tags', dict()), f'stream {ffStream['index']} tags')
+        self.assertEqual(self.readerData['streams'][0]['tags'].get('NUMBER_OF_BYTES-eng'), '1234')
+    
+    def test_attachment_title(self):
+        attachments = [ s for s in self.readerData['streams'] if s['codec_type'] == 'attachment' ]
+        self.assertEqual([ a['tags'].get('title') for a in attachments ], [ 'Main Font', None ])
+    
+    def test_format_matches_ffprobe(self):
+        ffFormat = self.ffprobeData['format']
+        mkvFormat = self.readerData['format']
+        self.assertAlmostEqual(float(mkvFormat['duration']), float(ffFormat['duration']), places=3)
+        self.assertEqual(mkvFormat['tags']['title'], ffFormat['tags']['title'])
+
+if __name__ == '__main__':
+    unittest.main()
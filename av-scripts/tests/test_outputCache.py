@@ -0,0 +1,59 @@
+import os
+import sys
+import tempfile
+import unittest
+
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from _encHelper import outputCacheKey, outputCacheFiles, fetchCachedOutputs, storeCachedOutputs
+
+cacheKey = 'a' * 40
+
+class OutputCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.tempPath = self.tempDir.name
+        self.env = mock.patch.dict(os.environ, { 'encCachePath': os.path.join(self.tempPath, 'cache'), 'encOutputCache': '1' })
+        self.env.start()
+        self.outFile = os.path.join(self.tempPath, 'out.mp4')
+        self.cacheFile = outputCacheFiles(cacheKey, [ self.outFile ])[0]
+    
+    def tearDown(self):
+        self.env.stop()
+        self.tempDir.cleanup()
+    
+    def writeFile(self, path: str, data: bytes):
+        with open(path, 'wb') as f:
+            f.write(data)
+    
+    def test_store_and_fetch_link(self):
+        self.writeFile(self.outFile, b'encoded')
+        storeCachedOutputs(cacheKey, [ self.outFile ])
+        self.assertTrue(os.path.samefile(self.outFile, self.cacheFile))
+        
+        os.remove(self.outFile)
+        self.assertTrue(fetchCachedOutputs(cacheKey, [ self.outFile ]))
+        self.assertTrue(os.path.samefile(self.outFile, self.cacheFile))
+    
+    def test_existing_output_is_kept(self):
+        self.writeFile(self.cacheFile, b'cached')
+        self.writeFile(self.outFile, b'user file')
+        self.assertFalse(fetchCachedOutputs(cacheKey, [ self.outFile ]))
+        with open(self.outFile, 'rb') as f:
+            self.assertEqual(f.read(), b'user file')
+    
+    def test_invalid_output_is_removed(self):
+        self.writeFile(self.cacheFile, b'')
+        self.assertFalse(fetchCachedOutputs(cacheKey, [ self.outFile ]))
+        self.assertFalse(os.path.exists(self.outFile))
+        self.assertFalse(os.path.exists(self.cacheFile))
+    
+    def test_cache_is_opt_in(self):
+        with mock.patch.dict(os.environ):
+            del os.environ['encOutputCache']
+            self.assertIsNone(outputCacheKey([ 'ffmpeg', '-i', self.outFile, 'x.mp4' ], [ 'x.mp4' ]))
+
+if __name__ == '__main__':
+    unittest.main()
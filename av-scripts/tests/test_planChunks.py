@@ -0,0 +1,60 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import subprocess
+
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from _encHelper import getKeyframes, planChunks
+
+# 10 fps, keyframe every 10 seconds
+def keyData(duration: int, step: int = 10) -> dict:
+    return { 'frames': duration * 10, 'first': 0.0, 'keyframes': [ [ float(t), t * 10 ] for t in range(0, duration, step) ] }
+
+class PlanChunksTest(unittest.TestCase):
+    def test_chunk_table(self):
+        cases = [
+            # no keyframes, one chunk to the end
+            ('no keyframes', { 'frames': 600, 'first': 0.0, 'keyframes': list() }, 60.0, 4,
+                [ (0.0, 0, 0, 60.0) ]),
+            # keyframe at first frame is never a cut
+            ('single keyframe', { 'frames': 600, 'first': 0.0, 'keyframes': [ [ 0.0, 0 ] ] }, 60.0, 4,
+                [ (0.0, 0, 0, 60.0) ]),
+            ('even split', keyData(100), 100.0, 4,
+                [ (0.0, 0, 300, 30.0), (30.0, 300, 300, 30.0), (60.0, 600, 0, 40.0) ]),
+            # 80s keyframe leaves 15s tail, shorter than minimum, joined with previous chunk
+            ('short last chunk', keyData(95), 95.0, 3,
+                [ (0.0, 0, 400, 40.0), (40.0, 400, 0, 55.0) ]),
+            # chunks never shorter than minimum, even with many jobs
+            ('min length', keyData(60, 5), 60.0, 8,
+                [ (0.0, 0, 200, 20.0), (20.0, 200, 200, 20.0), (40.0, 400, 0, 20.0) ]),
+            ('shorter than min', keyData(15, 5), 15.0, 4,
+                [ (0.0, 0, 0, 15.0) ]),
+        ]
+        for name, data, duration, count, expected in cases:
+            with self.subTest(name):
+                chunks = planChunks(data, duration, count)
+                self.assertEqual([ (c['start'], c['index'], c['frames'], c['duration']) for c in chunks ], expected)
+                self.assertAlmostEqual(sum(c['duration'] for c in chunks), duration)
+
+@unittest.skipUnless(shutil.which('ffmpeg') and shutil.which('ffprobe'), 'ffmpeg and ffprobe are required')
+class KeyframesTest(unittest.TestCase):
+    def test_times_relative_to_start(self):
+        with tempfile.TemporaryDirectory() as tempPath, mock.patch.dict(os.environ, { 'encCachePath': os.path.join(tempPath, 'cache') }):
+            mkvFile = os.path.join(tempPath, 'offset.mkv')
+            encCmd = [ 'ffmpeg', '-hide_banner', '-loglevel', 'error', '-y', '-f', 'lavfi', '-i', 'testsrc=size=64x48:rate=10:duration=3' ]
+            encCmd.extend([ '-c:v', 'mpeg4', '-g', '10', '-output_ts_offset', '5', mkvFile ])
+            subprocess.run(encCmd, check=True)
+            
+            keyData = getKeyframes(mkvFile)
+            self.assertEqual(keyData['frames'], 30)
+            self.assertEqual(keyData['first'], 0.0)
+            self.assertEqual(keyData['end'], 3.0)
+            self.assertEqual(keyData['keyframes'], [ [ 0.0, 0 ], [ 1.0, 10 ], [ 2.0, 20 ] ])
+
+if __name__ == '__main__':
+    unittest.main()
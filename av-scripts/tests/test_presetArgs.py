@@ -0,0 +1,55 @@
+import os
+import sys
+import json
+import tempfile
+import unittest
+
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from _encHelper import parsePresetArgs, loadPreset
+
+inFile = '/x/file.mkv'
+
+class PresetArgsTest(unittest.TestCase):
+    def test_flags_around_input(self):
+        cases = [
+            ([ inFile, '--crf', '20' ], { 'crf': '20' }),
+            ([ '--crf', '20', inFile ], { 'crf': '20' }),
+            ([ '--crf', '20', inFile, '--audio', '0' ], { 'crf': '20', 'audio': '0' }),
+            ([ '--crf=20', inFile, '--chunk-jobs', '3' ], { 'crf': '20', 'chunk_jobs': '3' }),
+            ([ '--batch', inFile, '--crf', '20' ], { 'batch': True, 'crf': '20' }),
+            ([ '--crf', '20', '--batch', inFile ], { 'crf': '20', 'batch': True }),
+            ([ '--crf', '20', '--', '--odd name.mkv' ], { 'crf': '20' }),
+        ]
+        for args, expected in cases:
+            with self.subTest(args=args):
+                values, positional = parsePresetArgs(args)
+                self.assertEqual(values.pop('preset'), list())
+                self.assertEqual(values, expected)
+                self.assertEqual(positional[0], '--odd name.mkv' if '--' in args else inFile)
+    
+    def test_flag_at_end_is_switch(self):
+        values, positional = parsePresetArgs([ inFile, '--deband' ])
+        self.assertEqual(values, { 'preset': list(), 'deband': True })
+        self.assertEqual(positional, [ inFile ])
+    
+    def test_preset_files_and_overrides(self):
+        with tempfile.TemporaryDirectory() as tempPath:
+            presetFile = os.path.join(tempPath, 'preset.json')
+            with open(presetFile, 'w', encoding='utf-8') as f:
+                json.dump({ 'crf': '18', 'audio': 'first', 'encode_crf': { 'title': 'T' } }, f)
+            
+            with mock.patch.dict(os.environ):
+                preset = loadPreset('encode_crf', [ '--preset', presetFile, '--crf', '20', inFile, '--batch' ])
+                self.assertEqual(os.environ.get('isBatch'), '1')
+            self.assertEqual(preset.input, inFile)
+            self.assertEqual(preset.values, { 'crf': '20', 'audio': 'first', 'title': 'T', 'batch': True })
+    
+    def test_no_input(self):
+        preset = loadPreset('encode_crf', [ '--crf', '20' ])
+        self.assertIsNone(preset.input)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -18,21 +18,21 @@ except ModuleNotFoundError:
     exit()
 
 from _encHelper import boolYN, IntValidator, PathValidator, extVideoFile, fixPath
-from _encHelper import getMediaData, audioTitle, searchSubsFile
+from _encHelper import MediaProbe, getMediaData, audioTitle, searchSubsFile
+from _encHelper import hwAccelArgs, runFFmpeg, loadPreset, FFCommand
 
 # file
 def configFile(inFile: Path):
     print(f'\n:: Checking: {PurePath(inFile).name}')
     
-    encCmd = list()
-    encCmd.extend([ r'ffmpeg', '-hide_banner', ])
-    encCmd.extend([ '-loglevel', 'error', '-stats', ])
-    encCmd.extend([ '-hwaccel', 'auto', ])
-    encCmd.extend([ '-i', inFile ]);
-    encCmd.extend([ '-f', 'null', '-' ]);
+    cmd = FFCommand(bitexact=False)
+    cmd.options(*hwAccelArgs())
+    cmd.input(inFile)
+    cmd.output('-').set('-f', 'null')
+    encCmd = cmd.build()
     
     startTime = time.monotonic()
-    subprocess.run(encCmd)
+    runFFmpeg(encCmd, PurePath(inFile).stem, MediaProbe(inFile, fields=[ 'format.duration' ]).duration)
     
     runTime = time.monotonic() - startTime
     hours, rem = divmod(runTime, 3600)
@@ -52,12 +52,15 @@ def configFolder(inPath: Path):
     for i in range(len(inFile)):
         configFile(inFile[i])
 
+# preset and cli flags
+preset = loadPreset('check_video')
+
 # set folder
-if len(sys.argv) < 2:
+if preset.input is None:
     inputPath = questionary.text(':: Folder/File: ', validate=PathValidator).ask()
     inputPath = inputPath.strip('\"')
 else:
-    inputPath = sys.argv[1]
+    inputPath = preset.input
 
 # to abs path
 inputPath = os.path.abspath(inputPath)
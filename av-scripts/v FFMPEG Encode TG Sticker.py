@@ -20,14 +20,15 @@ except ModuleNotFoundError:
     exit()
 
 from _encHelper import boolYN, IntValidator, FloatValidatorP, PathValidator, extVideoFile, fixPath
-from _encHelper import getMediaData, audioTitle, searchSubsFile
+from _encHelper import MediaProbe, audioTitle, searchSubsFile
+from _encHelper import hwAccelArgs, runFFmpeg, loadPreset, FilterGraph, FFCommand
 extVideoFile.extend(['.gif'])
 
-def videoFilterGen(extendedFilter: bool = False):
-    baseFilter = "[0:v:0]scale=512:512:force_original_aspect_ratio=decrease"
+def videoFilterGen(extendedFilter: bool = False) -> FilterGraph:
+    baseFilter = [ 'scale=512:512:force_original_aspect_ratio=decrease' ]
     
     if not extendedFilter:
-        return baseFilter
+        return FilterGraph().chain('0:v:0', baseFilter, 'video')
     
     rgbVal = f"r='r(X,Y)':g='g(X,Y)':b='b(X,Y)'"
     rv = "25"
@@ -40,17 +41,17 @@ def videoFilterGen(extendedFilter: bool = False):
         f"* max(lt(hypot(W-X-{rv}, H-Y-{rv}), {rv}), 1-gt(X, W-{rv})*gt(Y, H-{rv}))'"
     )
     
-    extFilter = (
-        f"{baseFilter},format=rgba[v];"
-        f"[v]geq={rgbVal}{alphaMask}[v];"
-        f"[v]format=yuva420p"
-    )
+    extFilter = baseFilter + [
+        'format=rgba',
+        f'geq={rgbVal}{alphaMask}',
+        'format=yuva420p',
+    ]
     
-    return extFilter
+    return FilterGraph().chain('0:v:0', extFilter, 'video')
 
 # file
 def configFile(inFile: Path):
-    videoData = getMediaData(inFile, 'v', True)
+    videoData = MediaProbe(inFile, True, []).video
     if len(videoData) < 1:
         print()
         print(f':: Skipping: {PurePath(inFile).name}')
@@ -61,11 +62,11 @@ def configFile(inFile: Path):
     encFPS = ''
     encTrm = ''
     
-    useOvl = questionary.confirm('Use Overlay Filter (Default=No):', default=False).ask()
-    encCrf = questionary.text('Set Encode CRF:', validate=IntValidator, default='20').ask()
+    useOvl = preset.confirm('overlay', 'Use Overlay Filter (Default=No):', False)
+    encCrf = preset.text('crf', 'Set Encode CRF:', '20', IntValidator)
     # encFPS = questionary.text('Set Custom FPS:', default='').ask()
     # encTrm = questionary.text('Trim Video:', default='').ask()
-    vTitle = questionary.text('Set Video Title:').ask()
+    vTitle = preset.text('title', 'Set Video Title:')
     
     startTime = time.monotonic()
     encodeTgSticker(inFile, useOvl, encCrf, encFPS, encTrm, vTitle)
@@ -81,43 +82,38 @@ def encodeTgSticker(inFile: Path, useOvl: bool, encCrf: int, encFPS: str, encTrm
     outFileFx = f'{outFolder}/{PurePath(inFile).stem} [tg crf-{encCrf}-fix].webm'
     outFilter = videoFilterGen(useOvl)
     
-    encCmd = list()
-    encCmd.extend([ r'ffmpeg', '-hide_banner', ])
-    encCmd.extend([ '-loglevel', 'error', '-stats', ])
-    encCmd.extend([ '-hwaccel', 'auto', ])
-    encCmd.extend([ '-fflags', '+bitexact' ])
-    encCmd.extend([ '-flags:v', '+bitexact' ])
-    encCmd.extend([ '-flags:a', '+bitexact' ])
-    
-    encCmd.extend([ '-i', inFile ]);
-    encCmd.extend([ '-an', '-sn', '-dn' ])
+    cmd = FFCommand()
+    cmd.options(*hwAccelArgs())
+    cmd.input(inFile)
+    cmd.filterGraph(outFilter)
     
-    encCmd.extend([ '-filter_complex', f'{outFilter}[video]' ])
-    encCmd.extend([ '-map', '[video]', '-c:v', 'libvpx-vp9', '-b:v', '0' ])
-    encCmd.extend([ '-crf', f'{encCrf}', '-deadline', 'best' ])
-    encCmd.extend([ '-map_metadata', '-1', '-map_chapters', '-1' ])
+    out = cmd.output(outFile).set('-an', '-sn', '-dn')
+    out.map('[video]', '-c:v', 'libvpx-vp9', '-b:v', '0')
+    out.set('-crf', f'{encCrf}', '-deadline', 'best')
+    out.stripMetadata()
     
-    encCmd.extend([ '-metadata', 'application=' ])
-    encCmd.extend([ '-metadata', 'writing_library=' ])
+    out.metadata('application', '')
+    out.metadata('writing_library', '')
     
     if vTitle != '':
-        encCmd.extend([ '-metadata:s:v:0', f'title={vTitle}' ])
+        out.metadata('title', vTitle, 's:v:0')
     
     if FloatValidatorP(encFPS):
-        encCmd.extend([ '-r', encFPS ])
+        out.set('-r', encFPS)
         if not filterTest:
             print(f':: FPS Changed to {encFPS}')
     
     if FloatValidatorP(encTrm):
-        encCmd.extend([ '-t', encTrm ])
+        out.set('-t', encTrm)
         if not filterTest:
             print(f':: Trimmed to {encTrm}')
     
     print(f':: Trying Encode File With CRF {encCrf}')
-    encCmd.extend([ outFile ])
+    encCmd = cmd.build()
     
     if not os.path.isfile(outFile):
-        subprocess.run(encCmd)
+        encDur = float(encTrm) if FloatValidatorP(encTrm) else MediaProbe(inFile, fields=[ 'format.duration' ]).duration
+        runFFmpeg(encCmd, PurePath(outFile).stem, encDur)
     
     fsize = os.path.getsize(outFile)
     if fsize > 256*1024 and int(encCrf) < 63:
@@ -128,33 +124,35 @@ def encodeTgSticker(inFile: Path, useOvl: bool, encCrf: int, encFPS: str, encTrm
         return outFile, outFileFx
     
     if not os.path.isfile(outFileFx):
-        stickData = getMediaData(outFile)
-        if 'format' in stickData and 'duration' in stickData['format']:
-            if float(stickData['format']['duration']) > 3:
-                shutil.copy(outFile, outFileFx)
-                
-                file = open(outFileFx, 'r+b')
-                content = file.read()
-                offset = content.find(b'\x44\x89')
-                
-                if offset > -1:
-                    file.seek(offset + 2)
-                    elSize = file.read(1)
-                    if elSize == b'\x88':
-                        # 8 bytes double float
-                        file.write(struct.pack('>d', 3000))
+        stickData = MediaProbe(outFile, fields=[ 'format.duration' ])
+        if stickData.duration > 3:
+            shutil.copy(outFile, outFileFx)
+            
+            file = open(outFileFx, 'r+b')
+            content = file.read()
+            offset = content.find(b'\x44\x89')
+            
+            if offset > -1:
+                file.seek(offset + 2)
+                elSize = file.read(1)
+                if elSize == b'\x88':
+                    # 8 bytes double float
+                    file.write(struct.pack('>d', 3000))
 
 # folder
 def configFolder(inPath: Path):
     print(f'\n:: Selected path: {os.path.abspath(inPath)}')
     print(f'script not usable for dir!')
 
+# preset and cli flags
+preset = loadPreset('encode_tg')
+
 # set folder
-if len(sys.argv) < 2:
+if preset.input is None:
     inputPath = questionary.text(':: Folder/File: ', validate=PathValidator).ask()
     inputPath = inputPath.strip('\"')
 else:
-    inputPath = sys.argv[1]
+    inputPath = preset.input
 
 # to abs path
 inputPath = os.path.abspath(inputPath)
@@ -3,7 +3,10 @@
 import os
 import re
 import sys
+import json
 import time
+import shutil
+import hashlib
 import subprocess
 
 from pathlib import Path
@@ -12,7 +15,13 @@ from pathlib import PurePath
 try:
     from _encHelper import moduleNotFound
     from _encHelper import boolYN, IntValidator, PathValidator, extVideoFile, fixPath
-    from _encHelper import getMediaData, audioTitle, searchSubsFile
+    from _encHelper import MediaProbe, probeFields, audioTitle, searchSubsFile
+    from _encHelper import hwAccelArgs, hasFilter, getEncodedAudio, audioPolicy, runFFmpeg
+    from _encHelper import loadPreset, trackInfo
+    from _encHelper import EncodeJob, validateOutput, runEncodeJobs, encodeJobs, encodeThreads, getCacheDir, getKeyframes, planChunks
+    from _encHelper import outputCacheKey, fetchCachedOutputs, storeCachedOutputs
+    from _encHelper import videoCopyDecision, webVideoTarget, renditionFilters
+    from _encHelper import FFCommand, FilterGraph
 except ModuleNotFoundError as errorModule:
     print(':: EncHelper Not Found...')
     input(':: Press enter to continue...\n')
@@ -26,100 +35,240 @@ except ModuleNotFoundError as errorModule:
     moduleNotFound(str(errorModule))
     exit()
 
+# source filters, chunks reset timestamps after subtitles are rendered with source times
+def videoGraph(subsFilter: str, sourceSize: str, chunked: bool = False) -> FilterGraph:
+    graph = renditionFilters(FilterGraph(), '0:v:0', 'source' if chunked else 'video', '', False, subsFilter, sourceSize)
+    if chunked:
+        graph.chain('source', [ 'setpts=PTS-STARTPTS' ], 'video')
+    return graph
+
+# one chunk from keyframe, copyts keeps file timestamps for subtitles, chunk itself starts at zero
+# start_at_zero drops source start_time, so subtitles see the same times as unchunked encode
+# chunk folder is keyed by source and settings, so finished chunks there are reused
+def encodeChunk(chunkFile: str, inFile: Path, start: float, frames: int, duration: float, vGraph: FilterGraph, videoArgs: list, encJob: EncodeJob):
+    if validateOutput(chunkFile, duration):
+        return
+    
+    cmd = FFCommand(overwrite=True, bitexact=False)
+    cmd.options(*hwAccelArgs(), *encJob.inputArgs())
+    cmd.options('-fflags', '+bitexact', '-flags:v', '+bitexact')
+    inputArgs = [ '-copyts', '-start_at_zero' ]
+    if start > 0:
+        inputArgs.extend([ '-ss', f'{start - 0.001:.6f}' ])
+    cmd.input(inFile, *inputArgs)
+    cmd.filterGraph(vGraph)
+    
+    out = cmd.output(encJob.partFile(chunkFile)).set('-an', '-sn', '-dn')
+    out.map('[video]', *videoArgs)
+    out.set(*encJob.outputArgs())
+    if frames > 0:
+        out.set('-frames:v', str(frames))
+    encCmd = cmd.build()
+    
+    returnCode = encJob.run(encCmd, PurePath(chunkFile).stem, duration=duration)
+    encJob.finish([ chunkFile ], returnCode, duration)
+
+# chunks from keyframes, returns job items and chunk folder, or None when source is not split
+# finished chunks stay in cache until the final mux succeeds, rerun encodes only missing ones
+def planChunked(inFile: Path, probe: MediaProbe, vGraph: FilterGraph, videoArgs: list, chunkJobs: int):
+    keyData = getKeyframes(inFile)
+    if keyData is None:
+        print(':: No keyframes found, chunked encode skipped...')
+        return None, None
+    
+    chunks = planChunks(keyData, keyData.get('end', probe.duration), chunkJobs * 2)
+    if len(chunks) < 2:
+        return None, None
+    
+    st = os.stat(inFile)
+    chunkKey = [ os.path.abspath(inFile), st.st_size, st.st_mtime_ns, str(vGraph), videoArgs ]
+    chunkKey = hashlib.sha1(json.dumps(chunkKey).encode('utf-8')).hexdigest()
+    chunkPath = getCacheDir('chunks', chunkKey)
+    if chunkPath is None:
+        return None, None
+    
+    jobItems = list()
+    for c in chunks:
+        chunkFile = os.path.join(chunkPath, f'{c['index']:08d}-{c['frames']}.mkv')
+        jobItems.append((chunkFile, inFile, c['start'], c['frames'], c['duration'], vGraph, videoArgs))
+    return jobItems, chunkPath
+
+# encode chunks in parallel and write concat list, False when any chunk failed
+def encodeChunked(jobItems: list, chunkList: str, chunkJobs: int) -> bool:
+    print(f':: Chunked encode: {len(jobItems)} chunks, {chunkJobs} jobs')
+    runEncodeJobs(encodeChunk, jobItems, chunkJobs)
+    
+    chunkFiles = [ jobItem[0] for jobItem in jobItems ]
+    if not all(os.path.isfile(f) for f in chunkFiles):
+        print(f':: Chunked encode failed, finished chunks kept in: {os.path.dirname(chunkList)}')
+        return False
+    
+    with open(chunkList, 'w', encoding='utf-8') as f:
+        for chunkFile in chunkFiles:
+            chunkFile = chunkFile.replace('\'', '\'\\\'\'')
+            f.write(f"file '{chunkFile}'\n")
+    return True
+
 # file
 def configFile(inFile: Path):
     outFolder = PurePath(inFile).parent
     outFile   = f'{outFolder}/{PurePath(inFile).stem} [enc].mp4'
     inFonts = fixPath(f'{outFolder}/fonts', True)
     
-    videoData = getMediaData(inFile, 'v', True)
+    probe = MediaProbe(inFile, True, probeFields)
+    videoData = probe.video
     if len(videoData) < 1:
         print()
         print(f':: Skipping: {PurePath(inFile).name}')
         print(f':: No video streams!')
         return
     
-    videoInfo = getMediaData(inFile)
-    videoDur  = round(float(videoInfo['format']['duration']))
+    videoDur  = round(probe.duration)
     videoDur_h, videoDur_r = divmod(videoDur, 3600)
     videoDur_m, videoDur_s = divmod(videoDur_r, 60)
     print(f':: Duration : {videoDur_h:02.0f}:{videoDur_m:02.0f}:{videoDur_s:02.0f}')
     
-    vFilters = '[0:v:0]format=yuv420p'
-    encCrf = qtext('Set Encode CRF:', validate=IntValidator, default='20').ask()
+    subsFilter = ''
+    cachePaths = [ f'{outFolder}/fonts' ]
+    encCrf = preset.text('crf', 'Set Encode CRF:', '20', IntValidator)
     
     audioList = list()
-    audioData = getMediaData(inFile, 'a')
+    audioInfo = dict()
+    audioData = probe.audio
     for t in range(len(audioData)):
         tname = audioTitle(audioData, t)
         audioList.append(Choice(f'[{str(t).rjust(2)}]: {tname}', value=t))
+        audioInfo[t] = trackInfo(audioData[t])
     audioList.append(Choice('[-1]: No Audio', value='-1'))
     
+    audioMap = ''
     audioCmd = list()
-    audioTrack = qselect('Select Audio Track:', audioList).ask()
+    audioAction = 'reject'
+    audioTrack = preset.select('audio', 'Select Audio Track:', audioList, audioInfo)
     if audioTrack != '-1':
-        encodeAudio = qconfirm('Encode Audio to AAC 192k 2ch (Default=No):', default=False).ask()
+        encodeAudio = preset.confirm('audio_encode', 'Encode Audio to AAC 192k 2ch (Default=No):', False)
         atid = int(audioTrack)
-        if encodeAudio:
-            audioCmd = [ '-map', f'0:a:{atid}?', f'-c:a', 'aac', '-cutoff', '0', '-b:a', f'192k', '-ac', '2' ]
-        else:
-            audioCmd = [ '-map', f'0:a:{atid}?', f'-c:a', 'copy' ]
+        # compliant tracks are copied even when aac stereo is requested
+        audioAction, audioArgs, audioReason = audioPolicy(audioData[atid], 'aac-stereo' if encodeAudio else 'mp4')
+        print(f':: Audio    : {audioAction}, {audioReason}')
+        if audioAction != 'reject':
+            audioMap = f'0:a:{atid}?'
+            audioCmd = audioArgs
+    
+    vTitle = preset.text('title', 'Set Video Title:')
     
-    vTitle = qtext('Set Video Title:').ask()
+    # split long sources at keyframes and encode chunks in parallel
+    chunkJobs = int(preset.text('chunk_jobs', 'Chunk Encode Jobs (1=Off):', str(encodeJobs), IntValidator))
     
-    subsData = searchSubsFile(inFile)
-    subsTrack = qselect('Subtitle For HardSubs:', subsData.sel).ask()
+    subsData = searchSubsFile(inFile, probe=probe)
+    subsTrack = preset.select('subs', 'Subtitle For HardSubs:', subsData.sel, subsData.inf)
+    if subsTrack != '-1' and subsData.inf[subsTrack]['codec'] not in [ 'dvd_subtitle', 'hdmv_pgs_subtitle' ]:
+        if not hasFilter('subtitles'):
+            print(':: FFmpeg is built without "subtitles" filter, skipping hardsubs...')
+            subsTrack = '-1'
     if subsTrack != '-1':
         inSubs = subsData.inf[subsTrack]
+        cachePaths.append(inSubs['file'])
         inSubsFile = fixPath(inSubs['file'], True)
         tid = int(subsTrack.split(':')[1])
         
-        outsubs = f'filename=\'{inSubsFile}\''
-        overlay = False
-        
+        subsFilter = f'subtitles=filename=\'{inSubsFile}\''
         if inSubs['ext']:
-            outsubs = f'subtitles={outsubs}:fontsdir=\'{inFonts}\''
+            subsFilter = f'{subsFilter}:fontsdir=\'{inFonts}\''
         else:
             subsCodec = inSubs['codec']
             if subsCodec == 'dvd_subtitle' or subsCodec == 'hdmv_pgs_subtitle':
-                overlay = True
-                outsubs = f'[v];[v][0:s:{tid}]overlay'
+                subsFilter = f'[0:s:{tid}]'
             else:
-                outsubs = f'subtitles={outsubs}:stream_index={tid}:fontsdir=\'{inFonts}\''
-        comaadd = ',' if not overlay else ''
-        vFilters = f'{vFilters}{comaadd}{outsubs}'
-    
-    encCmd = list()
-    encCmd.extend([ r'ffmpeg', '-hide_banner', ])
-    encCmd.extend([ '-loglevel', 'error', '-stats', ])
-    encCmd.extend([ '-hwaccel', 'auto', ])
-    encCmd.extend([ '-fflags', '+bitexact' ])
-    encCmd.extend([ '-flags:v', '+bitexact' ])
-    encCmd.extend([ '-flags:a', '+bitexact' ])
-    
-    encCmd.extend([ '-i', inFile ]);
-    if audioTrack == '-1':
-        encCmd.extend([ '-an' ])
-    encCmd.extend([ '-sn', '-dn' ])
-    
-    encCmd.extend([ '-filter_complex', f'{vFilters}[video]' ])
-    
-    encCmd.extend([ '-map', '[video]', '-c:v', 'libx264', '-crf', encCrf ])
-    encCmd.extend([ '-preset:v', 'faster', '-tune:v', 'animation' ])
-    if len(audioCmd) > 0:
-        encCmd.extend(audioCmd)
-    
-    encCmd.extend([ '-map_metadata', '-1', '-map_chapters', '-1' ])
-    encCmd.extend([ '-metadata', 'application=' ])
-    encCmd.extend([ '-metadata', 'writing_library=' ])
+                subsFilter = f'{subsFilter}:stream_index={tid}:fontsdir=\'{inFonts}\''
+    
+    # no resize here, subtitles render at source size
+    vSize = f'{videoData[0]['width']}x{videoData[0]['height']}'
+    vGraph = videoGraph(subsFilter, vSize)
+    
+    # stream copy when nothing is rendered and source already fits target
+    videoCopy = False
+    filtersUsed = 'hardsubs' if subsTrack != '-1' else ''
+    copyVideo, copyReason = videoCopyDecision(inFile, webVideoTarget, videoData[0]['width'], videoData[0]['height'], filtersUsed)
+    if copyVideo:
+        print(f':: Video    : {copyReason}')
+        videoCopy = preset.confirm('video_copy', 'Copy Video Stream (Default=Yes):', True)
+    else:
+        print(f':: Video    : encode, {copyReason}')
+    
+    cmd = FFCommand()
+    cmd.options(*hwAccelArgs())
+    cmd.input(inFile)
+    
+    # encoded audio from cache when available
+    audioInput = None
+    if audioAction == 'transcode':
+        audioInput = getEncodedAudio(inFile, atid, audioArgs, probe.duration)
+    if audioInput is not None:
+        audioMap = f'{cmd.input(audioInput)}:a:0'
+        audioCmd = [ '-c:a', 'copy' ]
+    
+    videoArgs = [ '-c:v', 'libx264', '-crf', encCrf ]
+    videoArgs.extend([ '-preset:v', 'faster', '-tune:v', 'animation' ])
+    if videoCopy:
+        videoArgs = [ '-c:v', 'copy' ]
+        chunkJobs = 1
+    
+    # split long sources at keyframes, chunks are encoded after output cache check
+    chunkItems, chunkPath, chunkList = None, None, None
+    chunkGraph = videoGraph(subsFilter, vSize, True)
+    if chunkJobs > 1:
+        chunkItems, chunkPath = planChunked(inFile, probe, chunkGraph, videoArgs, chunkJobs)
+    
+    out = cmd.output(outFile)
+    if audioMap == '':
+        out.set('-an')
+    out.set('-sn', '-dn')
+    
+    if chunkItems is not None:
+        # chunks start at zero, shift to first video frame of source
+        chunkList = os.path.join(chunkPath, 'concat.txt')
+        chunkOffset = f'{getKeyframes(inFile)['first']:.6f}'
+        chunkInput = cmd.input(chunkList, '-itsoffset', chunkOffset, '-f', 'concat', '-safe', '0')
+        out.map(f'{chunkInput}:v:0', '-c:v', 'copy')
+    elif videoCopy:
+        out.map('0:v:0', *videoArgs)
+    else:
+        cmd.filterGraph(vGraph)
+        out.map('[video]', *videoArgs)
+    if audioMap != '':
+        out.map(audioMap, *audioCmd)
+    
+    out.stripMetadata()
+    out.metadata('application', '')
+    out.metadata('writing_library', '')
     if vTitle != '':
-        encCmd.extend([ '-metadata:s:v:0', f'title={vTitle}' ])
+        out.metadata('title', vTitle, 's:v:0')
     
-    # encCmd.extend([ '-brand', 'mp42' ])
-    encCmd.extend([ outFile ])
+    # out.set('-brand', 'mp42')
+    encCmd = cmd.build()
+    
+    # output cache, chunked video is keyed by chunk filters and layout, concat list is not written yet
+    cacheExtra = None
+    if chunkItems is not None:
+        cacheExtra = [ str(chunkGraph), videoArgs, [ jobItem[2:5] for jobItem in chunkItems ], chunkJobs, encodeThreads ]
+        if os.path.isfile(chunkList):
+            os.remove(chunkList)
+    cacheKey = outputCacheKey(encCmd, [ outFile ], cachePaths, cacheExtra)
     
     startTime = time.monotonic()
-    subprocess.run(encCmd)
+    if fetchCachedOutputs(cacheKey, [ outFile ], probe.duration):
+        print(f':: Output from cache: {PurePath(outFile).name}')
+        return
+    
+    if chunkItems is not None and not encodeChunked(chunkItems, chunkList, chunkJobs):
+        return
+    
+    returnCode = runFFmpeg(encCmd, PurePath(outFile).stem, probe.duration)
+    if returnCode == 0:
+        storeCachedOutputs(cacheKey, [ outFile ])
+    if returnCode == 0 and chunkPath is not None:
+        shutil.rmtree(chunkPath, ignore_errors=True)
     
     runTime = time.monotonic() - startTime
     hours, rem = divmod(runTime, 3600)
@@ -131,12 +280,15 @@ def configFolder(inPath: Path):
     print(f'\n:: Selected path: {os.path.abspath(inPath)}')
     print(f'script not usable for dir!')
 
+# preset and cli flags
+preset = loadPreset('encode_crf')
+
 # set folder
-if len(sys.argv) < 2:
+if preset.input is None:
     inputPath = qtext(':: Folder/File: ', validate=PathValidator).ask()
     inputPath = inputPath.strip('\"')
 else:
-    inputPath = sys.argv[1]
+    inputPath = preset.input
 
 # to abs path
 inputPath = os.path.abspath(inputPath)
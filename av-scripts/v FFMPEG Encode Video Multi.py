@@ -12,7 +12,13 @@ from pathlib import PurePath
 try:
     from _encHelper import moduleNotFound
     from _encHelper import boolYN, IntValidator, PathValidator, extVideoFile, fixPath
-    from _encHelper import getMediaData, audioTitle, searchSubsFile
+    from _encHelper import MediaProbe, probe_many, probeFields, walkMedia, audioTitle, searchSubsFile
+    from _encHelper import hwAccelArgs, hasEncoder, hasFilter, audioCacheFile, getEncodedAudio, audioPolicy
+    from _encHelper import EncodeJob, BatchManifest, runEncodeJobs, encodeJobs, presetBool
+    from _encHelper import loadPreset, trackInfo
+    from _encHelper import outputCacheKey, fetchCachedOutputs, storeCachedOutputs
+    from _encHelper import videoCopyDecision, webVideoTarget, renditionFilters
+    from _encHelper import FFCommand, FilterGraph
     from _encHelper import classify_video_resolution
 except ModuleNotFoundError as errorModule:
     print(':: EncHelper Not Found...')
@@ -34,14 +40,39 @@ reClean = re.compile(r'^(\[[^\[\]]*?\]|\([^\(\)]*?\))|(\s?\[[^\[\]]*?\]|\([^\(\)
 
 #################################################
 
+# output name
+def renditionFile(inFile: Path, curVideoSize: list) -> str:
+    outFolder = PurePath(inFile).parent
+    outNameTemp = PurePath(inFile).stem
+    
+    reMatchClean = re.search(reClean, outNameTemp)
+    while reMatchClean is not None:
+        outNameTemp = (re.sub(reClean, '', outNameTemp)).strip()
+        reMatchClean = re.search(reClean, outNameTemp)
+    
+    vid_res = classify_video_resolution(int(curVideoSize[0]), int(curVideoSize[1]))
+    outExt = vid_res['label']
+    
+    if m := reName.match(outNameTemp):
+        title, episode = m.group('title'), m.group('episode')
+        outFolder = f'{outFolder}/../{title}'
+        outFile   = f'{title} - {episode} [{outExt}].mp4'
+    else:
+        if os.path.isdir(inputPath):
+            outFolder = f'{outFolder} [ENCODED]'
+        outFile   = f'{PurePath(inFile).stem} [{outExt}].mp4'
+    
+    os.makedirs(outFolder, exist_ok=True)
+    return os.path.abspath(f'{outFolder}/{outFile}')
+
 # encode
-def encodeFile(inFile: Path, nvEncCodec: bool, setQuality: str, doDeband: bool, doResize: bool, audioTrackIndex: str, encodeAudio: bool, subsTrackIndex: str):
+def encodeFile(inFile: Path, probe: MediaProbe, nvEncCodec: bool, setQuality: str, doDeband: bool, doResize: bool, splitEncode: bool, audioTrackIndex: str, encodeAudio: bool, subsTrackIndex: str, videoCopy: bool, encJob: EncodeJob):
     # inFile  = os.path.abspath(inFile)
     inDir   = PurePath(inFile).parent
     inFonts = fixPath(f'{inDir}/fonts', True)
-    inSubs  = searchSubsFile(inFile)
+    inSubs  = searchSubsFile(inFile, probe=probe)
     
-    videoData = getMediaData(inFile, 'v', True)
+    videoData = probe.video
     if len(videoData) < 1:
         print()
         print(f':: Skipping: {PurePath(inFile).name}')
@@ -49,9 +80,8 @@ def encodeFile(inFile: Path, nvEncCodec: bool, setQuality: str, doDeband: bool,
         return
     
     videoData = videoData[0]
-    audioData = getMediaData(inFile, 'a')
+    audioData = probe.audio
     outVideoSize = [[ str(videoData['width']), str(videoData['height']) ]]
-    audioBitrate = '192'
     
     if doResize:
         src_data = classify_video_resolution(videoData['width'], videoData['height'])
@@ -60,147 +90,194 @@ def encodeFile(inFile: Path, nvEncCodec: bool, setQuality: str, doDeband: bool,
         if src_data['numeric_label'] >= 1080:
             outVideoSize.append(['1280', '720'])
     
-    for x in range(len(outVideoSize)):
-        outFolder = inDir
-        outNameTemp = PurePath(inFile).stem
-        curVideoSize = outVideoSize[x]
-        
-        reMatchClean = re.search(reClean, outNameTemp)
-        while reMatchClean is not None:
-            outNameTemp = (re.sub(reClean, '', outNameTemp)).strip()
-            reMatchClean = re.search(reClean, outNameTemp)
+    # text subs filter or bitmap subs stream, placed in graph by renditionFilters
+    subsFilter = ''
+    inSubsLog = ''
+    sourceSize = f'{videoData['width']}x{videoData['height']}'
+    
+    # files read by filters, part of output cache key
+    cachePaths = [ f'{inDir}/fonts' ]
+    
+    if subsTrackIndex != '-1' and subsTrackIndex in inSubs.inf:
+        inSubsInf  = inSubs.inf[subsTrackIndex]
+        cachePaths.append(inSubsInf['file'])
+        inSubsFile = fixPath(inSubsInf['file'], True)
+        inSubsLog  = inSubsInf['title']
+        tid        = int(subsTrackIndex.split(':')[1])
         
-        vid_res = classify_video_resolution(int(curVideoSize[0]), int(curVideoSize[1]))
-        outExt = vid_res['label']
+        if not inSubsInf['ext']:
+            inSubsLog = f'[0:{tid}] {inSubsLog}'
         
-        if m := reName.match(outNameTemp):
-            title, episode = m.group('title'), m.group('episode')
-            outFolder = f'{outFolder}/../{title}'
-            outFile   = f'{title} - {episode} [{outExt}].mp4'
+        subsFilter = f'subtitles=filename=\'{inSubsFile}\''
+        if inSubsInf['ext']:
+            subsFilter = f'{subsFilter}:fontsdir=\'{inFonts}\''
         else:
-            if os.path.isdir(inputPath):
-                outFolder = f'{outFolder} [ENCODED]'
-            outFile   = f'{PurePath(inFile).stem} [{outExt}].mp4'
-        
-        os.makedirs(outFolder, exist_ok=True)
-        outFile = os.path.abspath(f'{outFolder}/{outFile}')
-        
-        encCmd = list()
-        encCmd.extend([ r'ffmpeg', '-hide_banner', ])
-        encCmd.extend([ '-loglevel', 'error', '-stats', ])
-        encCmd.extend([ '-hwaccel', 'auto', ])
-        encCmd.extend([ '-fflags', '+bitexact' ])
-        encCmd.extend([ '-flags:v', '+bitexact' ])
-        encCmd.extend([ '-flags:a', '+bitexact' ])
-        
-        # same as -pix_fmt yuv420p
-        vFilters = '[0:v:0]format=yuv420p'
-        outsubs = None
-        overlay = False
-        inSubsLog = ''
-        
-        if doDeband:
-            vFilters += ',deband'
-        
-        if subsTrackIndex != '-1' and subsTrackIndex in inSubs.inf:
-            inSubsInf  = inSubs.inf[subsTrackIndex]
-            inSubsFile = fixPath(inSubsInf['file'], True)
-            inSubsLog  = inSubsInf['title']
-            tid        = int(subsTrackIndex.split(':')[1])
-            
-            if not inSubsInf['ext']:
-                inSubsLog = f'[0:{tid}] {inSubsLog}'
-            
-            outsubs = f'filename=\'{inSubsFile}\''
-            if inSubsInf['ext']:
-                outsubs = f'subtitles={outsubs}:fontsdir=\'{inFonts}\''
+            subsCodec = inSubsInf['codec']
+            if subsCodec == 'dvd_subtitle' or subsCodec == 'hdmv_pgs_subtitle':
+                subsFilter = f'[0:s:{tid}]'
             else:
-                subsCodec = inSubsInf['codec']
-                if subsCodec == 'dvd_subtitle' or subsCodec == 'hdmv_pgs_subtitle':
-                    overlay = True
-                    outsubs = f'[v];[v][0:s:{tid}]overlay'
-                else:
-                    outsubs = f'subtitles={outsubs}:stream_index={tid}:fontsdir=\'{inFonts}\''
-            comaadd = ',' if not overlay else ''
-            vFilters = f'{vFilters}{comaadd}{outsubs}'
-        
+                subsFilter = f'{subsFilter}:stream_index={tid}:fontsdir=\'{inFonts}\''
+    
+    vDS = videoData['width'] / videoData['height']
+    renditions = list()
+    for curVideoSize in outVideoSize:
+        if not curVideoSize[0].isdigit() or not curVideoSize[1].isdigit():
+            continue
         cVS = curVideoSize
-        vDS = videoData['width'] / videoData['height']
-        
-        if cVS[0].isdigit() and cVS[1].isdigit():
-            byWidth = True if int(cVS[0]) / vDS <= int(cVS[1]) else False
-            oscale = f'scale={cVS[0]}:-2' if byWidth else f'scale=-2:{cVS[1]}'
-            oscsep = '[v];[v]' if overlay else ','
-            vFilters = f'{vFilters}{oscsep}{oscale}'
-        
-        audioCmd = list()
-        extAudio = list()
-        outAudio = ''
-        
-        if audioTrackIndex != '-1':
-            atrack = audioTrackIndex.split(':')
-            if len(audioData) > 0 and atrack[0] == '0':
-                outAudio += f'[{audioTrackIndex}] {audioTitle(audioData, int(atrack[1]))}'
-                audioCmd.extend([ '-map', f'{atrack[0]}:a:{atrack[1]}?', f'-c:a' ])
-                if encodeAudio:
-                    outAudio += f' -> aac 2ch {audioBitrate}k'
-                    audioCmd.extend([ 'aac', '-cutoff', '0', '-b:a', f'{audioBitrate}k', '-ac', '2' ])
-                else:
-                    outAudio += f' -> copy'
-                    audioCmd.extend([ 'copy' ])
-        
-        encCmd.extend([ '-i', inFile ]);
-        if audioTrackIndex == '-1' or len(extAudio) > 0:
-            encCmd.extend([ '-an' ])
-        encCmd.extend([ '-sn', '-dn' ])
-        
-        encCmd.extend([ '-filter_complex', f'{vFilters}[video]' ])
+        byWidth = True if int(cVS[0]) / vDS <= int(cVS[1]) else False
+        oscale = f'scale={cVS[0]}:-2' if byWidth else f'scale=-2:{cVS[1]}'
+        renditions.append({ 'scale': oscale, 'file': renditionFile(inFile, curVideoSize), 'copy': False })
+    
+    # source sized rendition copies video when source already fits target
+    outVideo = ''
+    if videoCopy and len(renditions) > 0:
+        filtersUsed = 'hardsubs' if subsFilter != '' else 'deband' if doDeband else ''
+        copyVideo, copyReason = videoCopyDecision(inFile, webVideoTarget, videoData['width'], videoData['height'], filtersUsed)
+        renditions[0]['copy'] = copyVideo
+        outVideo = f'copy, {copyReason}' if copyVideo else f'encode, {copyReason}'
+    
+    audioCmd = list()
+    outAudio = ''
+    audioMap = ''
+    audioInput = None
+    
+    if audioTrackIndex != '-1':
+        atrack = audioTrackIndex.split(':')
+        aid = int(atrack[1])
+        if len(audioData) > aid and atrack[0] == '0':
+            outAudio += f'[{audioTrackIndex}] {audioTitle(audioData, aid)}'
+            # compliant tracks are copied even when aac stereo is requested
+            audioAction, audioArgs, audioReason = audioPolicy(audioData[aid], 'aac-stereo' if encodeAudio else 'mp4')
+            # encoded once to cache when a job runs, every quality copies it
+            # map and args here are the inline transcode when cache is not usable
+            if audioAction == 'transcode':
+                audioInput = audioCacheFile(inFile, aid, audioArgs)
+                outAudio += f' -> aac 2ch, {audioReason}'
+                audioMap = f'{atrack[0]}:a:{aid}?'
+                audioCmd.extend(audioArgs)
+            elif audioAction == 'copy':
+                outAudio += f' -> copy, {audioReason}'
+                audioMap = f'{atrack[0]}:a:{aid}?'
+                audioCmd.extend([ '-c:a', 'copy' ])
+            else:
+                outAudio += f' -> skipped, {audioReason}'
+    
+    vcodec   = 'h264_nvenc' if nvEncCodec else 'libx264'
+    vpreset  = 'p2'         if nvEncCodec else 'faster'
+    vencmode = '-cq'        if nvEncCodec else '-crf'
+    vtune    = 'hq'         if nvEncCodec else 'animation'
+    vqual    = setQuality
+    
+    # one decode with split filtergraph for all qualities, or one ffmpeg per quality
+    if splitEncode and len(renditions) > 1:
+        encJobs = [ renditions ]
+    else:
+        encJobs = [ [ r ] for r in renditions ]
+    
+    # job command, jobAudio: encoded audio file or None for map and args above
+    def jobCommand(jobRenditions: list, jobAudio: str = None) -> list:
+        cmd = FFCommand(overwrite=True)
+        cmd.options(*hwAccelArgs(), *encJob.inputArgs())
+        cmd.input(inFile)
+        jobAudioMap, jobAudioCmd = audioMap, audioCmd
+        if jobAudio is not None:
+            jobAudioMap, jobAudioCmd = f'{cmd.input(jobAudio)}:a:0', [ '-c:a', 'copy' ]
         
-        vcodec   = 'h264_nvenc' if nvEncCodec else 'libx264'
-        vpreset  = 'p2'         if nvEncCodec else 'faster'
-        vencmode = '-cq'        if nvEncCodec else '-crf'
-        vtune    = 'hq'         if nvEncCodec else 'animation'
-        vqual    = setQuality
+        # copied renditions skip the filtergraph
+        encRenditions = [ r for r in jobRenditions if not r['copy'] ]
+        outLabels = [ f'video{x}' for x in range(len(encRenditions)) ]
+        graph = FilterGraph()
+        if len(encRenditions) == 1:
+            renditionFilters(graph, '0:v:0', outLabels[0], encRenditions[0]['scale'], doDeband, subsFilter, sourceSize)
+        elif len(encRenditions) > 1:
+            splitLabels = [ f'split{x}' for x in range(len(encRenditions)) ]
+            # source sized output renders once at source before split, downscales only render after scale
+            # bitmap subs stream can feed only one overlay
+            if encRenditions[0] is renditions[0] or subsFilter.startswith('['):
+                renditionFilters(graph, '0:v:0', 'source', '', doDeband, subsFilter, sourceSize)
+                graph.split('source', splitLabels)
+                for splitLabel, outLabel, r in zip(splitLabels, outLabels, encRenditions):
+                    graph.chain(splitLabel, [ r['scale'] ], outLabel)
+            else:
+                graph.split('0:v:0', splitLabels)
+                for splitLabel, outLabel, r in zip(splitLabels, outLabels, encRenditions):
+                    renditionFilters(graph, splitLabel, outLabel, r['scale'], doDeband, subsFilter, sourceSize)
+        if len(encRenditions) > 0:
+            cmd.filterGraph(graph)
         
-        encCmd.extend([ '-map', '[video]', '-c:v', vcodec, vencmode, vqual ])
-        encCmd.extend([ '-preset:v', vpreset, '-tune:v', vtune ])
-        if outAudio != '':
-            encCmd.extend(audioCmd)
+        outLabels = iter(outLabels)
+        for r in jobRenditions:
+            out = cmd.output(encJob.partFile(r['file']))
+            if jobAudioMap == '':
+                out.set('-an')
+            out.set('-sn', '-dn')
+            
+            if r['copy']:
+                out.map('0:v:0', '-c:v', 'copy')
+            else:
+                out.map(f'[{next(outLabels)}]', '-c:v', vcodec, vencmode, vqual)
+                out.set('-preset:v', vpreset, '-tune:v', vtune)
+                out.set(*encJob.outputArgs(len(encRenditions)))
+            if jobAudioMap != '':
+                out.map(jobAudioMap, *jobAudioCmd)
+            
+            # output
+            # https://github.com/rodrigopolo/cheatsheets/blob/master/ffmpeg.md
+            out.stripMetadata()
+            out.metadata('application', '')
+            out.metadata('writing_library', '')
+            out.metadata('title', 'CyTube Encoders', 's:v:0')
+            # out.set('-brand', 'mp42')
+        return cmd.build()
+    
+    for jobRenditions in encJobs:
+        outFiles = [ r['file'] for r in jobRenditions ]
+        encCmd = jobCommand(jobRenditions, audioInput)
+        if encJob.reuseOutputs(outFiles, probe.duration, encCmd):
+            continue
         
-        # output
-        # https://github.com/rodrigopolo/cheatsheets/blob/master/ffmpeg.md
-        encCmd.extend([ '-map_metadata', '-1', '-map_chapters', '-1' ])
-        encCmd.extend([ '-metadata', 'application=' ])
-        encCmd.extend([ '-metadata', 'writing_library=' ])
-        encCmd.extend([ '-metadata:s:v:0', 'title=CyTube Encoders' ])
-        # encCmd.extend([ '-brand', 'mp42' ])
-        encCmd.extend([ outFile ])
+        # audio is encoded only for jobs that run, inline transcode when that fails
+        jobAudio = audioInput
+        if audioInput is not None and getEncodedAudio(inFile, aid, audioArgs, probe.duration) is None:
+            jobAudio = None
+            encCmd = jobCommand(jobRenditions, None)
         
-        videoInfo = getMediaData(inFile)
-        videoDur  = round(float(videoInfo['format']['duration']))
+        videoDur  = round(probe.duration)
         videoDur_h, videoDur_r = divmod(videoDur, 3600)
         videoDur_m, videoDur_s = divmod(videoDur_r, 60)
         
         startTime = time.monotonic()
         vDurStr = f'{videoDur_h:02.0f}:{videoDur_m:02.0f}:{videoDur_s:02.0f}'
         print(f'\n:: Encoding : [{vDurStr}] {PurePath(inFile).name}')
-        print(f':: Audio    : {outAudio}')
+        print(f':: Audio    : {outAudio}{', cached' if jobAudio is not None else ''}')
+        if outVideo != '' and jobRenditions[0] is renditions[0]:
+            print(f':: Video    : {outVideo}')
         if inSubsLog != '':
             print(f':: Subtitles: {inSubsLog}')
-        print(f':: Output   : {PurePath(outFile).name}\n')
+        for r in jobRenditions:
+            print(f':: Output   : {PurePath(r['file']).name}')
+        print()
         
         testRun = False
         if testRun:
             print(encCmd)
             print('OK')
         
-        if not testRun and curVideoSize[0].isdigit() and curVideoSize[1].isdigit():
-            subprocess.run(encCmd)
+        if not testRun:
+            cacheKey = outputCacheKey(encCmd, [ encJob.partFile(f) for f in outFiles ], cachePaths)
+            if fetchCachedOutputs(cacheKey, outFiles, probe.duration):
+                encJob.recordOutputs(outFiles, probe.duration, encCmd)
+                print(':: Output from cache')
+            else:
+                returnCode = encJob.run(encCmd, PurePath(jobRenditions[0]['file']).stem, duration=probe.duration)
+                if encJob.finish(outFiles, returnCode, probe.duration, encCmd):
+                    storeCachedOutputs(cacheKey, outFiles)
         
         runTime = time.monotonic() - startTime
         hours, rem = divmod(runTime, 3600)
         minutes, seconds = divmod(rem, 60)
-        print(f'\n:: Encoded {PurePath(outFile).name} in {hours:02.0f}:{minutes:02.0f}:{seconds:02.0f}')
+        outNames = ', '.join([ PurePath(r['file']).name for r in jobRenditions ])
+        print(f'\n:: Encoded {outNames} in {hours:02.0f}:{minutes:02.0f}:{seconds:02.0f}')
 
 # config
 def configEncode(inPath: Path):
@@ -209,11 +286,8 @@ def configEncode(inPath: Path):
     
     # check if dir
     if os.path.isdir(inPath):
-        for file in os.listdir(inPath):
-            file = os.path.join(inPath, file)
-            fileExt = PurePath(file).suffix.lower()
-            if extVideoFile.count(fileExt) > 0:
-                inFiles.append(file)
+        for inFile in walkMedia(inPath, 0, extVideoFile):
+            inFiles.append(inFile.path)
     
     # file to array
     if os.path.isfile(inPath):
@@ -224,44 +298,78 @@ def configEncode(inPath: Path):
         print(':: No input videos!')
         return
     
-    # useNVEnc
-    nvEncCodec = qconfirm('Use NVEnc Codec (Default=No):', default=False).ask()
+    # useNVEnc, only offered when ffmpeg is built with it
+    nvEncCodec = False
+    if hasEncoder('h264_nvenc'):
+        nvEncCodec = preset.confirm('nvenc', 'Use NVEnc Codec (Default=No):', False)
     
     vqType = 'CQ' if nvEncCodec else 'CRF'
     vqual  = '25' if nvEncCodec else '20'
-    setQuality = qtext(f'Set Encode {vqType}:', validate=IntValidator, default=vqual).ask()
+    setQuality = preset.text('quality', f'Set Encode {vqType}:', vqual, IntValidator)
     
     # doDeband
-    doDeband = qconfirm('Add Deband (Default=No):', default=False).ask()
+    doDeband = False
+    if hasFilter('deband'):
+        doDeband = preset.confirm('deband', 'Add Deband (Default=No):', False)
     
     # ask resizes
-    doResize = qconfirm('Do Multiply Qualities (Default=Yes):', default=True).ask()
+    doResize = preset.confirm('resize', 'Do Multiply Qualities (Default=Yes):', True)
+    
+    # decode and render subtitles once for all qualities
+    splitEncode = False
+    if doResize:
+        splitEncode = preset.confirm('split', 'Encode All Qualities In One Pass (Default=Yes):', True)
+    
+    inProbes = probe_many(inFiles, 'probe', showLog=True, fields=probeFields)
     
     audioList = list()
-    audioData = getMediaData(inFiles[0], 'a')
+    audioInfo = dict()
+    audioData = inProbes[0].audio
     for t in range(len(audioData)):
         tname = audioTitle(audioData, t)
         audioList.append(Choice(f'[0:{t}]: {tname}', value=f'0:{t}'))
+        audioInfo[f'0:{t}'] = trackInfo(audioData[t])
     
     audioList.append(Choice('[-1]: No Audio', value='-1'))
-    audioTrackIndex = qselect('Select Audio Track:', audioList).ask()
+    audioTrackIndex = preset.select('audio', 'Select Audio Track:', audioList, audioInfo)
     
     encodeAudio = False
     if audioTrackIndex != '-1':
-        encodeAudio = qconfirm('Encode Audio to AAC 192k 2ch (Default=No):', default=False).ask()
+        encodeAudio = preset.confirm('audio_encode', 'Encode Audio to AAC 192k 2ch (Default=No):', False)
+    
+    subsData = searchSubsFile(inFiles[0], probe=inProbes[0])
+    subsTrackIndex = preset.select('subs', 'Subtitle For HardSubs:', subsData.sel, subsData.inf)
+    if subsTrackIndex != '-1' and subsData.inf[subsTrackIndex]['codec'] not in [ 'dvd_subtitle', 'hdmv_pgs_subtitle' ]:
+        if not hasFilter('subtitles'):
+            print(':: FFmpeg is built without "subtitles" filter, skipping hardsubs...')
+            subsTrackIndex = '-1'
     
-    subsData = searchSubsFile(inFiles[0])
-    subsTrackIndex = qselect('Subtitle For HardSubs:', subsData.sel).ask()
+    # source sized output copies video stream when nothing is rendered into it
+    videoCopy = False
+    if not doDeband and subsTrackIndex == '-1':
+        videoCopy = preset.confirm('video_copy', 'Copy Video When Source Fits Target (Default=Yes):', True)
     
-    for inFile in inFiles:
-        encodeFile(inFile, nvEncCodec, setQuality, doDeband, doResize, audioTrackIndex, encodeAudio, subsTrackIndex)
+    # parallel jobs for folders
+    jobsCount = 1
+    if len(inFiles) > 1:
+        jobsCount = int(preset.text('jobs', 'Parallel Encode Jobs:', str(encodeJobs), IntValidator))
+    
+    jobItems = list()
+    for inFile, inProbe in zip(inFiles, inProbes):
+        jobItems.append((inFile, inProbe, nvEncCodec, setQuality, doDeband, doResize, splitEncode, audioTrackIndex, encodeAudio, subsTrackIndex, videoCopy))
+    # existing outputs not made by this batch are kept unless --overwrite is given
+    overwrite = presetBool(preset.get('overwrite', False))
+    runEncodeJobs(encodeFile, jobItems, jobsCount, manifest=BatchManifest('multi', inPath), overwrite=overwrite)
+
+# preset and cli flags
+preset = loadPreset('encode_multi')
 
 # set folder
-if len(sys.argv) < 2:
+if preset.input is None:
     inputPath = qtext(':: Folder/File: ', validate=PathValidator).ask()
     inputPath = inputPath.strip('\"')
 else:
-    inputPath = sys.argv[1]
+    inputPath = preset.input
 
 # to abs path
 inputPath = os.path.abspath(inputPath)
@@ -18,16 +18,20 @@ except ModuleNotFoundError:
     exit()
 
 from _encHelper import PathValidator
-from _encHelper import getMediaData, audioTitle, searchSubsFile
+from _encHelper import MediaProbe, probe_many, probeFields, walkMedia, audioTitle, searchSubsFile
+from _encHelper import hwAccelArgs, audioCacheFile, getEncodedAudio, audioPolicy, FFCommand
+from _encHelper import IntValidator, EncodeJob, BatchManifest, runEncodeJobs, encodeJobs
+from _encHelper import loadPreset, presetBool, trackInfo
+from _encHelper import outputCacheKey, fetchCachedOutputs, storeCachedOutputs
 
 # acceptable extensions
 extVideoFile = ['.mkv', '.mp4', '.avi']
 extSubsFile = ['.ass', '.srt']
 
 # encode
-# doEncode(inFile, pspEncoderMode, pspEncoderQuality, anamorphMode, videoPar, audioTrack, encAudio, subsTrack)
-def doEncode(inFile: Path, pspEncoderMode: int, pspEncoderQuality: str,
-    anamorphMode: bool, videoPar: str, audioTrack: str, encAudio: bool, subsTrack: str):
+# doEncode(inFile, probe, pspEncoderMode, pspEncoderQuality, anamorphMode, videoPar, audioTrack, subsTrack, encJob)
+def doEncode(inFile: Path, probe: MediaProbe, pspEncoderMode: int, pspEncoderQuality: str,
+    anamorphMode: bool, videoPar: str, audioTrack: str, subsTrack: str, encJob: EncodeJob):
     workFolder = f'{PurePath(inFile).parent}'
     
     tempFolder = os.path.join(workFolder, '_temp')
@@ -36,37 +40,32 @@ def doEncode(inFile: Path, pspEncoderMode: int, pspEncoderQuality: str,
     fontsFolder = os.path.join(workFolder, 'fonts')
     inSubs = searchSubsFile(f'{inFile}i', extSubsFile)
     
-    videoData = getMediaData(inFile, 'v')
+    videoData = probe.video
     if len(videoData) < 1:
         print()
         print(f':: Skipping: {PurePath(inFile).name}')
         print(f':: No video streams!')
         return
     
-    os.environ['_cachePath'] = os.path.join(tempFolder, PurePath(inFile).name)
-    os.environ['_inputFile'] = inFile
+    # avs template reads settings from env, own copy per job
+    encEnv = os.environ.copy()
+    encEnv['_cachePath'] = os.path.join(tempFolder, PurePath(inFile).name)
+    encEnv['_inputFile'] = inFile
     
-    os.environ['_subsFile'] = ''
-    os.environ['_fontsDir'] = fontsFolder
+    encEnv['_subsFile'] = ''
+    encEnv['_fontsDir'] = fontsFolder
     
-    os.environ['_avsOutput']  = 'video'
-    os.environ['_pspEncMode'] = str(pspEncoderMode)
-    os.environ['_pspAnamorph'] = str(pspEncoderMode - 2) if anamorphMode else '0'
+    encEnv['_avsOutput']  = 'video'
+    encEnv['_pspEncMode'] = str(pspEncoderMode)
+    encEnv['_pspAnamorph'] = str(pspEncoderMode - 2) if anamorphMode else '0'
     
-    os.environ['_outFile'] = str(os.path.join(pspFolder, f'{PurePath(inFile).stem} [PSP]'))
+    encEnv['_outFile'] = str(os.path.join(pspFolder, f'{PurePath(inFile).stem} [PSP]'))
     
     if subsTrack != '-1':
         subsData = inSubs.inf[subsTrack]
-        os.environ['_subsFile'] = subsData['file']
-    
-    encCmd = list()
-    encCmd.extend([ r'ffmpeg', '-hide_banner', ])
-    encCmd.extend([ '-loglevel', 'error', '-stats', ])
-    encCmd.extend([ '-hwaccel', 'auto', ])
-    encCmd.extend([ '-fflags', '+bitexact' ])
-    encCmd.extend([ '-flags:v', '+bitexact' ])
-    encCmd.extend([ '-flags:a', '+bitexact' ])
+        encEnv['_subsFile'] = subsData['file']
     
+    outFile = f'{encEnv['_outFile']}.mp4'
     x264Params = list()
     vSar = ''
     
@@ -99,46 +98,73 @@ def doEncode(inFile: Path, pspEncoderMode: int, pspEncoderQuality: str,
         x264Params.extend(['-preset:v', 'superfast', '-b:v', '512k'])
         # x264Params.extend(['-x264-params', x264DefParam])
     
-    encCmd.extend([ '-i', ])
-    encCmd.extend([ os.path.join(
-        os.path.abspath(os.path.dirname(__file__)),
-        '..',
-        'avs-templates',
-        'psp-encode.avs',
-    )])
+    # per file, tracks of a folder may differ
+    atrack = audioTrack.split(':')
+    aid = int(atrack[1])
+    audioStream = probe.audio[aid] if len(probe.audio) > aid else dict()
+    audioAction, audioArgs, audioReason = audioPolicy(audioStream, 'psp')
+    print(f':: Audio: {audioAction}, {audioReason}')
+    audioInput = audioCacheFile(inFile, aid, audioArgs) if audioAction == 'transcode' else None
     
-    encCmd.extend([ '-i', ])
-    encCmd.extend([ inFile ])
+    # jobAudio: encoded audio file or None for source track
+    def jobCommand(jobAudio: str = None) -> list:
+        cmd = FFCommand(overwrite=True)
+        cmd.options(*hwAccelArgs(), *encJob.inputArgs())
+        avsInput = cmd.input(os.path.join(
+            os.path.abspath(os.path.dirname(__file__)),
+            '..',
+            'avs-templates',
+            'psp-encode.avs',
+        ))
+        srcInput = cmd.input(inFile)
+        
+        out = cmd.output(encJob.partFile(outFile))
+        out.map(f'{avsInput}:v:0', *x264Params)
+        out.set(*encJob.outputArgs())
+        
+        if jobAudio is not None:
+            out.map(f'{cmd.input(jobAudio)}:a:0', '-c:a', 'copy')
+        elif audioAction != 'reject':
+            out.map(f'{srcInput}:a:{aid}?', *audioArgs)
+        else:
+            out.set('-an')
+        
+        out.stripMetadata()
+        return cmd.build()
     
-    encCmd.extend([ '-map', '0:v:0' ])
-    encCmd.extend(x264Params)
+    # avs settings come from env, not from args
+    cachePaths = [ p for p in [ encEnv['_subsFile'], fontsFolder ] if p != '' ]
+    cacheEnv = [ encEnv['_avsOutput'], encEnv['_pspEncMode'], encEnv['_pspAnamorph'] ]
+    encCmd = jobCommand(audioInput)
+    if encJob.reuseOutputs([ outFile ], probe.duration, encCmd, cacheEnv):
+        return
     
-    audioCmd = list()
-    atrack = audioTrack.split(':')
-    audioCmd.extend([ '-map', f'1:a:{atrack[1]}?', f'-c:a' ])
-    if encAudio:
-        audioCmd.extend([ 'aac', '-cutoff', '0', '-b:a', f'192k', '-ac', '2' ])
-    else:
-        audioCmd.extend([ 'copy' ])
+    # audio is encoded only when job runs, source track transcoded inline when that fails
+    if audioInput is not None and getEncodedAudio(inFile, aid, audioArgs, probe.duration) is None:
+        encCmd = jobCommand(None)
     
-    encCmd.extend(audioCmd)
-    encCmd.extend([ '-map_metadata', '-1', '-map_chapters', '-1' ])
-    encCmd.extend([ f'{os.environ['_outFile']}.mp4' ])
+    cacheKey = outputCacheKey(encCmd, [ encJob.partFile(outFile) ], cachePaths, cacheEnv)
     
     startTime = time.monotonic()
-    subprocess.run(encCmd)
+    if fetchCachedOutputs(cacheKey, [ outFile ], probe.duration):
+        encJob.recordOutputs([ outFile ], probe.duration, encCmd, cacheEnv)
+        print(':: Output from cache')
+    else:
+        returnCode = encJob.run(encCmd, PurePath(encEnv['_outFile']).name, encEnv, probe.duration)
+        if encJob.finish([ outFile ], returnCode, probe.duration, encCmd, cacheEnv):
+            storeCachedOutputs(cacheKey, [ outFile ])
     
     runTime = time.monotonic() - startTime
     hours, rem = divmod(runTime, 3600)
     minutes, seconds = divmod(rem, 60)
-    print(f'\n:: Encoded {PurePath(os.environ['_outFile']).name} in {hours:02.0f}:{minutes:02.0f}:{seconds:02.0f}')
+    print(f'\n:: Encoded {PurePath(encEnv['_outFile']).name} in {hours:02.0f}:{minutes:02.0f}:{seconds:02.0f}')
 
 # folder
 def configEncoder(inPath: Path):
     subDirsPath = inPath
     
     if os.path.isfile(inPath):
-        subDirsPath = os.path.abspath(str(os.path.dirname(subDirsPath))))
+        subDirsPath = os.path.abspath(str(os.path.dirname(subDirsPath)))
     
     subDirsPath = str(subDirsPath)
     pspDir  = f'{os.path.abspath(subDirsPath)}/PSP Video'
@@ -146,8 +172,8 @@ def configEncoder(inPath: Path):
     
     print(f'\n:: Selected Path: {os.path.abspath(inPath)}')
     
-    pspEncoderMode = questionary.select(
-        'PSP Encoder Mode:', choices = [
+    pspEncoderMode = preset.select(
+        'mode', 'PSP Encoder Mode:', [
         Choice('[1] VideoSize:[480x272] SAR:[16:9|any] Anamorphic:[No]',  value=1),
         Choice('[2] VideoSize:[640x480] SAR:[4:3]      Anamorphic:[Yes]', value=2),
         Choice('[3] VideoSize:[720x480] SAR:[3:2]      Anamorphic:[Yes]', value=3),
@@ -156,18 +182,15 @@ def configEncoder(inPath: Path):
         # Choice('[5] Make Video Thumbs   SAR:[4:3]      Anamorphic:[No]',  value=5),
         # Separator(),
         Choice('[#] CLOSE', value=-1),
-    ]).ask()
+    ])
     
     if pspEncoderMode < 0:
         return 1
     
     inFiles = list()
     if os.path.isdir(inPath):
-        for file in os.listdir(inPath):
-            file = os.path.join(inPath, file)
-            fileExt = PurePath(file).suffix.lower()
-            if extVideoFile.count(fileExt) > 0:
-                inFiles.append(file)
+        for inFile in walkMedia(inPath, 0, extVideoFile):
+            inFiles.append(inFile.path)
     if os.path.isfile(inPath):
         inFiles.append(inPath)
     
@@ -181,18 +204,18 @@ def configEncoder(inPath: Path):
         return 1
     
     if pspEncoderMode != 5:
-        pspEncoderQuality = questionary.select(
-            'Select Quality/Encode Speed:', choices = [
+        pspEncoderQuality = preset.select(
+            'quality', 'Select Quality/Encode Speed:', [
             Choice('[D] Excellent Quality / Slow Speed', value='d'),
             Choice('[V] Good Quality / Normal Speed',    value='v'),
             Choice('[S] Standard Quality / Best Speed',  value='s'),
-        ]).ask()
+        ])
         
         anamorphMode = False
         videoPar = '1:1'
         
         if [2, 3, 4].count(pspEncoderMode) > 0:
-            anamorphMode = questionary.confirm('Anamorphic Encode? (Default=No) [EXPEREMENTAL]', default=False).ask()
+            anamorphMode = preset.confirm('anamorph', 'Anamorphic Encode? (Default=No) [EXPEREMENTAL]', False)
             
             if anamorphMode:
                 sarModeData = {
@@ -209,11 +232,12 @@ def configEncoder(inPath: Path):
                     if sarIndex > 0 or sarIndex < 3:
                         sarOptionValue = sarModeData[str(sarIndex)][str(pspEncoderMode)]
                     sarOptions.append(Choice(f'{sarIndex}={sarItem}',  value=sarOptionValue))
-                videoPar = questionary.select('Select SAR:', choices = sarOptions).ask()
+                videoPar = preset.select('sar', 'Select SAR:', sarOptions)
         
         audioList = list()
-        audioDict = dict()
-        audioData = getMediaData(inFiles[0], 'a')
+        audioInfo = dict()
+        inProbes = probe_many(inFiles, 'probe', fields=probeFields)
+        audioData = inProbes[0].audio
         
         if len(audioData) < 0:
             print(':: Error: No Audio Tracks Available!')
@@ -221,34 +245,36 @@ def configEncoder(inPath: Path):
         
         for t in range(len(audioData)):
             tname = audioTitle(audioData, t)
-            audioDict[f'0:{t}'] = audioData[t]
+            audioInfo[f'0:{t}'] = trackInfo(audioData[t])
             audioList.append(Choice(f'[0:{t}]: {tname}', value=f'0:{t}'))
         
         # audioList.append(Choice('[-1]: No Audio', value='-1'))
-        audioTrack = questionary.select('Select Audio Track:', audioList).ask()
-        
-        encAudio = False
-        if audioTrack != '-1':
-            a = audioDict[audioTrack]
-            codec = a['codec_name'] if 'codec_name' in a else 'UNK_CODEC'
-            channels = a['channels'] if 'channels' in a else 5+1
-            if codec != 'aac':
-                encAudio = True
-            if channels > 2:
-                encAudio = True
+        audioTrack = preset.select('audio', 'Select Audio Track:', audioList, audioInfo)
         
         subsData = searchSubsFile(f'{inFiles[0]}i', extSubsFile)
-        subsTrack = questionary.select('Subtitle For HardSubs:', subsData.sel).ask()
+        subsTrack = preset.select('subs', 'Subtitle For HardSubs:', subsData.sel, subsData.inf)
+        
+        # parallel jobs for folders
+        jobsCount = 1
+        if len(inFiles) > 1:
+            jobsCount = int(preset.text('jobs', 'Parallel Encode Jobs:', str(encodeJobs), IntValidator))
         
-        for inFile in inFiles:
-            doEncode(inFile, pspEncoderMode, pspEncoderQuality, anamorphMode, videoPar, audioTrack, encAudio, subsTrack)
+        jobItems = list()
+        for inFile, inProbe in zip(inFiles, inProbes):
+            jobItems.append((inFile, inProbe, pspEncoderMode, pspEncoderQuality, anamorphMode, videoPar, audioTrack, subsTrack))
+        # existing outputs not made by this batch are kept unless --overwrite is given
+        overwrite = presetBool(preset.get('overwrite', False))
+        runEncodeJobs(doEncode, jobItems, jobsCount, manifest=BatchManifest('psp', inPath), overwrite=overwrite)
+
+# preset and cli flags
+preset = loadPreset('encode_psp')
 
 # set folder
-if len(sys.argv) < 2:
+if preset.input is None:
     inputPath = questionary.text(':: Folder/File: ', validate=PathValidator).ask()
     inputPath = inputPath.strip('\"')
 else:
-    inputPath = sys.argv[1]
+    inputPath = preset.input
 
 # to abs path
 inputPath = os.path.abspath(inputPath)
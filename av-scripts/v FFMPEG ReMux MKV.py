@@ -18,93 +18,102 @@ except ModuleNotFoundError:
     exit()
 
 from _encHelper import boolYN, IntValidator, PathValidator, extVideoFile, fixPath
-from _encHelper import getMediaData, audioTitle, subsTitle, searchSubsFile
+from _encHelper import MediaProbe, probeFields, audioTitle, subsTitle, searchSubsFile
+from _encHelper import hwAccelArgs, runFFmpeg, loadPreset, trackInfo, FFCommand
 
 # file
 def configFile(inFile: Path):
     outFolder = PurePath(inFile).parent
     outFile   = f'{outFolder}/{PurePath(inFile).stem} [remux].mkv'
     
-    videoData = getMediaData(inFile, 'v', True)
+    probe = MediaProbe(inFile, True, probeFields + [ 'tags.filename', 'tags.mimetype' ])
+    videoData = probe.video
     if len(videoData) < 1:
         print()
         print(f':: Skipping: {PurePath(inFile).name}')
         print(f':: No video streams!')
         return
     
-    videoInfo = getMediaData(inFile)
-    videoDur  = round(float(videoInfo['format']['duration']))
+    videoDur  = round(probe.duration)
     videoDur_h, videoDur_r = divmod(videoDur, 3600)
     videoDur_m, videoDur_s = divmod(videoDur_r, 60)
     print(f':: Duration : {videoDur_h:02.0f}:{videoDur_m:02.0f}:{videoDur_s:02.0f}')
     
     audioList = list()
-    audioData = getMediaData(inFile, 'a')
+    audioData = probe.audio
     for t in range(len(audioData)):
         tname = audioTitle(audioData, t)
         audioList.append(Choice(f'[{str(t).rjust(2)}]: {tname}', value=t))
     audioList.append(Choice('[-1]: No Audio', value='-1'))
     
-    audioCmd = [ '-an' ]
-    audioTrack = questionary.select('Select Audio Track:', audioList).ask()
+    audioMap = ''
+    audioInfo = { t: trackInfo(audioData[t]) for t in range(len(audioData)) }
+    audioTrack = preset.select('audio', 'Select Audio Track:', audioList, audioInfo)
     if audioTrack != '-1':
         atid = int(audioTrack)
-        audioCmd = [ '-map', f'0:a:{atid}?', f'-c:a', 'copy' ]
+        audioMap = f'0:a:{atid}?'
     
     subsList = list()
-    subsData = getMediaData(inFile, 's')
+    subsData = probe.subs
     for t in range(len(subsData)):
         tname = subsTitle(subsData, t)
         subsList.append(Choice(f'[{str(t).rjust(2)}]: {tname}', value=t))
     subsList.append(Choice('[-1]: No Subs', value='-1'))
     
-    subsCmd = [ '-sn' ]
-    subsTrack = questionary.select('Select Subs Track:', subsList).ask()
+    subsMap = ''
+    attachMaps = list()
+    subsInfo = { t: trackInfo(subsData[t]) for t in range(len(subsData)) }
+    subsTrack = preset.select('subs', 'Select Subs Track:', subsList, subsInfo)
     if subsTrack != '-1':
         stid = int(subsTrack)
-        subsCmd = [ '-map', f'0:s:{stid}?', f'-c:s', 'copy' ]
+        subsMap = f'0:s:{stid}?'
         
-        attData = getMediaData(inFile, 't')
+        attData = probe.attachments
         for t in range(len(attData)):
             if 'tags' in attData[t] and 'title' in attData[t]['tags'] and 'mimetype' in attData[t]['tags']:
-                tags = attData[t]['tags']
-                subsCmd.extend([ f'-map', f'0:t:{t}' ])
-                subsCmd.extend([ f'-metadata:s:t:{t}', f'filename={tags['filename']}' ])
-                subsCmd.extend([ f'-metadata:s:t:{t}', f'mimetype={tags['mimetype']}' ])
+                attachMaps.append((t, attData[t]['tags']))
     
     vCutCmd = []
-    vCutStart = questionary.text('Cut Start:').ask()
+    vCutStart = preset.text('cut_start', 'Cut Start:')
     if vCutStart != '':
-        vCutEnd = questionary.text('Cut End:').ask()
+        vCutEnd = preset.text('cut_end', 'Cut End:')
         vCutCmd.extend([ vCutStart, vCutEnd ])
     
-    vTitle = questionary.text('Set Video Title:').ask()
+    vTitle = preset.text('title', 'Set Video Title:')
     
-    encCmd = list()
-    encCmd.extend([ r'ffmpeg', '-hide_banner', ])
-    encCmd.extend([ '-loglevel', 'error', '-stats', ])
-    encCmd.extend([ '-hwaccel', 'auto', ])
-    encCmd.extend([ '-fflags', '+bitexact', '-flags:v', '+bitexact', '-flags:a', '+bitexact' ])
+    cmd = FFCommand()
+    cmd.options(*hwAccelArgs())
+    cmd.input(inFile)
     
-    encCmd.extend([ '-i', inFile ]);
-    encCmd.extend([ '-map', f'0:v:0?', '-c:v', 'copy' ])
+    out = cmd.output(outFile)
+    out.map('0:v:0?', '-c:v', 'copy')
     
-    encCmd.extend(audioCmd)
-    encCmd.extend(subsCmd)
-    encCmd.extend(['-dn'])
+    if audioMap != '':
+        out.map(audioMap, '-c:a', 'copy')
+    else:
+        out.set('-an')
+    if subsMap != '':
+        out.map(subsMap, '-c:s', 'copy')
+        for t, tags in attachMaps:
+            out.map(f'0:t:{t}')
+            out.metadata('filename', tags['filename'], f's:t:{t}')
+            out.metadata('mimetype', tags['mimetype'], f's:t:{t}')
+    else:
+        out.set('-sn')
+    out.set('-dn')
     
     if len(vCutCmd) > 0:
-        encCmd.extend([ '-ss', vCutCmd[0], '-to', vCutCmd[1] ])
+        out.set('-ss', vCutCmd[0], '-to', vCutCmd[1])
     
-    encCmd.extend([ '-map_metadata', '-1', '-map_chapters', '-1' ])
+    out.stripMetadata()
     
     if vTitle != '':
-        encCmd.extend([ '-metadata:s:v:0', f'title={vTitle}' ])
+        out.metadata('title', vTitle, 's:v:0')
     
-    encCmd.extend([ outFile ])
+    encCmd = cmd.build()
     
     startTime = time.monotonic()
-    subprocess.run(encCmd)
+    runFFmpeg(encCmd, PurePath(outFile).stem, probe.duration)
     
     runTime = time.monotonic() - startTime
     hours, rem = divmod(runTime, 3600)
@@ -116,11 +125,14 @@ def configFolder(inPath: Path):
     print(f'\n:: Selected path: {os.path.abspath(inPath)}')
     print(f'script not usable for dir!')
 
+# preset and cli flags
+preset = loadPreset('remux_mkv')
+
 # set folder
-if len(sys.argv) < 2:
+if preset.input is None:
     inputPath = input(':: Folder/File: ').strip('\"')
 else:
-    inputPath = sys.argv[1]
+    inputPath = preset.input
 
 # to abs path
 inputPath = os.path.abspath(inputPath)
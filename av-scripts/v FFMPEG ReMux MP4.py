@@ -19,7 +19,8 @@ except ModuleNotFoundError:
     exit()
 
 from _encHelper import boolYN, IntValidator, PathValidator, extVideoFile, fixPath
-from _encHelper import getMediaData, audioTitle, searchSubsFile
+from _encHelper import MediaProbe, probeFields, audioTitle, searchSubsFile
+from _encHelper import hwAccelArgs, runFFmpeg, loadPreset, trackInfo, audioPolicy, FFCommand
 extAudioFile = ['.aac']
 
 # file
@@ -30,7 +31,8 @@ def configFile(inFile: Path):
     
     noVideo = False
     
-    videoData = getMediaData(inFile, 'v', True)
+    probe = MediaProbe(inFile, True, probeFields)
+    videoData = probe.video
     if len(videoData) < 1:
         noVideo = True
         outFile = f'{outFile}.m4a'
@@ -38,7 +40,7 @@ def configFile(inFile: Path):
         outFile = f'{outFile}.mp4'
     
     audioList = list()
-    audioData = getMediaData(inFile, 'a')
+    audioData = probe.audio
     for t in range(len(audioData)):
         tname = audioTitle(audioData, t)
         audioList.append(Choice(f'[{str(t).rjust(2)}]: {tname}', value=t))
@@ -49,37 +51,47 @@ def configFile(inFile: Path):
     if noVideo and len(audioList) < 1:
         return
     
-    audioCmd = [ '-an' ]
-    audioTrack = questionary.select('Select Audio Track:', audioList).ask()
+    audioMap = ''
+    audioCmd = list()
+    audioInfo = { t: trackInfo(audioData[t]) for t in range(len(audioData)) }
+    audioTrack = preset.select('audio', 'Select Audio Track:', audioList, audioInfo)
     if audioTrack != '-1':
         atid = int(audioTrack)
-        audioCmd = [ '-map', f'0:a:{atid}?', f'-c:a', 'copy' ]
-    
-    vTitle = questionary.text('Set Video Title:').ask()
-    
-    encCmd = list()
-    encCmd.extend([ r'ffmpeg', '-hide_banner', ])
-    encCmd.extend([ '-loglevel', 'error', '-stats', ])
-    encCmd.extend([ '-hwaccel', 'auto', ])
-    encCmd.extend([ '-fflags', '+bitexact', '-flags:v', '+bitexact', '-flags:a', '+bitexact' ])
-    
-    encCmd.extend([ '-i', inFile ]);
+        # mp4 can't hold every codec mkv can
+        audioAction, audioArgs, audioReason = audioPolicy(audioData[atid], 'mp4')
+        print(f':: Audio: {audioAction}, {audioReason}')
+        if audioAction != 'reject':
+            audioMap = f'0:a:{atid}?'
+            audioCmd = audioArgs
+        elif noVideo:
+            return
+    
+    vTitle = preset.text('title', 'Set Video Title:')
+    
+    cmd = FFCommand()
+    cmd.options(*hwAccelArgs())
+    cmd.input(inFile)
+    
+    out = cmd.output(outFile)
     if not noVideo:
-        encCmd.extend([ '-map', f'0:v:0?', '-c:v', 'copy' ])
+        out.map('0:v:0?', '-c:v', 'copy')
     
-    encCmd.extend(audioCmd)
-    encCmd.extend([ '-sn', '-dn' ])
+    if audioMap != '':
+        out.map(audioMap, *audioCmd)
+    else:
+        out.set('-an')
+    out.set('-sn', '-dn')
     
-    encCmd.extend([ '-map_metadata', '-1', '-map_chapters', '-1' ])
+    out.stripMetadata()
     
     if vTitle != '':
-        encCmd.extend([ '-metadata:s:v:0', f'title={vTitle}' ])
+        out.metadata('title', vTitle, 's:v:0')
     
-    # encCmd.extend([ '-brand', 'mp42' ])
-    encCmd.extend([ outFile ])
+    # out.set('-brand', 'mp42')
+    encCmd = cmd.build()
     
     startTime = time.monotonic()
-    subprocess.run(encCmd)
+    runFFmpeg(encCmd, PurePath(outFile).stem, probe.duration)
     
     runTime = time.monotonic() - startTime
     hours, rem = divmod(runTime, 3600)
@@ -91,11 +103,14 @@ def configFolder(inPath: Path):
     print(f'\n:: Selected path: {os.path.abspath(inPath)}')
     print(f'script not usable for dir!')
 
+# preset and cli flags
+preset = loadPreset('remux_mp4')
+
 # set folder
-if len(sys.argv) < 2:
+if preset.input is None:
     inputPath = input(':: Folder/File: ').strip('\"')
 else:
-    inputPath = sys.argv[1]
+    inputPath = preset.input
 
 # to abs path
 inputPath = os.path.abspath(inputPath)
@@ -20,11 +20,12 @@ except ModuleNotFoundError:
     exit()
 
 from _encHelper import boolYN, IntValidator, PathValidator, extVideoFile, fixPath
-from _encHelper import getMediaData, getMKVData, audioTitle, searchSubsFile
+from _encHelper import getMediaData, getMKVData, probe_many, audioTitle, searchSubsFile
 
-def extractFile(file: Path):
+def extractFile(file: Path, result: dict = None):
     # get mkv data
-    result = getMKVData(file)
+    if result is None:
+        result = getMKVData(file)
     # parse mkv results
     mkvfile = PurePath(result['file_name']).stem
     outdir  = os.path.join(PurePath(result['file_name']).parent, 'fonts')
@@ -66,10 +67,13 @@ def extractFile(file: Path):
 
 def extractFolder(inputPath: Path):
     print(f'\n:: Selected path: {os.path.abspath(inputPath)}')
+    files = list()
     for file in os.listdir(inputPath):
         file = os.path.join(inputPath, file)
         if file.lower().endswith('.mkv'):
-            extractFile(file)
+            files.append(file)
+    for file, result in zip(files, probe_many(files, 'mkvmerge')):
+        extractFile(file, result)
 
 # set folder
 if len(sys.argv) < 2:
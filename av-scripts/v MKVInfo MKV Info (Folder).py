@@ -20,11 +20,9 @@ except ModuleNotFoundError:
     exit()
 
 from _encHelper import boolYN, IntValidator, PathValidator, extVideoFile, fixPath
-from _encHelper import getMediaData, getMKVData, audioTitle, searchSubsFile
+from _encHelper import getMediaData, probe_many, audioTitle, searchSubsFile
 
-def printData(file: Path):
-    # get mkv data
-    result = getMKVData(file)
+def printData(result: dict):
     # parse mkv results
     mkvfile = PurePath(result['file_name']).stem
     # print filename
@@ -56,11 +54,15 @@ def printData(file: Path):
 def scanFolder(inputPath: Path):
     print(f':: Selected path: {inputPath}\n')
     if os.path.isdir(inputPath):
+        files = list()
         for file in os.listdir(inputPath):
             file = os.path.join(inputPath, file)
             if file.lower().endswith('.mkv'):
                 # subprocess.run(['mkvmerge', '-i', file ])
-                printData(file)
+                files.append(file)
+        # get mkv data
+        for result in probe_many(files, 'mkvmerge'):
+            printData(result)
 
 # set folder
 if len(sys.argv) < 2:
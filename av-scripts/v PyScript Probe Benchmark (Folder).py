@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+
+# set libs
+import os
+import sys
+import time
+
+from pathlib import Path
+from pathlib import PurePath
+
+try:
+    import questionary
+except ModuleNotFoundError:
+    print(':: Please install "questionary" module: pip install questionary')
+    input(':: Press enter to continue...\n')
+    exit()
+
+from _encHelper import IntValidator, PathValidator, extVideoFile, extAudioFile
+from _encHelper import probeBackends, probeFields, setProbeRanks
+
+# query per backend kind
+benchQueries = { 'media': probeFields, 'mkv': None, 'mediainfo': None }
+
+def sampleFiles(inputPath: Path, sampleSize: int) -> dict:
+    byExt = dict()
+    for dirpath, dirnames, filenames in os.walk(inputPath):
+        for file in filenames:
+            fileExt = PurePath(file).suffix.lower()
+            if fileExt in extVideoFile + extAudioFile and fileExt != '.avs':
+                byExt.setdefault(fileExt, list()).append(os.path.join(dirpath, file))
+    
+    # spread sample over folder
+    for fileExt, files in byExt.items():
+        files.sort()
+        step = max(1, len(files) // sampleSize)
+        byExt[fileExt] = files[::step][:sampleSize]
+    return byExt
+
+def benchBackend(backend, files: list, fields: list) -> tuple:
+    # warm up os file cache, first pass not counted
+    for file in files:
+        backend.read(file, fields)
+    
+    failed = 0
+    startTime = time.perf_counter()
+    for file in files:
+        if backend.read(file, fields) is None:
+            failed += 1
+    return (time.perf_counter() - startTime) / len(files), failed
+
+def benchFolder(inputPath: Path, sampleSize: int):
+    print(f':: Selected path: {inputPath}\n')
+    byExt = sampleFiles(inputPath, sampleSize)
+    if len(byExt) < 1:
+        print(':: No media files found!')
+        return
+    
+    for fileExt, files in sorted(byExt.items()):
+        for kind, fields in benchQueries.items():
+            backends = [ b for b in probeBackends if b.kind == kind and b.supports(files[0], fields) ]
+            if len(backends) < 1:
+                continue
+            
+            print(f':: {fileExt} / {kind} / {len(files)} file(s)')
+            results = list()
+            for backend in backends:
+                avgTime, failed = benchBackend(backend, files, fields)
+                results.append((failed > 0, avgTime, backend.name))
+                print(f'   {backend.name:<10} {avgTime * 1000:9.2f} ms/file, failed: {failed}')
+            
+            # backends without failures first, then by speed
+            results.sort()
+            setProbeRanks(kind, fileExt, [ r[2] for r in results ])
+            print(f'   selected: {results[0][2]}\n')
+
+# set folder
+if len(sys.argv) < 2:
+    inputPath = questionary.text(':: Folder: ', validate=PathValidator).ask()
+    inputPath = inputPath.strip('\"')
+else:
+    inputPath = sys.argv[1]
+
+# set sample size
+sampleSize = questionary.text(':: Files per container:', default='20', validate=IntValidator).ask()
+sampleSize = max(1, int(sampleSize))
+
+# check path
+try:
+    if not os.path.isdir(inputPath):
+        print(f':: Path is not a folder: "{inputPath}"!')
+    else:
+        benchFolder(inputPath, sampleSize)
+except Exception as err:
+    print(f':: Something goes wrong...')
+    print(f':: {type(err).__name__}: {err}')
+
+# end
+if os.environ.get('isBatch') is None:
+    questionary.press_any_key_to_continue(message = '\n:: Press enter to continue...\n').ask()